@@ -0,0 +1,142 @@
+# aprovisionar_lote.py — configuración básica de varios routers por consola, en paralelo
+#
+# Lee el inventario (Data.csv: Serie,Port,Device,User,Password,Ip-domain),
+# abre un hilo por puerto de consola y en cada uno:
+#   1) despierta la consola y lee el número de serie de 'show version'
+#   2) busca en el inventario la fila de ese puerto con esa serie
+#   3) si coincide, envía lineas_basicas(...) con EmpujeConfig
+# Las filas que comparten puerto se atienden en orden dentro del mismo hilo
+# (solo se configura la unidad que está conectada). Al final escribe un CSV
+# con el resultado y el tiempo de cada equipo.
+#
+#   python aprovisionar_lote.py [--inventario Data.csv] [--salida aprovisionamiento.csv]
+#                               [--baudios 9600] [--solo-verificar]
+
+import argparse
+import csv
+import re
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import serial
+
+from empuje_config import EmpujeConfig, lineas_basicas
+
+SERIE_RE = re.compile(r"Processor board ID\s+(\S+)|System [Ss]erial [Nn]umber\s*:\s*(\S+)")
+CAMPOS_REPORTE = ("serie", "puerto", "equipo", "estado", "serie_detectada", "lineas", "errores", "segundos", "detalle")
+
+
+def leer_inventario(path):
+    # utf-8-sig: Data.csv viene con BOM
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [{k.strip(): (v or "").strip() for k, v in fila.items()} for fila in csv.DictReader(f)]
+
+
+def serie_de(show_version):
+    m = SERIE_RE.search(show_version or "")
+    return (m.group(1) or m.group(2)) if m else None
+
+
+def _reporte(fila, estado, t0, serie_detectada=None, resultados=(), detalle=""):
+    errores = [r for r in resultados if r["estado"] != "ok"]
+    return {
+        "serie": fila["Serie"],
+        "puerto": fila["Port"],
+        "equipo": fila["Device"],
+        "estado": estado,
+        "serie_detectada": serie_detectada or "",
+        "lineas": len(resultados),
+        "errores": len(errores),
+        "segundos": round(time.monotonic() - t0, 2),
+        "detalle": detalle or "; ".join(f"{r['linea']}: {r.get('error', r['estado'])}" for r in errores),
+    }
+
+
+def aprovisionar_puerto(puerto, filas, baudios=9600, solo_verificar=False):
+    """Atiende todas las filas de un puerto; devuelve un reporte por fila."""
+    t0 = time.monotonic()
+    try:
+        ser = serial.Serial(puerto, baudios, timeout=1)
+    except Exception as e:
+        return [_reporte(f, "sin-consola", t0, detalle=str(e)) for f in filas]
+
+    try:
+        motor = EmpujeConfig(ser, verbose=False)
+        if motor.despertar() is None:
+            return [_reporte(f, "sin-consola", t0, detalle="la consola no respondió") for f in filas]
+        motor.enviar_linea("terminal length 0")
+        serie = serie_de(motor.enviar_linea("show version", espera_max=10.0)["salida"])
+        print(f"[{puerto}] serie conectada: {serie or '?'}")
+
+        reportes = []
+        for fila in filas:
+            t = time.monotonic()
+            if not serie or fila["Serie"].upper() != serie.upper():
+                reportes.append(_reporte(fila, "no-conectado", t, serie))
+                continue
+            if solo_verificar:
+                reportes.append(_reporte(fila, "verificado", t, serie))
+                continue
+            lineas = lineas_basicas(fila["Device"], fila["User"], fila["Password"], fila["Ip-domain"])
+            resultados = motor.aplicar(lineas)
+            completo = len(resultados) == len(lineas)
+            estado = "ok" if completo and all(r["estado"] == "ok" for r in resultados) else \
+                ("con-errores" if completo else "incompleto")
+            reportes.append(_reporte(fila, estado, t, serie, resultados))
+            print(f"[{puerto}] {fila['Device']} ({fila['Serie']}): {estado} en {reportes[-1]['segundos']}s")
+        return reportes
+    finally:
+        ser.close()
+
+
+def aprovisionar(inventario, baudios=9600, solo_verificar=False):
+    por_puerto = OrderedDict()
+    for fila in inventario:
+        por_puerto.setdefault(fila["Port"], []).append(fila)
+    orden = {(f["Serie"], f["Port"]): i for i, f in enumerate(inventario)}
+
+    reportes = []
+    with ThreadPoolExecutor(max_workers=max(1, len(por_puerto))) as ex:
+        futs = {ex.submit(aprovisionar_puerto, p, filas, baudios, solo_verificar): p
+                for p, filas in por_puerto.items()}
+        for fut in as_completed(futs):
+            try:
+                reportes += fut.result()
+            except Exception as e:
+                t0 = time.monotonic()
+                reportes += [_reporte(f, "error", t0, detalle=str(e)) for f in por_puerto[futs[fut]]]
+    reportes.sort(key=lambda r: orden.get((r["serie"], r["puerto"]), 0))
+    return reportes
+
+
+def escribir_reporte(reportes, destino):
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=CAMPOS_REPORTE)
+        w.writeheader()
+        w.writerows(reportes)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Configuración básica en lote por consola")
+    ap.add_argument("--inventario", default="Data.csv")
+    ap.add_argument("--salida", default="aprovisionamiento.csv")
+    ap.add_argument("--baudios", type=int, default=9600)
+    ap.add_argument("--solo-verificar", action="store_true", help="solo comprueba la serie, no configura")
+    args = ap.parse_args(argv)
+
+    inventario = leer_inventario(args.inventario)
+    t0 = time.monotonic()
+    reportes = aprovisionar(inventario, args.baudios, args.solo_verificar)
+    escribir_reporte(reportes, args.salida)
+
+    ok = sum(r["estado"] in ("ok", "verificado") for r in reportes)
+    print(f"\n{ok}/{len(reportes)} equipos OK en {time.monotonic() - t0:.1f}s — reporte: {args.salida}")
+    for r in reportes:
+        print(f"  {r['serie']:<14} {r['puerto']:<7} {r['equipo']:<22} {r['estado']:<13} {r['segundos']:>6}s")
+    return 0 if ok == len(reportes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# baudios.py — detección rápida de la velocidad de una consola, con caché en disco
+#
+#   from baudios import abrir_consola
+#   ser, baud = abrir_consola("COM13", clave=hwid, candidatos=[9600, 115200])
+#
+# Con el puerto abierto una sola vez se prueba cada velocidad: se envía un CR
+# y se espera un prompt válido unos cientos de ms. La velocidad que funcionó
+# se guarda por puerto (clave = hwid del adaptador USB) y la próxima vez se
+# prueba primero.
+
+import json
+import os
+import re
+import threading
+
+from lector_consola import LectorPrompt
+
+ARCHIVO_BAUDIOS = "baudios_consola.json"
+# Prompt "limpio" (con la velocidad equivocada llega basura que podría acabar en > o #)
+PROMPT_VALIDO_RE = re.compile(r"^[A-Za-z0-9][\w.\-]{0,62}(\([\w\-]+\))?[>#]$")
+
+_lock = threading.Lock()
+
+
+def _cargar(archivo):
+    try:
+        with open(archivo, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def recordar(clave, baud, archivo=ARCHIVO_BAUDIOS):
+    with _lock:
+        datos = _cargar(archivo)
+        if datos.get(clave) == baud:
+            return
+        datos[clave] = baud
+        tmp = archivo + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=1, sort_keys=True)
+        os.replace(tmp, archivo)
+
+
+def ordenar_candidatos(clave, candidatos, archivo=ARCHIVO_BAUDIOS):
+    """La velocidad recordada para `clave` primero, el resto en su orden."""
+    conocida = _cargar(archivo).get(clave)
+    return ([conocida] if conocida else []) + [b for b in candidatos if b != conocida]
+
+
+def probar_baudios(ser, baud, espera=0.3, intentos=2):
+    """Pone el puerto a `baud`, envía CR y devuelve el prompt si llega uno válido, o None."""
+    ser.baudrate = baud
+    lector = LectorPrompt(ser, paginar=False, timeout_lectura=0.05)
+    for _ in range(intentos):
+        ser.reset_input_buffer()
+        ser.write(b"\r")
+        lector.leer(espera_max=espera, silencio=espera, tras_linea=False)
+        if lector.vio_prompt and PROMPT_VALIDO_RE.match(lector.prompt):
+            return lector.prompt
+    return None
+
+
+def abrir_consola(puerto, clave=None, candidatos=(9600, 115200), archivo=ARCHIVO_BAUDIOS, espera=0.3, timeout=1.2):
+    """
+    Abre `puerto` y deja la velocidad en la primera que responde con prompt.
+    Devuelve (ser, baud) con el puerto abierto, o (None, None).
+    """
+    import serial
+    clave = clave or puerto
+    orden = ordenar_candidatos(clave, candidatos, archivo)
+    ser = serial.Serial(port=puerto, baudrate=orden[0], timeout=timeout)
+    try:
+        for baud in orden:
+            if probar_baudios(ser, baud, espera):
+                recordar(clave, baud, archivo)
+                return ser, baud
+    except Exception:
+        ser.close()
+        raise
+    ser.close()
+    return None, None
@@ -0,0 +1,124 @@
+# bench_arranque.py — tiempo de arranque de los puntos de entrada, con presupuesto
+#
+#   python bench_arranque.py [--presupuesto-ms 100] [--repeticiones 5]
+#
+# Cada caso corre en un proceso nuevo y mide, desde la primera línea del
+# proceso, lo que tarda en importar el módulo y hacer su trabajo más corto
+# (--help, parsear un texto de archivo, etc.). No cuenta el arranque del
+# intérprete, que no depende del código. Se toma la mejor de N repeticiones.
+#
+# Falla (código 1) si algún caso pasa del presupuesto o si carga módulos
+# que ese camino no necesita (netmiko, paramiko, textfsm, tabulate, serial):
+# esos solo deben importarse al abrir una sesión, compilar una plantilla,
+# imprimir una tabla o tocar la consola.
+#
+# Antes de medir se compilan los .py del repo (si PYTHONDONTWRITEBYTECODE
+# está puesto, cada arranque recompilaría el fuente y mediría eso).
+
+import argparse
+import compileall
+import json
+import os
+import subprocess
+import sys
+
+PRESUPUESTO_MS = 100
+REPETICIONES = 5
+PESADOS = ("netmiko", "paramiko", "cryptography", "textfsm", "tabulate", "serial")
+
+SCRIPT_IP_INT_BRIEF = "python show_ip_int_brief_mi.py"
+SCRIPT_SHOW_VERSION = "show_version_parsed.csv.py"
+
+TEXTO_IP_INT_BRIEF = (
+    "Router#show ip interface brief\n"
+    "Interface              IP-Address      OK? Method Status                Protocol\n"
+    "GigabitEthernet0/0     192.168.1.1     YES manual up                    up\n"
+    "GigabitEthernet0/1     unassigned      YES unset  administratively down down\n"
+    "Vlan1                  10.0.0.1        YES NVRAM  up                    up\n"
+    "Router#"
+)
+TEXTO_SHOW_VERSION = (
+    "Cisco IOS Software, C2960 Software (C2960-LANBASEK9-M), Version 15.0(2)SE11, RELEASE SOFTWARE (fc3)\n"
+    "SW1 uptime is 3 weeks, 2 days, 4 hours, 12 minutes\n"
+)
+
+
+def _cargar(archivo):
+    # los scripts con espacio o punto extra en el nombre no se pueden importar con 'import'
+    return ("import importlib.util\n"
+            f"_spec = importlib.util.spec_from_file_location('_script', {archivo!r})\n"
+            "_mod = importlib.util.module_from_spec(_spec)\n"
+            "_spec.loader.exec_module(_mod)\n")
+
+
+# (nombre, código, módulos pesados permitidos en ese camino)
+CASOS = [
+    ("lucero --help",
+     "import lucero\ntry:\n    lucero.main(['--help'])\nexcept SystemExit:\n    pass\n", ()),
+    ("import uni2", "import uni2\n", ()),
+    ("show ip int brief (archivo)",
+     _cargar(SCRIPT_IP_INT_BRIEF) + f"_h, _f = _mod.parse_text({TEXTO_IP_INT_BRIEF!r})\nassert len(_f) == 3\n", ()),
+    ("show version (archivo)",
+     _cargar(SCRIPT_SHOW_VERSION)
+     + f"_h, _f = _mod.parse_show_version_text({TEXTO_SHOW_VERSION!r})\nassert _f\n", ("textfsm",)),
+    ("recolector_flota --help",
+     "import recolector_flota\ntry:\n    recolector_flota.main(['--help'])\nexcept SystemExit:\n    pass\n", ()),
+    ("localizar.py --help (cliente)",
+     "import localizar\ntry:\n    localizar.main(['--help'])\nexcept SystemExit:\n    pass\n", ()),
+]
+
+_PLANTILLA = """\
+import sys, time
+_t0 = time.perf_counter()
+import contextlib, io
+with contextlib.redirect_stdout(io.StringIO()):
+{codigo}
+_ms = (time.perf_counter() - _t0) * 1000
+import json
+sys.__stdout__.write(json.dumps({{"ms": _ms, "modulos": sorted(m for m in sys.modules)}}) + "\\n")
+"""
+
+
+def medir(codigo, base):
+    fuente = _PLANTILLA.format(codigo="\n".join("    " + ln for ln in codigo.splitlines()))
+    p = subprocess.run([sys.executable, "-c", fuente], cwd=base, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(p.stderr.strip().splitlines()[-1] if p.stderr.strip() else f"código {p.returncode}")
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+
+def cargados(modulos, permitidos):
+    return sorted({m.split(".")[0] for m in modulos} & set(PESADOS) - set(permitidos))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tiempo de arranque de los puntos de entrada")
+    ap.add_argument("--presupuesto-ms", type=float, default=PRESUPUESTO_MS)
+    ap.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    args = ap.parse_args(argv)
+
+    base = os.path.dirname(os.path.abspath(__file__))
+    compileall.compile_dir(base, maxlevels=0, quiet=1)
+
+    print(f"{'caso':<32} | {'mejor':>8} | {'peor':>8} | pesados cargados")
+    fallos = 0
+    for nombre, codigo, permitidos in CASOS:
+        try:
+            res = [medir(codigo, base) for _ in range(args.repeticiones)]
+        except RuntimeError as e:
+            print(f"{nombre:<32} | {'-':>8} | {'-':>8} | ERROR {e}")
+            fallos += 1
+            continue
+        tiempos = [r["ms"] for r in res]
+        extra = cargados(res[0]["modulos"], permitidos)
+        mal = min(tiempos) > args.presupuesto_ms or extra
+        fallos += bool(mal)
+        print(f"{nombre:<32} | {min(tiempos):>6.1f}ms | {max(tiempos):>6.1f}ms | "
+              f"{', '.join(extra) or '-'}{'   ❌' if mal else ''}")
+    print(f"\npresupuesto {args.presupuesto_ms:.0f} ms por caso: "
+          + ("✅ todos dentro" if not fallos else f"❌ {fallos} caso(s) fuera"))
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
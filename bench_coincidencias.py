@@ -0,0 +1,89 @@
+# bench_coincidencias.py — compara MatcherDirecciones e IndiceRed contra line_contains_ip / buscar_mac_en_texto
+#
+# Genera una tabla ARP sintética (por defecto 50k entradas) y mide:
+#   - búsqueda de N IPs con line_contains_ip (una pasada por IP)  vs  MatcherDirecciones (una pasada,
+#     lo que usa el modo lote sin índice)  vs  IndiceRed (indexa toda la tabla, luego dict)
+#   - extracción de MAC línea a línea con buscar_mac_en_texto    vs  tokens_mac sobre el texto entero
+# Verifica además que los tres den lo mismo: las mismas líneas por IP (matcher) y la
+# misma MAC/interfaz que sale de la primera línea de cada IP (índice).
+#
+#   python bench_coincidencias.py [--entradas 50000] [--objetivos 1 10 100]
+
+import argparse
+import random
+import time
+
+from coincidencias import MatcherDirecciones, tokens_mac, normalizar_mac
+from lucero import IndiceRed, line_contains_ip, buscar_mac_en_texto, _info_arp
+
+
+def tabla_arp(n, seed=1):
+    rnd = random.Random(seed)
+    lineas = ["Protocol  Address          Age (min)  Hardware Addr   Type   Interface"]
+    ips = []
+    for i in range(n):
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        mac = f"{rnd.getrandbits(16):04x}.{rnd.getrandbits(16):04x}.{i & 0xffff:04x}"
+        ips.append(ip)
+        lineas.append(f"Internet  {ip:<16} {rnd.randint(0, 240):>3}   {mac}  ARPA   Vlan{1 + i % 200}")
+    return "\n".join(lineas), ips
+
+
+def medir(fn, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        res = fn()
+        dt = time.perf_counter() - t
+        mejor = dt if mejor is None else min(mejor, dt)
+    return mejor, res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entradas", type=int, default=50000)
+    ap.add_argument("--objetivos", type=int, nargs="+", default=[1, 10, 100])
+    args = ap.parse_args()
+
+    texto, ips = tabla_arp(args.entradas)
+    lineas = texto.splitlines()
+    print(f"Tabla ARP sintética: {args.entradas} entradas, {len(texto) / 1e6:.1f} MB\n")
+
+    print(f"{'objetivos':>9} | {'line_contains_ip':>17} | {'matcher':>9} | {'x':>6} | {'indice':>9} | {'x':>6}")
+    for n in args.objetivos:
+        objetivos = random.Random(n).sample(ips, n)
+
+        def viejo():
+            return {ip: [l for l in lineas if line_contains_ip(l, ip)] for ip in objetivos}
+
+        def matcher():
+            return MatcherDirecciones(ips=objetivos).escanear(texto)
+
+        def indice():
+            datos = IndiceRed()._indexar_ip("arp", texto)
+            return {ip: datos[ip] for ip in objetivos if ip in datos}
+
+        t_viejo, r_viejo = medir(viejo, 1 if n > 10 else 3)
+        t_matcher, r_matcher = medir(matcher)
+        t_indice, r_indice = medir(indice)
+        r_viejo = {k: v for k, v in r_viejo.items() if v}
+        assert r_matcher == r_viejo, "matcher: líneas distintas"
+        assert r_indice == {ip: _info_arp(ls[0], ip) for ip, ls in r_viejo.items()}, "índice: datos distintos"
+        print(f"{n:>9} | {t_viejo * 1000:>14.1f} ms | {t_matcher * 1000:>6.1f} ms | {t_viejo / t_matcher:>5.1f}x"
+              f" | {t_indice * 1000:>6.1f} ms | {t_viejo / t_indice:>5.1f}x")
+
+    def mac_viejo():
+        return [normalizar_mac(buscar_mac_en_texto(l)) for l in lineas[1:]]
+
+    def mac_nuevo():
+        return tokens_mac(texto)
+
+    t_viejo, r_viejo = medir(mac_viejo)
+    t_nuevo, r_nuevo = medir(mac_nuevo)
+    assert r_viejo == r_nuevo, "MACs distintas"
+    print(f"\nMACs de la tabla: buscar_mac_en_texto {t_viejo * 1000:.1f} ms | tokens_mac {t_nuevo * 1000:.1f} ms"
+          f" | {t_viejo / t_nuevo:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# bench_localizacion.py — latencia de extremo a extremo de lucero y uni2 contra la flota simulada
+#
+# Levanta una flota de simulador_ios (un servidor SSH por switch) y cronometra
+#   - lucero.iniciar_localizacion_ip(ip)
+#   - uni2.resolve_location(ip)   (y uni2.trace_location con --traza)
+# para varias IPs al azar, comprobando el switch y puerto contra la verdad de
+# la flota. Reporta p50/p90/p99/máx y comandos enviados por consulta. La
+# primera consulta de lucero se mide en frío (sin índice ni sesiones) y va
+# en su propia columna; "lucero (historial)" repite las mismas IPs con el
+# índice vacío, así que solo ayuda la última ubicación guardada en el historial.
+# Termina con código 1 si alguna función no acertó todas las IPs (los tiempos
+# de una búsqueda que sale antes de tiempo no sirven).
+#
+#   python bench_localizacion.py [--switches 3 50 500] [--consultas 5] [--hosts 24]
+#                                [--latencia 0.01] [--latencia-kb 0] [--rtt 0] [--mac-extra 0] [--traza]
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+
+import lucero
+import uni2
+from capacidades import PerfilCapacidades
+from historial import Historial
+from simulador_ios import Flota
+
+
+def percentil(xs, p):
+    xs = sorted(xs)
+    if not xs:
+        return float("nan")
+    k = max(0, min(len(xs) - 1, round(p / 100 * len(xs) + 0.5) - 1))
+    return xs[k]
+
+
+def preparar_lucero(flota):
+    """Apunta lucero a la flota y arranca en frío (sin sesiones, índice, historial ni perfil aprendido)."""
+    lucero.POOL.cerrar_todo()
+    lucero.EQUIPOS_RED[:] = flota.equipos_lucero()
+    lucero.INDICE = lucero.IndiceRed()
+    lucero.CACHE_PUERTOS.invalidar()
+    lucero.PERFILES = PerfilCapacidades(None)
+    lucero.HISTORIAL = Historial(None)
+
+
+def preparar_uni2(flota):
+    uni2.DEVICES[:] = flota.equipos_uni2()
+    uni2.CORE_NAME = "SW-CORE"
+    uni2.TOPOLOGY = uni2.TopologyCache()
+
+
+def correr_lucero(ip):
+    with contextlib.redirect_stdout(io.StringIO()):
+        r = lucero.iniciar_localizacion_ip(ip)
+    return r.get("switch"), r.get("puerto")
+
+
+def correr_uni2(fn):
+    def correr(ip):
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = fn(ip)
+        return (r["switch"], r["port"]) if r else (None, None)
+    return correr
+
+
+def medir(nombre, fn, flota, ips):
+    tiempos, aciertos = [], 0
+    c0 = flota.total_comandos()
+    for ip in ips:
+        t = time.perf_counter()
+        try:
+            sw, puerto = fn(ip)
+        except Exception as e:
+            sw, puerto = None, f"error: {e}"
+        tiempos.append(time.perf_counter() - t)
+        esperado = flota.ubicacion(ip)
+        if sw == esperado[0] and uni2.normalize_intf(str(puerto)) == uni2.normalize_intf(esperado[1]):
+            aciertos += 1
+    comandos = (flota.total_comandos() - c0) / max(1, len(ips))
+    return {"nombre": nombre, "tiempos": tiempos, "aciertos": aciertos, "n": len(ips), "comandos": comandos}
+
+
+def imprimir(n_switches, res):
+    t = res["tiempos"]
+    print(f"{n_switches:>8} | {res['nombre']:<22} | {res['aciertos']:>3}/{res['n']:<3} | "
+          f"{percentil(t, 50) * 1000:>8.0f} | {percentil(t, 90) * 1000:>8.0f} | {percentil(t, 99) * 1000:>8.0f} | "
+          f"{max(t) * 1000:>8.0f} | {res['comandos']:>7.1f}", flush=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de localización contra switches simulados")
+    ap.add_argument("--switches", type=int, nargs="+", default=[3, 50, 500])
+    ap.add_argument("--consultas", type=int, default=5)
+    ap.add_argument("--hosts", type=int, default=24, help="hosts por switch de acceso")
+    ap.add_argument("--mac-extra", type=int, default=0)
+    ap.add_argument("--latencia", type=float, default=0.01, help="s por comando")
+    ap.add_argument("--latencia-kb", type=float, default=0.0, help="s extra por KB de salida")
+    ap.add_argument("--rtt", type=float, default=0.0, help="s de ida y vuelta por escritura (enlace WAN)")
+    ap.add_argument("--puerto", type=int, default=2222)
+    ap.add_argument("--traza", action="store_true", help="mide también uni2.trace_location")
+    args = ap.parse_args(argv)
+
+    print(f"{'switches':>8} | {'función':<22} | {'ok':>7} | {'p50 ms':>8} | {'p90 ms':>8} | {'p99 ms':>8} | "
+          f"{'máx ms':>8} | {'cmd/q':>7}")
+    fallos = []
+    for i, n in enumerate(args.switches):
+        flota = Flota(n, args.hosts, args.mac_extra, args.latencia, args.latencia_kb,
+                      rtt=args.rtt, puerto=args.puerto + i).iniciar()
+        try:
+            ips = random.Random(n).sample(flota.ips(), min(args.consultas, len(flota.ips())))
+            res = []
+            preparar_lucero(flota)
+            res.append(medir("lucero (frío, 1ª)", correr_lucero, flota, ips[:1]))
+            imprimir(n, res[-1])
+            res.append(medir("lucero (caliente)", correr_lucero, flota, ips[1:] or ips))
+            imprimir(n, res[-1])
+            lucero.INDICE = lucero.IndiceRed()
+            lucero.CACHE_PUERTOS.invalidar()
+            res.append(medir("lucero (historial)", correr_lucero, flota, ips))
+            imprimir(n, res[-1])
+            preparar_uni2(flota)
+            res.append(medir("uni2.resolve_location", correr_uni2(uni2.resolve_location), flota, ips))
+            imprimir(n, res[-1])
+            if args.traza:
+                res.append(medir("uni2.trace_location", correr_uni2(uni2.trace_location), flota, ips))
+                imprimir(n, res[-1])
+            fallos += [f"{n} switches: {r['nombre']} {r['aciertos']}/{r['n']}" for r in res if r["aciertos"] < r["n"]]
+        finally:
+            lucero.POOL.cerrar_todo()
+            flota.detener()
+    if fallos:
+        print("\n❌ precisión por debajo del 100 %: " + "; ".join(fallos))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# bench_tabla_compacta.py — TablaMac (arrays compactos) contra la lista de dicts de find_mac_on_switch
+#
+# Genera una tabla MAC sintética (por defecto 100k entradas) en las dos
+# formas que recibe uni2: filas de ntc-templates (lista de dicts) y texto
+# crudo. Mide:
+#   - memoria retenida: lista de dicts  vs  TablaMac (tracemalloc)
+#   - construcción de TablaMac desde filas y desde texto
+#   - búsqueda de una MAC: recorrido con normalize_mac por fila (como hacía
+#     find_mac_on_switch)  vs  bisección en TablaMac
+#   - filtro por VLAN y por puerto: comprensión sobre la lista  vs  TablaMac.filtrar
+# Verifica que ambos métodos devuelvan las mismas filas.
+#
+#   python bench_tabla_compacta.py [--entradas 100000] [--busquedas 200]
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from tabla_compacta import TablaMac
+from uni2 import normalize_mac
+
+
+def tabla_mac(n, seed=1):
+    rnd = random.Random(seed)
+    filas, lineas = [], ["Vlan    Mac Address       Type        Ports", "----    -----------       --------    -----"]
+    for i in range(n):
+        mac = f"{rnd.getrandbits(16):04x}.{rnd.getrandbits(16):04x}.{i & 0xffff:04x}"
+        vlan = str(1 + rnd.randrange(200))
+        puerto = f"Gi{1 + i % 8}/0/{1 + rnd.randrange(48)}" if rnd.random() < 0.9 else f"Te1/1/{1 + rnd.randrange(4)}"
+        tipo = "DYNAMIC" if rnd.random() < 0.98 else "STATIC"
+        filas.append({"destination_address": mac, "type": tipo, "vlan": vlan, "destination_port": [puerto]})
+        lineas.append(f" {vlan:<4}   {mac}    {tipo:<8}    {puerto}")
+    return filas, "\n".join(lineas)
+
+
+def medir(fn, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        res = fn()
+        dt = time.perf_counter() - t
+        mejor = dt if mejor is None else min(mejor, dt)
+    return mejor, res
+
+
+def memoria(fn):
+    """(bytes retenidos por el resultado de fn, resultado)."""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    res = fn()
+    gc.collect()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return despues - antes, res
+
+
+def buscar_viejo(filas, mac):
+    # mismo bucle que la versión anterior de uni2.find_mac_on_switch
+    return [{"vlan": str(r.get("vlan", "")), "port": r.get("destination_port", "")[0], "type": r.get("type", "")}
+            for r in filas if normalize_mac(r.get("destination_address", "")) == mac]
+
+
+def fila(t, ms, ms_nuevo):
+    print(f"{t:<34} | {ms * 1000:>10.2f} ms | {ms_nuevo * 1000:>10.3f} ms | {ms / ms_nuevo:>8.0f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entradas", type=int, default=100000)
+    ap.add_argument("--busquedas", type=int, default=200)
+    args = ap.parse_args()
+
+    filas_src, texto = tabla_mac(args.entradas)
+    print(f"Tabla MAC sintética: {args.entradas} entradas, texto {len(texto) / 1e6:.1f} MB\n")
+
+    # memoria: las filas de ntc-templates se copian para medir solo lo retenido
+    b_dicts, filas = memoria(lambda: [dict(r, destination_port=list(r["destination_port"])) for r in filas_src])
+    b_compacta, compacta = memoria(lambda: TablaMac.desde_textfsm(filas))
+    print(f"Memoria   lista de dicts {b_dicts / 1e6:8.1f} MB | TablaMac {b_compacta / 1e6:6.2f} MB "
+          f"(arrays {compacta.nbytes() / 1e6:.2f} MB) | {b_dicts / max(1, b_compacta):.0f}x menos")
+
+    t_filas, _ = medir(lambda: TablaMac.desde_textfsm(filas))
+    t_texto, desde_texto = medir(lambda: TablaMac.desde_texto(texto))
+    print(f"Construcción TablaMac: desde filas {t_filas * 1000:.0f} ms | desde texto {t_texto * 1000:.0f} ms\n")
+
+    rnd = random.Random(2)
+    objetivos = [normalize_mac(rnd.choice(filas)["destination_address"]) for _ in range(args.busquedas)]
+    objetivos += ["ffff.ffff.0000"]   # una que no está
+
+    print(f"{'operación':<34} | {'dicts':>13} | {'TablaMac':>13} | {'x':>9}")
+    n_viejo = max(1, min(5, len(objetivos)))
+    t_viejo, r_viejo = medir(lambda: [buscar_viejo(filas, m) for m in objetivos[:n_viejo]], 1)
+    t_nuevo, r_nuevo = medir(lambda: [compacta.buscar(m) for m in objetivos])
+    assert r_viejo == r_nuevo[:n_viejo], "búsquedas distintas"
+    assert [desde_texto.buscar(m) for m in objetivos] == r_nuevo, "texto y filas distintos"
+    fila("búsqueda de 1 MAC", t_viejo / n_viejo, t_nuevo / len(objetivos))
+
+    vlan, puerto = filas[0]["vlan"], filas[0]["destination_port"][0]
+    t_viejo, r_viejo = medir(lambda: [r for r in filas if r["vlan"] == vlan])
+    t_nuevo, r_nuevo = medir(lambda: compacta.filtrar(vlan=vlan))
+    assert sorted(normalize_mac(r["destination_address"]) for r in r_viejo) == sorted(r["mac"] for r in r_nuevo)
+    fila(f"filtro vlan {vlan} ({len(r_nuevo)} filas)", t_viejo, t_nuevo)
+
+    t_viejo, r_viejo = medir(lambda: [r for r in filas if r["destination_port"][0] == puerto and r["vlan"] == vlan])
+    t_nuevo, r_nuevo = medir(lambda: compacta.filtrar(vlan=vlan, puerto=puerto))
+    assert len(r_viejo) == len(r_nuevo)
+    fila(f"filtro vlan+puerto {puerto} ({len(r_nuevo)})", t_viejo, t_nuevo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# cache_puertos.py — caché de caracterización de puertos (switch, interfaz)
+#
+# Cada entrada guarda dos partes con TTL distinto:
+#   "lento":   modo trunk/access, VLANs y si hay vecino CDP/LLDP (cambia poco)
+#   "volatil": mac_count (cambia con el tráfico)
+# Expulsión LRU al superar max_entradas, archivo JSON opcional para que la
+# caché sobreviva entre ejecuciones, y contadores de aciertos/fallos.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PARTES = {
+    "lento": ("is_trunk", "is_access", "access_vlan", "native_vlan", "has_neighbor"),
+    "volatil": ("mac_count",),
+}
+
+
+class CachePuertos:
+    def __init__(self, ttl_lento=3600.0, ttl_volatil=60.0, max_entradas=4096, archivo=None):
+        self.ttl = {"lento": ttl_lento, "volatil": ttl_volatil}
+        self.max_entradas = max_entradas
+        self.archivo = archivo
+        self._datos = OrderedDict()   # (switch, ifz) -> {parte: (ts, valores)}
+        self._lock = threading.Lock()
+        self.stats = {"aciertos": 0, "fallos": 0, "expulsiones": 0}
+        if archivo:
+            self.cargar()
+
+    def obtener(self, sw, ifz, parte):
+        """Valores frescos de `parte` para (sw, ifz), o None."""
+        with self._lock:
+            ent = self._datos.get((sw, ifz))
+            item = ent.get(parte) if ent else None
+            if item and time.time() - item[0] <= self.ttl[parte]:
+                self._datos.move_to_end((sw, ifz))
+                self.stats["aciertos"] += 1
+                return dict(item[1])
+            self.stats["fallos"] += 1
+            return None
+
+    def guardar(self, sw, ifz, parte, valores, ts=None):
+        valores = {k: valores.get(k) for k in PARTES[parte]}
+        with self._lock:
+            ent = self._datos.setdefault((sw, ifz), {})
+            ent[parte] = (ts or time.time(), valores)
+            self._datos.move_to_end((sw, ifz))
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.stats["expulsiones"] += 1
+
+    def invalidar(self, sw=None, ifz=None):
+        """Borra un puerto, todos los de un switch, o toda la caché."""
+        with self._lock:
+            for k in [k for k in self._datos if (sw is None or k[0] == sw) and (ifz is None or k[1] == ifz)]:
+                del self._datos[k]
+
+    # ------------- persistencia -------------
+    def cargar(self):
+        if not (self.archivo and os.path.exists(self.archivo)):
+            return
+        try:
+            with open(self.archivo, encoding="utf-8") as f:
+                filas = json.load(f)
+        except (OSError, ValueError):
+            return
+        ahora = time.time()
+        for sw, ifz, parte, ts, valores in filas:
+            if parte in self.ttl and ahora - ts <= self.ttl[parte]:
+                self.guardar(sw, ifz, parte, valores, ts=ts)
+
+    def persistir(self):
+        if not self.archivo:
+            return
+        with self._lock:
+            filas = [[sw, ifz, parte, ts, valores]
+                     for (sw, ifz), ent in self._datos.items()
+                     for parte, (ts, valores) in ent.items()]
+        tmp = self.archivo + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(filas, f)
+        os.replace(tmp, self.archivo)
@@ -0,0 +1,135 @@
+# capacidades.py — perfil aprendido de qué variantes de comando funcionan en cada equipo
+#
+# Por cada equipo y variante (p.ej. "dhcp", "arp-vrf", "mac-inc-dot") se cuenta
+# cuántas veces dio respuesta útil ("ok"), salida sin el dato ("vacio"), error
+# de CLI ("error") o no respondió a tiempo / excepción ("timeout"), y cuánto
+# tardó. Con eso:
+#   - ordenar() pone primero las variantes con más aciertos y más rápidas,
+#   - las que el CLI ha rechazado (min_errores veces o más) y nunca
+#     respondieron se saltan; los timeouts no cuentan: un equipo lento no
+#     pierde sus comandos.
+# El perfil se guarda en JSON y se reinicia si cambia la versión de software.
+# guardar() solo escribe si hubo cambios, y suma lo aprendido en este proceso
+# a lo que haya en el archivo en ese momento (otro proceso pudo guardar antes).
+
+import json
+import os
+import threading
+
+ESTADOS = ("ok", "vacio", "error", "timeout")
+
+
+class PerfilCapacidades:
+    def __init__(self, archivo=None, min_errores=3):
+        self.archivo = archivo
+        self.min_errores = min_errores
+        self._perfiles = {}   # equipo -> {"version": str|None, "variantes": {clave: contadores}}
+        self._delta = {}      # equipo -> {clave: contadores} sumados desde la última carga/guardado
+        self._versiones = {}  # equipo -> versión vista en este proceso
+        self._reiniciados = set()   # equipos cuyo cambio de versión se vio aquí y falta guardar
+        self._lock = threading.Lock()
+        if archivo:
+            self.cargar()
+
+    def _perfil(self, equipo):
+        return self._perfiles.setdefault(equipo, {"version": None, "variantes": {}})
+
+    def version_validada(self, equipo):
+        """True si este proceso ya comprobó la versión de software del equipo."""
+        return equipo in self._versiones
+
+    def validar_version(self, equipo, version):
+        """Si el equipo cambió de versión de software, su perfil deja de valer."""
+        version = (version or "").strip() or None
+        with self._lock:
+            self._versiones[equipo] = version
+            p = self._perfil(equipo)
+            if version and p["version"] != version:
+                p["version"] = version
+                p["variantes"] = {}
+                self._delta[equipo] = {}
+                self._reiniciados.add(equipo)
+
+    def registrar(self, equipo, clave, estado, segundos):
+        if equipo is None:
+            return
+        with self._lock:
+            for c in (self._perfil(equipo)["variantes"].setdefault(clave, _contadores()),
+                      self._delta.setdefault(equipo, {}).setdefault(clave, _contadores())):
+                c[estado] = c.get(estado, 0) + 1
+                c["t_total"] += segundos
+
+    def muerta(self, equipo, clave):
+        c = self._perfiles.get(equipo, {}).get("variantes", {}).get(clave)
+        return bool(c) and c["ok"] == 0 and c["vacio"] == 0 and c["error"] >= self.min_errores
+
+    def ordenar(self, equipo, variantes):
+        """
+        variantes: secuencia de (clave, ...) en el orden por defecto.
+        Devuelve las vivas ordenadas por probabilidad de acierto (con prior
+        de Laplace, así las no probadas quedan en medio) y luego por tiempo
+        medio; en empate se respeta el orden por defecto.
+        """
+        vistas = self._perfiles.get(equipo, {}).get("variantes", {})
+
+        def clave_orden(item):
+            i, v = item
+            c = vistas.get(v[0])
+            if not c:
+                return (-0.5, 0.0, i)
+            n = sum(c.get(e, 0) for e in ESTADOS)
+            return (-(c["ok"] + 1) / (n + 2), c["t_total"] / n, i)
+
+        vivas = [(i, v) for i, v in enumerate(variantes) if not self.muerta(equipo, v[0])]
+        return [v for _, v in sorted(vivas, key=clave_orden)]
+
+    # ------------- persistencia -------------
+    def _leer(self):
+        if not (self.archivo and os.path.exists(self.archivo)):
+            return {}
+        try:
+            with open(self.archivo, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def cargar(self):
+        with self._lock:
+            self._perfiles = self._leer()
+            self._delta, self._reiniciados = {}, set()
+
+    def guardar(self):
+        """
+        Suma lo aprendido desde la última carga al archivo tal como está ahora
+        (si otro proceso guardó en medio, sus contadores se conservan). Un
+        cambio de versión visto aquí reinicia el perfil del archivo; si fue
+        otro proceso el que lo vio, lo aprendido aquí para la versión vieja se
+        descarta. Sin cambios no se escribe nada.
+        """
+        if not self.archivo:
+            return
+        with self._lock:
+            if not self._delta:
+                return
+            perfiles = self._leer()
+            for equipo, variantes in self._delta.items():
+                p = perfiles.setdefault(equipo, {"version": None, "variantes": {}})
+                version = self._perfiles.get(equipo, {}).get("version")
+                if version and p.get("version") != version:
+                    if p.get("version") and equipo not in self._reiniciados:
+                        continue
+                    p["version"], p["variantes"] = version, {}
+                for clave, d in variantes.items():
+                    c = p["variantes"].setdefault(clave, _contadores())
+                    for k in d:
+                        c[k] = c.get(k, 0) + d[k]
+            datos = json.dumps(perfiles, indent=1, sort_keys=True)
+            tmp = f"{self.archivo}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(datos)
+            os.replace(tmp, self.archivo)
+            self._perfiles, self._delta, self._reiniciados = perfiles, {}, set()
+
+
+def _contadores():
+    return {"ok": 0, "vacio": 0, "error": 0, "timeout": 0, "t_total": 0.0}
@@ -0,0 +1,129 @@
+# coincidencias.py — búsqueda de muchas IP/MAC en una salida de comando con una sola pasada
+#
+# En vez de correr una regex por línea y por dirección (line_contains_ip,
+# buscar_mac_en_texto), cada línea se parte una vez en tokens de dirección y
+# los tokens se buscan en un set de objetivos. El coste es lineal en el
+# tamaño de la tabla, sin importar cuántas direcciones se busquen. Así arma
+# lucero.IndiceRed sus tablas (todas las direcciones, para muchas consultas);
+# MatcherDirecciones hace lo mismo solo para un conjunto de objetivos (el modo
+# lote de lucero sin índice).
+
+import re
+
+MAC_PATTERNS = [
+    r"[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}",
+    r"[0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5}",
+    r"[0-9a-fA-F]{12}",
+]
+# los tres formatos de MAC_PATTERNS en una sola regex con prefijo común (más rápida que la alternancia)
+MAC_TOKEN_RE = re.compile(r"[0-9a-fA-F]{2}(?:[0-9a-fA-F]{2}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}"
+                          r"|(?::[0-9a-fA-F]{2}){5}|[0-9a-fA-F]{10})")
+# corridas completas de 4 o más números separados por puntos ("10.1.1.1", "1.2.3.4.5");
+# al buscar de izquierda a derecha cada coincidencia empieza al inicio de la corrida
+IP_RUN_RE = re.compile(r"\d+\.\d+\.\d+\.\d+(?:\.\d+)*")
+# con pocas IPs objetivo es más rápido buscar cada una con str.find que tokenizar todo
+MAX_IPS_FIND = 16
+
+
+def normalizar_mac(s):
+    return re.sub(r"[^0-9a-fA-F]", "", s or "").lower()
+
+
+def _norm_token(tok):
+    # los tokens de MAC_TOKEN_RE solo llevan hex, '.' o ':'
+    return tok.replace(".", "").replace(":", "").lower()
+
+
+def _ventanas_ip(run):
+    if run.count(".") == 3:
+        return (run,)
+    partes = run.split(".")
+    return tuple(".".join(partes[i:i + 4]) for i in range(len(partes) - 3))
+
+
+def tokens_ip(linea):
+    """
+    IPs (4 octetos) presentes en la línea con la misma regla de bordes que
+    line_contains_ip: sin dígito antes ni después. Dentro de "1.2.3.4.5"
+    aparecen "1.2.3.4" y "2.3.4.5", igual que con la regex.
+    """
+    out = []
+    for run in IP_RUN_RE.findall(linea):
+        out += _ventanas_ip(run)
+    return out
+
+
+def tokens_mac(linea):
+    """MACs del texto (cualquier formato), normalizadas a 12 hex en minúscula."""
+    return [_norm_token(t) for t in MAC_TOKEN_RE.findall(linea)]
+
+
+def _linea_en(texto, pos):
+    ini = texto.rfind("\n", 0, pos) + 1
+    fin = texto.find("\n", pos)
+    return ini, texto[ini:fin if fin != -1 else len(texto)].rstrip("\r")
+
+
+class MatcherDirecciones:
+    """
+    Matcher precompilado para un conjunto de IPs y/o MACs objetivo.
+
+        m = MatcherDirecciones(ips=["10.0.0.5", "10.0.0.9"], macs=["aabb.cc00.0001"])
+        hits = m.escanear(salida)      # {"10.0.0.5": [linea, ...], "aabbcc000001": [...]}
+
+    Las MACs se devuelven normalizadas (12 hex en minúscula). El texto se
+    recorre con una sola regex en C; solo las coincidencias con el set de
+    objetivos pagan el coste de recortar su línea.
+    """
+
+    def __init__(self, ips=(), macs=()):
+        self.ips = set(ips)
+        self.macs = {normalizar_mac(m) for m in macs}
+
+    def _hits(self, texto):
+        if self.ips and len(self.ips) <= MAX_IPS_FIND:
+            for ip in self.ips:
+                yield from ((i, ip) for i in _posiciones_ip(texto, ip))
+        elif self.ips:
+            for m in IP_RUN_RE.finditer(texto):
+                for ip in _ventanas_ip(m.group(0)):
+                    if ip in self.ips:
+                        yield m.start(), ip
+        if self.macs:
+            for m in MAC_TOKEN_RE.finditer(texto):
+                mac = _norm_token(m.group(0))
+                if mac in self.macs:
+                    yield m.start(), mac
+
+    def escanear(self, texto, primera=False):
+        """
+        Recorre `texto` una vez y devuelve {objetivo: [líneas]} en orden de aparición.
+        Con primera=True solo se guarda la primera línea de cada objetivo.
+        """
+        texto = texto or ""
+        vistos = {}   # objetivo -> {inicio_de_linea: linea}
+        for pos, obj in self._hits(texto):
+            lineas = vistos.setdefault(obj, {})
+            if primera and lineas:
+                continue
+            ini, linea = _linea_en(texto, pos)
+            lineas.setdefault(ini, linea)
+        return {obj: [l for _, l in sorted(lineas.items())] for obj, lineas in vistos.items()}
+
+
+def _posiciones_ip(texto, ip):
+    """Posiciones de `ip` en el texto sin dígito pegado antes ni después."""
+    i = texto.find(ip)
+    while i != -1:
+        j = i + len(ip)
+        if not (i and texto[i - 1].isdecimal()) and not (j < len(texto) and texto[j].isdecimal()):
+            yield i
+        i = texto.find(ip, i + 1)
+
+
+def primera_linea_con_ip(texto, ip):
+    """Equivalente a next(l for l in texto.splitlines() if line_contains_ip(l, ip)), o ""."""
+    texto = texto or ""
+    for i in _posiciones_ip(texto, ip):
+        return _linea_en(texto, i)[1]
+    return ""
@@ -0,0 +1,178 @@
+# empuje_config.py — envío de configuración por consola al ritmo del equipo
+#
+#   from empuje_config import EmpujeConfig, imprimir_informe
+#   motor = EmpujeConfig(ser)
+#   motor.despertar()
+#   resultados = motor.aplicar(["enable", "configure terminal", "hostname R1", "end"])
+#   imprimir_informe(resultados)
+#
+# Cada línea se envía en cuanto el equipo devuelve el prompt de la anterior
+# ("R1(config)#", "R1(config-line)#", ...), sin sleeps fijos. Las operaciones
+# lentas (crypto key generate, write memory) esperan a su fin real y se
+# contestan sus preguntas ([yes/no], [confirm], ...). Los "% Invalid input"
+# y similares se detectan y cada línea se reporta con su tiempo.
+
+import re
+import time
+
+from lector_consola import LectorPrompt, PROMPT_RE
+
+# Errores de la CLI de IOS tras un comando
+ERROR_RE = re.compile(r"^\s*%\s*(Invalid|Incomplete|Ambiguous|Unknown)\b.*$", re.M)
+
+# Comandos lentos: (regex, espera máxima en s sin datos, marca que debe aparecer antes del prompt)
+LENTAS = (
+    (re.compile(r"^crypto key generate\b", re.I), 120.0, None),
+    (re.compile(r"^(wr|write|write memory|copy run\S* start\S*)$", re.I), 60.0, "[OK]"),
+)
+
+# Preguntas que pueden aparecer en lugar del prompt: (regex, respuesta). Va en orden: la primera que coincide.
+PREGUNTAS = (
+    (re.compile(r"initial configuration dialog\? \[yes/no\]:\s*$"), "no"),
+    (re.compile(r"\[yes/no\]:?\s*$"), "yes"),                        # crypto: reemplazar llaves existentes
+    (re.compile(r"How many bits in the modulus \[\d+\]:\s*$"), ""),  # acepta el valor por defecto
+    (re.compile(r"Destination filename \[[^\]]*\]\?\s*$"), ""),
+    (re.compile(r"\[confirm\]\s*$"), ""),
+)
+
+# El lector corta en el prompt o en cualquiera de las preguntas
+FIN_RE = re.compile("|".join(f"(?:{r.pattern})" for r in [PROMPT_RE] + [p for p, _ in PREGUNTAS]))
+MODO_RE = re.compile(r"\(([^)]*)\)#\s?$")
+
+
+def modo_de(prompt):
+    """'R1(config-line)#' -> 'config-line', 'R1#' -> 'privilegiado', 'R1>' -> 'usuario'."""
+    m = MODO_RE.search(prompt or "")
+    if m:
+        return m.group(1)
+    p = (prompt or "").rstrip()
+    if p.endswith("#"):
+        return "privilegiado"
+    if p.endswith(">"):
+        return "usuario"
+    return None
+
+
+class EmpujeConfig:
+    def __init__(self, ser, espera_linea=5.0, parar_en_error=False, verbose=True):
+        self.ser = ser
+        self.lector = LectorPrompt(ser, prompt_re=FIN_RE, paginar=False)
+        self.espera_linea = espera_linea
+        self.parar_en_error = parar_en_error
+        self.verbose = verbose
+        self.prompt = ""
+
+    def _respuesta(self, cola):
+        for patron, resp in PREGUNTAS:
+            if patron.search(cola):
+                return resp
+        return None
+
+    def _esperar_prompt(self, espera_max, marca=None):
+        """Lee hasta el prompt contestando preguntas. Devuelve (salida, estado)."""
+        partes = []
+        tras_linea = True   # el primer prompt cuenta después del eco del comando
+        while True:
+            partes.append(self.lector.leer(espera_max=espera_max, tras_linea=tras_linea))
+            if not self.lector.vio_prompt:
+                return "".join(partes), "timeout"
+            cola = self.lector.prompt
+            resp = self._respuesta(cola)
+            if resp is None:
+                self.prompt = cola
+                break
+            # contestar y seguir esperando al prompt (sin exigir salto de línea: IOS responde en la misma)
+            self.ser.write((resp + "\r").encode())
+            tras_linea = False
+        salida = "".join(partes)
+        if ERROR_RE.search(salida):
+            return salida, "error"
+        if marca and marca not in salida:
+            return salida, "sin-marca"
+        return salida, "ok"
+
+    def despertar(self, espera_max=3.0):
+        """Envía un Enter y espera el prompt (contesta el diálogo inicial si aparece)."""
+        self.ser.write(b"\r\n")
+        _, estado = self._esperar_prompt(espera_max)
+        return self.prompt if estado != "timeout" else None
+
+    def enviar_linea(self, linea, espera_max=None):
+        linea = linea.strip()
+        marca = None
+        espera = espera_max or self.espera_linea
+        for patron, espera_lenta, marca_lenta in LENTAS:
+            if patron.search(linea):
+                espera = max(espera, espera_lenta)
+                marca = marca_lenta
+                break
+        t = time.monotonic()
+        self.lector.enviar(linea)
+        salida, estado = self._esperar_prompt(espera, marca)
+        r = {
+            "linea": linea,
+            "estado": estado,
+            "modo": modo_de(self.prompt) if estado != "timeout" else None,
+            "segundos": round(time.monotonic() - t, 3),
+            "salida": salida,
+        }
+        if estado == "error":
+            r["error"] = ERROR_RE.search(salida).group(0).strip()
+        if self.verbose:
+            extra = f"  {r.get('error', '')}" if estado != "ok" else ""
+            print(f"  [{estado:^9}] {r['segundos']:7.2f}s  {linea}{extra}")
+        return r
+
+    def aplicar(self, lineas):
+        """Envía las líneas en orden; devuelve la lista de resultados por línea."""
+        resultados = []
+        for linea in lineas:
+            if not linea.strip() or linea.lstrip().startswith("!"):
+                continue
+            r = self.enviar_linea(linea)
+            resultados.append(r)
+            if r["estado"] == "timeout" or (r["estado"] == "error" and self.parar_en_error):
+                break
+        return resultados
+
+
+def lineas_basicas(hostname, username, password, domain):
+    """Configuración básica de acceso SSH (la de basic_config,py)."""
+    return [
+        # Entrar al modo privilegiado y configuración
+        "enable",
+        "configure terminal",
+
+        # Configuración básica
+        f"hostname {hostname}",
+        f"username {username} privilege 15 secret {password}",
+        f"ip domain-name {domain}",
+
+        # Generación de llaves SSH (espera a que termine de verdad)
+        "crypto key generate rsa modulus 1024",
+
+        # Configuración de acceso remoto
+        "line vty 0 4",
+        "login local",
+        "transport input ssh",
+        "transport output ssh",
+        "exit",
+
+        # Línea de consola
+        "line console 0",
+
+        # Cerrar sesión y guardar config (espera el [OK])
+        "end",
+        "write memory",
+    ]
+
+
+def imprimir_informe(resultados):
+    total = sum(r["segundos"] for r in resultados)
+    malas = [r for r in resultados if r["estado"] != "ok"]
+    lenta = max(resultados, key=lambda r: r["segundos"], default=None)
+    print(f"\n{len(resultados)} líneas en {total:.2f}s, {len(malas)} con problemas")
+    if lenta:
+        print(f"Más lenta: '{lenta['linea']}' ({lenta['segundos']:.2f}s)")
+    for r in malas:
+        print(f"  - {r['linea']}: {r['estado']} {r.get('error', '')}".rstrip())
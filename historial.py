@@ -0,0 +1,218 @@
+# historial.py — registro de avistamientos (IP, MAC, switch, puerto) en SQLite
+#
+#   from historial import Historial
+#   HISTORIAL = Historial("historial_avistamientos.db")
+#   HISTORIAL.registrar(reporte, via="recorrido")      # un reporte de lucero.localizar
+#   HISTORIAL.ultimo(ip="10.1.1.5", edad_max=86400)    # último avistamiento con puerto
+#   HISTORIAL.estancias(mac="0011.2233.4455", desde=time.time() - 7 * 86400)
+#
+# Cada resolución queda como una fila con su hora, la fuente de la ETAPA 1
+# (dhcp, arp, tracking...) y la vía por la que se obtuvo (recorrido completo,
+# lote, confirmación sobre el historial). Hay índices por IP, por MAC y por
+# (switch, puerto), así que las consultas de historial no tocan ningún equipo.
+#
+#   python historial.py 10.1.1.5 [--desde 7d]
+#   python historial.py 0011.2233.4455 --desde 24h [--detalle]
+#   python historial.py --puerto SW2 Gi1/0/5 --desde 2026-10-01
+
+import argparse
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+ARCHIVO_HISTORIAL = "historial_avistamientos.db"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS avistamientos (
+    id       INTEGER PRIMARY KEY,
+    ts       REAL NOT NULL,
+    ip       TEXT,
+    mac      TEXT,
+    switch   TEXT,
+    puerto   TEXT,
+    clave_puerto TEXT,
+    vlan     TEXT,
+    origen   TEXT,
+    fuente   TEXT,
+    via      TEXT,
+    estado   TEXT
+);
+CREATE INDEX IF NOT EXISTS av_ip ON avistamientos (ip, ts);
+CREATE INDEX IF NOT EXISTS av_mac ON avistamientos (mac, ts);
+CREATE INDEX IF NOT EXISTS av_puerto ON avistamientos (switch, clave_puerto, ts);
+"""
+CAMPOS = ("ts", "ip", "mac", "switch", "puerto", "vlan", "origen", "fuente", "via", "estado")
+
+
+def mac_punteada(s):
+    """'00:11:22:33:44:55' / '001122334455' / '0011.2233.4455' -> '0011.2233.4455'."""
+    h = re.sub(r"[^0-9a-fA-F]", "", s or "").lower()
+    return f"{h[0:4]}.{h[4:8]}.{h[8:12]}" if len(h) == 12 else (s or None)
+
+
+def clave_puerto(p):
+    """'GigabitEthernet1/0/5' y 'Gi1/0/5' -> 'gi1/0/5' (para comparar puertos escritos distinto)."""
+    m = re.match(r"^([A-Za-z][A-Za-z-]*?)\s*(\d.*)$", (p or "").strip())
+    return f"{m.group(1)[:2].lower()}{m.group(2)}" if m else (p or "").strip().lower() or None
+
+
+def parsear_desde(texto, ahora=None):
+    """'7d', '24h', '30m' (hacia atrás desde ahora) o fecha ISO '2026-10-01[T08:00]' -> epoch."""
+    ahora = time.time() if ahora is None else ahora
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*", texto or "")
+    if m:
+        segundos = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}[m.group(2)]
+        return ahora - float(m.group(1)) * segundos
+    return datetime.fromisoformat(texto.strip()).timestamp()
+
+
+class Historial:
+    def __init__(self, archivo=ARCHIVO_HISTORIAL):
+        self.archivo = archivo or ":memory:"
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _con(self):
+        # se abre en el primer uso (importar lucero no crea el archivo ni carga sqlite3)
+        if self._db is None:
+            import sqlite3
+            self._db = sqlite3.connect(self.archivo, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            if self.archivo != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_ESQUEMA)
+        return self._db
+
+    def cerrar(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ------------- escritura -------------
+    def _fila(self, r, via, ts):
+        # mismo orden que CAMPOS + ("clave_puerto",)
+        return (ts, r.get("ip"), mac_punteada(r.get("mac")), r.get("switch"), r.get("puerto"), r.get("vlan"),
+                r.get("origen"), r.get("fuente"), via, r.get("estado"), clave_puerto(r.get("puerto")))
+
+    def registrar_muchos(self, reportes, via="recorrido", ts=None):
+        """Guarda los reportes que resolvieron al menos la MAC. Devuelve cuántos guardó."""
+        ts = time.time() if ts is None else ts
+        filas = [self._fila(r, via, ts) for r in reportes if r.get("mac")]
+        if not filas:
+            return 0
+        with self._lock:
+            db = self._con()
+            with db:
+                db.executemany(f"INSERT INTO avistamientos ({', '.join(CAMPOS)}, clave_puerto) "
+                               f"VALUES ({', '.join('?' * (len(CAMPOS) + 1))})", filas)
+        return len(filas)
+
+    def registrar(self, reporte, via="recorrido", ts=None):
+        return self.registrar_muchos([reporte], via, ts) == 1
+
+    # ------------- consultas -------------
+    def _consultar(self, sql, params):
+        with self._lock:
+            return [dict(f) for f in self._con().execute(sql, params)]
+
+    def ultimo(self, ip=None, mac=None, edad_max=None, con_puerto=True):
+        """Último avistamiento de `ip` o `mac` (por defecto solo los que llegaron a un puerto)."""
+        donde, params = self._filtros(ip, mac, None, None,
+                                      time.time() - edad_max if edad_max else None, None)
+        if con_puerto:
+            donde.append("puerto IS NOT NULL")
+        filas = self._consultar(f"SELECT {', '.join(CAMPOS)} FROM avistamientos WHERE {' AND '.join(donde)} "
+                                "ORDER BY ts DESC LIMIT 1", params)
+        return filas[0] if filas else None
+
+    def avistamientos(self, ip=None, mac=None, switch=None, puerto=None, desde=None, hasta=None, limite=None):
+        """Avistamientos que cumplen los filtros, del más antiguo al más reciente."""
+        donde, params = self._filtros(ip, mac, switch, puerto, desde, hasta)
+        sql = f"SELECT {', '.join(CAMPOS)} FROM avistamientos WHERE {' AND '.join(donde) or '1'} ORDER BY ts"
+        if limite:
+            sql += f" LIMIT {int(limite)}"
+        return self._consultar(sql, params)
+
+    def estancias(self, **filtros):
+        """
+        Los avistamientos agrupados en estancias: tramos consecutivos en el
+        mismo (ip, mac, switch, puerto), con primera y última vez y cuántas
+        veces se vio. Responde a "¿dónde ha estado esta MAC esta semana?".
+        """
+        res = []
+        for a in self.avistamientos(**filtros):
+            clave = (a["ip"], a["mac"], a["switch"], clave_puerto(a["puerto"]))
+            if res and res[-1]["_clave"] == clave:
+                res[-1]["hasta"] = a["ts"]
+                res[-1]["veces"] += 1
+                continue
+            res.append({"_clave": clave, "ip": a["ip"], "mac": a["mac"], "switch": a["switch"],
+                        "puerto": a["puerto"], "vlan": a["vlan"], "desde": a["ts"], "hasta": a["ts"], "veces": 1})
+        for e in res:
+            del e["_clave"]
+        return res
+
+    @staticmethod
+    def _filtros(ip, mac, switch, puerto, desde, hasta):
+        donde, params = [], []
+        for col, val in (("ip", ip), ("mac", mac_punteada(mac) if mac else None), ("switch", switch),
+                         ("clave_puerto", clave_puerto(puerto) if puerto else None)):
+            if val is not None:
+                donde.append(f"{col} = ?")
+                params.append(val)
+        if desde is not None:
+            donde.append("ts >= ?")
+            params.append(desde)
+        if hasta is not None:
+            donde.append("ts <= ?")
+            params.append(hasta)
+        return donde, params
+
+
+# ----------------- CLI -----------------
+def _hora(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Consulta el historial de avistamientos sin tocar los equipos")
+    ap.add_argument("objetivo", nargs="?", help="IP o MAC")
+    ap.add_argument("--puerto", nargs=2, metavar=("SWITCH", "PUERTO"), help="quién pasó por este puerto")
+    ap.add_argument("--desde", help="7d, 24h, 30m o fecha ISO (por defecto todo)")
+    ap.add_argument("--hasta", help="mismo formato que --desde")
+    ap.add_argument("--detalle", action="store_true", help="cada avistamiento en vez de estancias")
+    ap.add_argument("--archivo", default=ARCHIVO_HISTORIAL)
+    args = ap.parse_args(argv)
+    if not (args.objetivo or args.puerto):
+        ap.error("indica una IP/MAC o --puerto SWITCH PUERTO")
+
+    filtros = {"desde": parsear_desde(args.desde) if args.desde else None,
+               "hasta": parsear_desde(args.hasta) if args.hasta else None}
+    if args.objetivo:
+        es_ip = re.fullmatch(r"\d{1,3}(\.\d{1,3}){3}", args.objetivo.strip())
+        filtros["ip" if es_ip else "mac"] = args.objetivo.strip()
+    if args.puerto:
+        filtros["switch"], filtros["puerto"] = args.puerto
+
+    h = Historial(args.archivo)
+    if args.detalle:
+        filas = h.avistamientos(**filtros)
+        for a in filas:
+            print(f"{_hora(a['ts'])}  {a['ip'] or '-':<15} {a['mac'] or '-':<14}  {a['switch'] or '-':<12} "
+                  f"{a['puerto'] or '-':<24} vlan {a['vlan'] or '?':<5} {a['fuente'] or '-'}/{a['via']}")
+    else:
+        filas = h.estancias(**filtros)
+        for e in filas:
+            print(f"{_hora(e['desde'])} → {_hora(e['hasta'])}  {e['ip'] or '-':<15} {e['mac'] or '-':<14}  "
+                  f"{e['switch'] or '-':<12} {e['puerto'] or '-':<24} vlan {e['vlan'] or '?':<5} ({e['veces']}x)")
+    if not filas:
+        print("Sin avistamientos para ese filtro.")
+    h.cerrar()
+    return 0 if filas else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+# inventario.py — inventario histórico por (equipo, clave, hora de recolección)
+#
+#   from inventario import Inventario
+#   inv = Inventario("inventario")
+#   inv.registrar("ip_int_brief", "SW1", headers, rows)      # filas de TPL / save_csv
+#   reg = inv.registro("ip_int_brief", "SW1", headers)       # o fila a fila, según llegan:
+#   reg.fila(row); ...; reg.cerrar()
+#   inv.estado("ip_int_brief", "SW1")      # estado actual de todas sus interfaces
+#   inv.equipos_con("version", "VERSION", "15.2(4)E10")
+#   inv.historia("ip_int_brief", "SW1", "Gi1/0/1")
+#
+# Cada tabla vive en su carpeta: trozos de JSON lines que solo crecen
+# (trozo-000001.jsonl, ...; se abre uno nuevo al pasar MAX_BYTES_TROZO) y un
+# indice.json con, por cada (equipo, clave), la posición (trozo, offset,
+# largo) de cada versión guardada, la huella de la última y cuándo se vio
+# por última vez. Al registrar:
+#   - si la fila no cambió (misma huella) solo se actualiza "visto" en el
+#     índice: recolectar mil veces lo mismo no hace crecer los trozos;
+#   - si cambió, se añade al trozo actual y pasa a ser la versión vigente;
+#   - cada recolección es el estado completo del equipo: las claves vigentes
+#     que no vinieron (p.ej. una interfaz que se borró) reciben una "baja"
+#     (registro con "baja": true) y dejan de aparecer en estado() y en
+#     valor -> equipos. Si vuelven, se registran como una versión nueva.
+# Los campos "volátiles" (p.ej. UPTIME) no cuentan para la huella; su último
+# valor se guarda en el índice. Para los campos indexados (VERSION, STATUS)
+# se mantiene valor -> equipos, así "¿quién corre la versión Y?" no lee los
+# trozos. Si el índice se pierde se reconstruye leyendo los trozos (solo se
+# pierde el último "visto" de las filas que no habían cambiado).
+#
+#   python inventario.py estado SW1 [--tabla ip_int_brief]
+#   python inventario.py version "15.2(4)E10"
+#   python inventario.py historia SW1 Gi1/0/1
+#   python inventario.py equipos [--tabla version]
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+DIRECTORIO = "inventario"
+MAX_BYTES_TROZO = 4 * 1024 * 1024
+
+# clave: columna que identifica la fila dentro del equipo (None = una fila por equipo)
+TABLAS = {
+    "ip_int_brief": {"clave": "INTERFACE", "volatiles": (), "indexados": ("IPADDR", "STATUS")},
+    "version": {"clave": None, "volatiles": ("UPTIME",), "indexados": ("VERSION",)},
+}
+_DEFECTO = {"clave": None, "volatiles": (), "indexados": ()}
+
+_PROMPT_RE = re.compile(r"^([A-Za-z0-9][\w.\-]{0,62})(?:\([\w\-]+\))?[>#]", re.M)
+
+
+def equipo_de_salida(texto):
+    """Hostname del último prompt que aparece en la salida de consola, o None."""
+    nombres = _PROMPT_RE.findall(texto or "")
+    return nombres[-1] if nombres else None
+
+
+def _huella(datos, volatiles):
+    estable = {k: v for k, v in datos.items() if k not in volatiles}
+    return hashlib.sha1(json.dumps(estable, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class TablaInventario:
+    def __init__(self, carpeta, clave=None, volatiles=(), indexados=()):
+        self.carpeta = carpeta
+        self.clave = clave
+        self.volatiles = tuple(volatiles)
+        self.indexados = tuple(indexados)
+        self._archivo_indice = os.path.join(carpeta, "indice.json")
+        self._lock = threading.RLock()
+        self._sucio = False
+        os.makedirs(carpeta, exist_ok=True)
+        self._cargar_indice()
+
+    # ------------- índice -------------
+    def _indice_vacio(self):
+        # equipos: equipo -> clave -> {"pos": [[trozo, offset, largo, ts], ...], "huella", "visto",
+        #                               "volatiles": {campo: último valor}, "ix": {campo indexado: valor vigente}}
+        # por_valor: campo -> valor -> {equipo: nº de claves vigentes con ese valor}
+        return {"trozo": 1, "equipos": {}, "por_valor": {c: {} for c in self.indexados}}
+
+    def _cargar_indice(self):
+        try:
+            with open(self._archivo_indice, encoding="utf-8") as f:
+                self._ix = json.load(f)
+        except (OSError, ValueError):
+            self._ix = self._indice_vacio()
+            self._reconstruir()
+
+    def _trozos(self):
+        return sorted(n for n in os.listdir(self.carpeta) if re.fullmatch(r"trozo-\d{6}\.jsonl", n))
+
+    def _reconstruir(self):
+        """Rehace el índice leyendo los trozos (solo si indice.json falta o está dañado)."""
+        trozos = self._trozos()
+        for nombre in trozos:
+            n = int(nombre[6:12])
+            with open(os.path.join(self.carpeta, nombre), "rb") as f:
+                offset = 0
+                for linea in f:
+                    try:
+                        reg = json.loads(linea)
+                    except ValueError:
+                        break   # línea a medio escribir: el resto del trozo no vale
+                    self._apuntar(reg, [n, offset, len(linea), reg["ts"]])
+                    offset += len(linea)
+        if trozos:
+            self._ix["trozo"] = int(trozos[-1][6:12])
+            self._sucio = True
+            self.guardar()
+
+    def _apuntar(self, reg, pos):
+        e = self._ix["equipos"].setdefault(reg["equipo"], {}).setdefault(reg["clave"], {"pos": []})
+        e["pos"].append(pos)
+        e["baja"] = bool(reg.get("baja"))
+        e["huella"] = None if e["baja"] else _huella(reg["datos"], self.volatiles)
+        if not e["baja"]:
+            e["visto"] = max(e.get("visto", 0), reg["ts"])
+        e["volatiles"] = {k: reg["datos"].get(k) for k in self.volatiles}
+        antes, e["ix"] = e.get("ix", {}), {c: reg["datos"].get(c) for c in self.indexados}
+        for campo in self.indexados:
+            viejo, nuevo = antes.get(campo), e["ix"][campo]
+            if viejo == nuevo:
+                continue
+            por = self._ix["por_valor"].setdefault(campo, {})
+            if viejo is not None:
+                cuenta = por.get(viejo, {})
+                cuenta[reg["equipo"]] = cuenta.get(reg["equipo"], 1) - 1
+                if cuenta[reg["equipo"]] <= 0:
+                    del cuenta[reg["equipo"]]
+                if not cuenta:
+                    por.pop(viejo, None)
+            if nuevo is not None:
+                cuenta = por.setdefault(nuevo, {})
+                cuenta[reg["equipo"]] = cuenta.get(reg["equipo"], 0) + 1
+
+    def guardar(self):
+        with self._lock:
+            if not self._sucio:
+                return
+            tmp = self._archivo_indice + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._ix, f, separators=(",", ":"))
+            os.replace(tmp, self._archivo_indice)
+            self._sucio = False
+
+    # ------------- trozos -------------
+    def _ruta_trozo(self, n):
+        return os.path.join(self.carpeta, f"trozo-{n:06d}.jsonl")
+
+    def _leer(self, posiciones):
+        """Registros en esas posiciones (mismo orden); cada trozo se abre una vez."""
+        res, abiertos = [None] * len(posiciones), {}
+        try:
+            for i, (n, offset, largo, _) in sorted(enumerate(posiciones), key=lambda x: (x[1][0], x[1][1])):
+                f = abiertos.get(n)
+                if f is None:
+                    f = abiertos[n] = open(self._ruta_trozo(n), "rb")
+                f.seek(offset)
+                res[i] = json.loads(f.read(largo))
+        finally:
+            for f in abiertos.values():
+                f.close()
+        return res
+
+    # ------------- escritura -------------
+    def registrar(self, equipo, filas, ts=None):
+        """
+        filas: dicts columna -> valor, el estado completo del equipo en esta
+        recolección. Devuelve (nuevas, sin_cambios). Las filas sin cambios
+        respecto a la versión vigente no se escriben; las claves vigentes que
+        no vienen en `filas` se dan de baja (salvo si `filas` viene vacía,
+        que es más probable que sea una recolección fallida).
+        """
+        reg = self.registro(equipo, ts)
+        for datos in filas:
+            reg.fila(datos)
+        return reg.cerrar()
+
+    def registro(self, equipo, ts=None, headers=None):
+        """Recolección de `equipo` fila a fila (ver RegistroInventario)."""
+        return RegistroInventario(self, equipo, ts, headers)
+
+    def _anexar(self, registros):
+        n = self._ix["trozo"]
+        ruta = self._ruta_trozo(n)
+        if os.path.exists(ruta) and os.path.getsize(ruta) >= MAX_BYTES_TROZO:
+            n = self._ix["trozo"] = n + 1
+            ruta = self._ruta_trozo(n)
+        with open(ruta, "ab") as f:
+            offset = f.tell()
+            for reg in registros:
+                linea = (json.dumps(reg, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                f.write(linea)
+                self._apuntar(reg, [n, offset, len(linea), reg["ts"]])
+                offset += len(linea)
+
+    # ------------- consultas -------------
+    def estado(self, equipo):
+        """Versión vigente de cada clave del equipo: [{"clave", "ts", "visto", "datos"}] (sin las dadas de baja)."""
+        with self._lock:
+            claves = sorted((c, e) for c, e in self._ix["equipos"].get(equipo, {}).items() if not e.get("baja"))
+            regs = self._leer([e["pos"][-1] for _, e in claves])
+        res = []
+        for (clave, e), reg in zip(claves, regs):
+            datos = dict(reg["datos"], **{k: v for k, v in e.get("volatiles", {}).items() if v is not None})
+            res.append({"clave": clave, "ts": reg["ts"], "visto": e["visto"], "datos": datos})
+        return res
+
+    def historia(self, equipo, clave):
+        """Todas las versiones guardadas de (equipo, clave), de la más antigua a la vigente (con las bajas)."""
+        with self._lock:
+            e = self._ix["equipos"].get(equipo, {}).get(clave)
+            return self._leer(e["pos"] if e else [])
+
+    def equipos_con(self, campo, valor):
+        with self._lock:
+            return sorted(self._ix["por_valor"].get(campo, {}).get(valor, []))
+
+    def valores(self, campo):
+        """{valor: nº de equipos} del campo indexado (p.ej. versiones presentes en la flota)."""
+        with self._lock:
+            return {v: len(eqs) for v, eqs in self._ix["por_valor"].get(campo, {}).items()}
+
+    def equipos(self):
+        with self._lock:
+            return {eq: max(e["visto"] for e in claves.values()) for eq, claves in self._ix["equipos"].items()}
+
+
+class RegistroInventario:
+    """
+    Una recolección en curso: las filas se comparan y escriben según llegan
+    (en tandas de TANDA), y cerrar() da de baja las claves que no vinieron.
+    Solo se recuerdan las claves vistas, no las filas.
+    """
+    TANDA = 256
+
+    def __init__(self, tabla, equipo, ts=None, headers=None):
+        self.tabla, self.equipo, self.headers = tabla, equipo, headers
+        self.ts = round(time.time() if ts is None else ts, 3)
+        self.nuevas = self.sin_cambios = 0
+        self._presentes, self._pendientes = set(), []
+
+    def fila(self, datos):
+        """datos: dict columna -> valor, o lista en el orden de `headers`."""
+        t = self.tabla
+        if self.headers is not None and not isinstance(datos, dict):
+            datos = dict(zip(self.headers, datos))
+        clave = str(datos.get(t.clave, "")) if t.clave else "-"
+        with t._lock:
+            self._presentes.add(clave)
+            e = t._ix["equipos"].get(self.equipo, {}).get(clave)
+            if e and e.get("huella") == _huella(datos, t.volatiles):
+                e["visto"] = max(e["visto"], self.ts)
+                e["volatiles"] = {k: datos.get(k) for k in t.volatiles}
+                self.sin_cambios += 1
+                t._sucio = True
+                return
+            self._pendientes.append({"ts": self.ts, "equipo": self.equipo, "clave": clave, "datos": datos})
+            if len(self._pendientes) >= self.TANDA:
+                self._volcar()
+
+    def _volcar(self):
+        if self._pendientes:
+            self.tabla._anexar(self._pendientes)
+            self.nuevas += sum(1 for r in self._pendientes if not r.get("baja"))
+            self.tabla._sucio = True
+            self._pendientes = []
+
+    def cerrar(self, guardar=False):
+        """Escribe lo pendiente y las bajas; devuelve (nuevas, sin_cambios). guardar=True guarda el índice."""
+        t = self.tabla
+        with t._lock:
+            if self._presentes:
+                self._pendientes += [{"ts": self.ts, "equipo": self.equipo, "clave": clave, "baja": True, "datos": {}}
+                                     for clave, e in sorted(t._ix["equipos"].get(self.equipo, {}).items())
+                                     if clave not in self._presentes and not e.get("baja")]
+            self._volcar()
+        if guardar:
+            t.guardar()
+        return self.nuevas, self.sin_cambios
+
+
+class Inventario:
+    def __init__(self, directorio=DIRECTORIO, tablas=None):
+        self.directorio = directorio
+        self._config = dict(TABLAS, **(tablas or {}))
+        self._tablas = {}
+        self._lock = threading.Lock()
+
+    def tabla(self, nombre):
+        with self._lock:
+            t = self._tablas.get(nombre)
+            if t is None:
+                cfg = dict(_DEFECTO, **self._config.get(nombre, {}))
+                t = self._tablas[nombre] = TablaInventario(os.path.join(self.directorio, nombre), **cfg)
+            return t
+
+    def registrar(self, tabla, equipo, headers, rows, ts=None, guardar=True):
+        """headers/rows como los de TPL y save_csv. Devuelve (nuevas, sin_cambios)."""
+        t = self.tabla(tabla)
+        res = t.registrar(equipo, (dict(zip(headers, r)) for r in rows), ts)
+        if guardar:
+            t.guardar()
+        return res
+
+    def registro(self, tabla, equipo, headers=None, ts=None):
+        """Recolección fila a fila: reg.fila(row) según llegan y reg.cerrar(guardar=True) al final."""
+        return self.tabla(tabla).registro(equipo, ts, headers)
+
+    def guardar(self):
+        for t in list(self._tablas.values()):
+            t.guardar()
+
+    def estado(self, tabla, equipo):
+        return self.tabla(tabla).estado(equipo)
+
+    def historia(self, tabla, equipo, clave="-"):
+        return self.tabla(tabla).historia(equipo, clave)
+
+    def equipos_con(self, tabla, campo, valor):
+        return self.tabla(tabla).equipos_con(campo, valor)
+
+
+# ----------------- CLI -----------------
+def _hora(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Consultas al inventario histórico")
+    ap.add_argument("--dir", default=DIRECTORIO)
+    sub = ap.add_subparsers(dest="orden", required=True)
+    p = sub.add_parser("estado", help="estado actual de un equipo")
+    p.add_argument("equipo")
+    p.add_argument("--tabla", default="ip_int_brief")
+    p = sub.add_parser("version", help="equipos que corren una versión (sin valor: versiones presentes)")
+    p.add_argument("valor", nargs="?")
+    p = sub.add_parser("historia", help="cambios de una clave de un equipo")
+    p.add_argument("equipo")
+    p.add_argument("clave", nargs="?", default="-")
+    p.add_argument("--tabla", default="ip_int_brief")
+    p = sub.add_parser("equipos", help="equipos conocidos y cuándo se vieron por última vez")
+    p.add_argument("--tabla", default="version")
+    args = ap.parse_args(argv)
+
+    inv = Inventario(args.dir)
+    if args.orden == "estado":
+        filas = inv.estado(args.tabla, args.equipo)
+        for f in filas:
+            print(f"{f['clave']:<26} " + "  ".join(f"{v}" for k, v in f["datos"].items() if k != inv.tabla(args.tabla).clave)
+                  + f"   (desde {_hora(f['ts'])}, visto {_hora(f['visto'])})")
+    elif args.orden == "version":
+        t = inv.tabla("version")
+        if args.valor:
+            filas = t.equipos_con("VERSION", args.valor)
+            print("\n".join(filas))
+        else:
+            filas = sorted(t.valores("VERSION").items())
+            for v, n in filas:
+                print(f"{v:<30} {n} equipos")
+    elif args.orden == "historia":
+        filas = inv.historia(args.tabla, args.equipo, args.clave)
+        for r in filas:
+            print(f"{_hora(r['ts'])}  " + ("(baja)" if r.get("baja") else "  ".join(f"{k}={v}" for k, v in r["datos"].items())))
+    else:
+        filas = sorted(inv.tabla(args.tabla).equipos().items())
+        for eq, visto in filas:
+            print(f"{eq:<24} visto {_hora(visto)}")
+    if not filas:
+        print("Sin datos.")
+    return 0 if filas else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
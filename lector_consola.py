@@ -0,0 +1,107 @@
+# lector_consola.py — lectura de la consola serie hasta el prompt, en tiempo lineal
+#
+#   from lector_consola import LectorPrompt
+#   lector = LectorPrompt(ser)
+#   salida = lector.comando("show version")          # texto completo (eco + respuesta + prompt)
+#   for trozo in lector.comando_trozos("show run"):  # o en trozos según llegan
+#       print(trozo, end="")
+#
+# Los bytes se decodifican con un decodificador UTF-8 incremental (una sola
+# vez cada byte) y solo se mira la cola desde el último salto de línea para
+# detectar el prompt o el "--More--" de paginación. No hay sleep: la lectura
+# bloquea en el puerto hasta que llega algo, así que se devuelve en cuanto
+# aparece el prompt.
+
+import codecs
+import re
+import time
+
+# Detecta prompt típico de Cisco (ej: Router> o R1#, también R1(config)#)
+PROMPT_RE = re.compile(r"[^\r\n]{1,64}[>#]\s?$")
+# Paginación de IOS: " --More-- " al final de la pantalla
+MORE_RE = re.compile(r" ?--More-- ?$")
+# Tras el espacio, IOS borra el "--More--" con retrocesos y espacios
+BORRADO_RE = re.compile(r"\x08+ *\x08*")
+
+MAX_COLA = 4096   # una "línea" más larga que esto sin salto se entrega igual
+
+
+class LectorPrompt:
+    def __init__(self, ser, prompt_re=PROMPT_RE, encoding="utf-8", paginar=True, timeout_lectura=0.2):
+        self.ser = ser
+        self.prompt_re = prompt_re
+        self.encoding = encoding
+        self.paginar = paginar
+        self.timeout_lectura = timeout_lectura
+        self.prompt = ""      # último prompt visto
+        self.vio_prompt = False
+
+    def enviar(self, comando):
+        self.ser.write((comando + "\r\n").encode(self.encoding, errors="ignore"))
+
+    def trozos(self, espera_max=3.0, silencio=None, tras_linea=True):
+        """
+        Entrega el texto según llega (líneas completas en cuanto llega su salto)
+        hasta ver el prompt. Termina también si en `espera_max` s no llega nada,
+        o si una vez empezada la respuesta pasan `silencio` s sin datos
+        (por defecto igual a espera_max). Con tras_linea=True el prompt solo
+        cuenta después del primer salto de línea (el eco del comando).
+        """
+        silencio = espera_max if silencio is None else silencio
+        dec = codecs.getincrementaldecoder(self.encoding)(errors="ignore")
+        cola = ""               # texto desde el último salto de línea (aún no entregado)
+        linea_vista = not tras_linea
+        recibido = False
+        self.vio_prompt = False
+        ultimo = time.monotonic()
+        timeout_orig = self.ser.timeout
+        self.ser.timeout = min(self.timeout_lectura, timeout_orig or self.timeout_lectura)
+        try:
+            while True:
+                datos = self.ser.read(self.ser.in_waiting or 1)
+                ahora = time.monotonic()
+                if not datos:
+                    if ahora - ultimo >= (silencio if recibido else espera_max):
+                        break
+                    continue
+                recibido, ultimo = True, ahora
+                texto = dec.decode(datos)
+                if not texto:
+                    continue
+                corte = texto.rfind("\n")
+                if corte != -1:
+                    linea_vista = True
+                    listo = cola + texto[:corte + 1]
+                    cola = texto[corte + 1:]
+                    yield BORRADO_RE.sub("", listo) if "\x08" in listo else listo
+                else:
+                    cola += texto
+                if "\x08" in cola:
+                    cola = BORRADO_RE.sub("", cola)
+                if self.paginar and MORE_RE.search(cola):
+                    cola = MORE_RE.sub("", cola)
+                    self.ser.write(b" ")
+                    continue
+                if linea_vista and not self.ser.in_waiting and self.prompt_re.search(cola):
+                    self.prompt, self.vio_prompt = cola.strip(), True
+                    break
+                if len(cola) > MAX_COLA:
+                    yield cola
+                    cola = ""
+        finally:
+            self.ser.timeout = timeout_orig
+        cola += dec.decode(b"", final=True)
+        if cola:
+            yield cola
+
+    def leer(self, espera_max=3.0, silencio=None, tras_linea=True):
+        return "".join(self.trozos(espera_max, silencio, tras_linea))
+
+    def comando_trozos(self, comando, espera_max=3.0, silencio=None):
+        self.enviar(comando)
+        yield from self.trozos(espera_max, silencio)
+
+    def comando(self, comando, espera_max=3.0, silencio=None):
+        """Envía el comando y devuelve la salida completa (eco + respuesta + nuevo prompt)."""
+        self.enviar(comando)
+        return self.leer(espera_max, silencio)
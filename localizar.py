@@ -0,0 +1,141 @@
+# localizar.py — cliente de servicio_localizador.py (solo biblioteca estándar: arranca al instante)
+#
+#   python localizar.py 10.0.0.5                  # una IP
+#   python localizar.py 10.0.0.5 10.0.0.9 ...     # varias (en paralelo contra el servicio)
+#   python localizar.py --lote ips.txt            # IPs/CIDR de un archivo, en una sola pasada
+#   python localizar.py                           # interactivo, como lucero.py
+#   python localizar.py --estado
+#
+# Opciones: --motor lucero|uni2, --fresco (ignora el reporte reciente),
+# --json (una línea JSON por reporte), --servidor URL (o LOCALIZADOR_URL).
+
+import argparse
+import json
+import os
+import re
+import socket
+import sys
+from urllib.parse import urlencode, urlsplit
+
+SERVIDOR = os.environ.get("LOCALIZADOR_URL", "http://127.0.0.1:8765")
+TIMEOUT_S = 300   # un recorrido completo en frío puede tardar
+
+
+def _pedir(servidor, ruta, cuerpo=None):
+    # HTTP/1.0 directo sobre socket: urllib/http.client arrastran el paquete
+    # email y duplican el arranque del cliente. El servicio cierra la conexión
+    # tras cada respuesta, así que basta con leer hasta el final.
+    u = urlsplit(servidor)
+    datos = b"" if cuerpo is None else json.dumps(cuerpo).encode("utf-8")
+    peticion = (f"{'GET' if cuerpo is None else 'POST'} {ruta} HTTP/1.0\r\nHost: {u.netloc}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(datos)}\r\n\r\n").encode("ascii")
+    try:
+        with socket.create_connection((u.hostname, u.port or 80), timeout=TIMEOUT_S) as s:
+            s.sendall(peticion + datos)
+            resp = b"".join(iter(lambda: s.recv(65536), b""))
+    except OSError as e:
+        raise RuntimeError(f"no hay servicio en {servidor} ({e}); "
+                           f"arráncalo con: python servicio_localizador.py") from None
+    cabecera, _, cuerpo = resp.partition(b"\r\n\r\n")
+    try:
+        codigo = int(cabecera.split(None, 2)[1])
+        respuesta = json.loads(cuerpo or b"{}")
+    except (IndexError, ValueError):
+        raise RuntimeError(f"respuesta inválida de {servidor}") from None
+    if codigo != 200:
+        raise RuntimeError(f"el servicio respondió {codigo}: {respuesta.get('error')}")
+    return respuesta
+
+
+def localizar(ip, servidor=SERVIDOR, motor="lucero", fresco=False):
+    q = {"ip": ip, "motor": motor}
+    if fresco:
+        q["fresco"] = "1"
+    return _pedir(servidor, "/localizar?" + urlencode(q))
+
+
+def lote(objetivos, servidor=SERVIDOR):
+    return _pedir(servidor, "/lote", {"ips": list(objetivos)})
+
+
+def estado(servidor=SERVIDOR):
+    return _pedir(servidor, "/estado")
+
+
+def imprimir(r, segundos=None, cache=False):
+    extra = f"  ({segundos:.2f}s{', reciente' if cache else ''})" if segundos is not None else ""
+    if r.get("estado") == "ok":
+        print(f"✅ {r['ip']:<15} -> {r.get('switch')} {r.get('puerto')}  MAC {r.get('mac')}  "
+              f"VLAN {r.get('vlan') or '?'}"
+              + (f"  {r['tipo_puerto']} vecino:{'sí' if r.get('vecino') else 'no'} MACs:{r.get('mac_count')}"
+                 if r.get("tipo_puerto") else "")
+              + extra)
+    elif r.get("estado") in ("sin-mac", "negativo"):
+        print(f"⛔ {r['ip']:<15} sin MAC ({r['estado']}){extra}")
+    else:
+        print(f"⚠ {r['ip']:<15} MAC {r.get('mac')} sin puerto (origen {r.get('origen')}){extra}")
+
+
+def interactivo(args):
+    print(f"--- Localizador ({args.servidor}) ---")
+    while True:
+        try:
+            ip = input("\n>>> IP a localizar (o 'salir'): ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        if ip.lower() in ("salir", "exit", "quit"):
+            break
+        if not re.match(r"^\d{1,3}(\.\d{1,3}){3}$", ip):
+            print("[!] Formato IP inválido. Ej: 192.168.1.30")
+            continue
+        try:
+            res = localizar(ip, args.servidor, args.motor, args.fresco)
+            imprimir(res["reporte"], res["segundos"], res["cache"])
+        except RuntimeError as e:
+            print(f"[!!] {e}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cliente del servicio de localización de IPs")
+    ap.add_argument("ips", nargs="*", help="IPs a localizar")
+    ap.add_argument("--lote", metavar="ARCHIVO", help="archivo con una IP o CIDR por línea")
+    ap.add_argument("--motor", choices=("lucero", "uni2"), default="lucero")
+    ap.add_argument("--fresco", action="store_true", help="no reutilizar el reporte reciente de la IP")
+    ap.add_argument("--json", action="store_true", help="una línea JSON por reporte")
+    ap.add_argument("--estado", action="store_true", help="contadores del servicio")
+    ap.add_argument("--servidor", default=SERVIDOR)
+    args = ap.parse_args(argv)
+
+    try:
+        if args.estado:
+            print(json.dumps(estado(args.servidor), ensure_ascii=False, indent=2))
+            return 0
+        if args.lote:
+            with open(args.lote, encoding="utf-8") as f:
+                res = lote(f.read().splitlines(), args.servidor)
+            resultados = [(r, None, False) for r in res["reportes"]]
+        elif args.ips:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(8, len(args.ips))) as ex:
+                resultados = [(x["reporte"], x["segundos"], x["cache"]) for x in
+                              ex.map(lambda ip: localizar(ip, args.servidor, args.motor, args.fresco), args.ips)]
+        else:
+            return interactivo(args)
+    except RuntimeError as e:
+        print(f"[!!] {e}", file=sys.stderr)
+        return 2
+
+    for r, segundos, cache in resultados:
+        if args.json:
+            print(json.dumps(r, ensure_ascii=False))
+        else:
+            imprimir(r, segundos, cache)
+    if args.lote and not args.json:
+        print(f"{sum(1 for r, _, _ in resultados if r.get('estado') == 'ok')}/{len(resultados)} IPs localizadas "
+              f"en {res['segundos']:.1f}s")
+    return 0 if all(r.get("estado") == "ok" for r, _, _ in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
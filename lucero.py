@@ -1,33 +1,31 @@
 # ip_port_finder.py — misma lógica; parsers y variantes reforzadas
 
-from netmiko import ConnectHandler
-import re, sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import re, sys, threading, time
+import argparse, csv, ipaddress, json
+from sesiones import CanalDesincronizado, enviar_lote, pool_con_cierre
+from cache_puertos import CachePuertos
+from coincidencias import MAC_PATTERNS, MatcherDirecciones, normalizar_mac, primera_linea_con_ip, tokens_ip, tokens_mac
+from capacidades import PerfilCapacidades
+from planificador import COSTO_FILTRADO, MemoTablas, costo, planificar
+from metricas import Metricas, logger_consola, plantilla_comando
+from historial import Historial, clave_puerto
+import atexit, logging
 
-# ==== MODO DISCRETO: oculta prints de conexiones por switch ====
-import builtins as _bi
-def enable_discreet_mode():
+# ==== MODO DISCRETO: oculta mensajes de conexiones por switch ====
+# Los mensajes por switch (consultas, hallazgos intermedios, errores de equipo)
+# van al logger "lucero": INFO los muestra, ERROR los oculta y DEBUG añade un
+# span por conexión, comando y parseo (ver metricas.py).
+log = logger_consola("lucero")
+METRICAS = Metricas(log)
+
+def enable_discreet_mode(nivel=logging.ERROR):
     """
     Oculta mensajes que delatan conexión/consulta a cada switch,
     dejando visibles encabezados, resultados y errores finales.
-    NO cambia la lógica del script: solo filtra ciertos prints.
+    NO cambia la lógica del script: solo sube el nivel del logger.
     """
-    _orig_print = _bi.print
-    HIDE_IF_CONTAINS = (
-        "↪ Consultando [",        # ETAPA 1: probando cada switch
-        "↪ Buscando MAC",         # ETAPA 2: probando cada switch
-        "... Sin registros para", # salida intermedia por switch
-        "... MAC vista en",       # hallazgo por switch
-        "ERROR conectando a",     # errores por equipo intermedio
-    )
-    def _filtered_print(*args, **kwargs):
-        try:
-            msg = " ".join(str(a) for a in args)
-        except Exception:
-            msg = ""
-        if any(token in msg for token in HIDE_IF_CONTAINS):
-            return  # suprime mensaje discreto
-        return _orig_print(*args, **kwargs)
-    _bi.print = _filtered_print
+    log.setLevel(nivel)
 # ===============================================================
 
 EQUIPOS_RED = [
@@ -37,14 +35,45 @@ EQUIPOS_RED = [
 ]
 VLAN_BUSQUEDA = "1"
 
-MAC_PATTERNS = [
-    r"[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}",
-    r"[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}",
-    r"[0-9a-fA-F]{12}",
-]
+# Ejecución concurrente de ETAPA 1 y ETAPA 2 (pool acotado de hilos, uno por sesión SSH)
+MODO_CONCURRENTE = True
+MAX_WORKERS = 8
+
+# Sesiones SSH persistentes: se reutilizan entre etapas y entre búsquedas
+SESION_MAX_INACTIVA = 300   # seg. sin uso antes de cerrar la sesión
+SESION_KEEPALIVE = 60       # seg. entre comprobaciones de canal vivo
+
+# Índice en memoria de tablas ARP / DHCP-snooping / device-tracking / MAC
+USAR_INDICE = True
+TTL_TABLAS = {"dhcp": 300, "arp": 120, "tracking": 300, "mac": 60}   # seg. de frescura por tabla
+TTL_NEGATIVO = 60           # seg. que se recuerda una IP no encontrada
+
+# Modo lote: la red más grande que se acepta expandir (/16 = 65534 IPs)
+LOTE_PREFIJO_MIN = 16
 
-def normalizar_mac(s): 
-    return re.sub(r"[^0-9a-fA-F]", "", s or "").lower()
+# Caché de caracterización de puertos (switch, interfaz)
+CACHE_TTL_LENTO = 3600      # trunk/access, VLANs, vecino CDP/LLDP
+CACHE_TTL_VOLATIL = 60      # mac_count
+CACHE_MAX_PUERTOS = 4096
+CACHE_PUERTOS_ARCHIVO = None  # p.ej. "cache_puertos.json" para conservarla entre ejecuciones
+
+# Historial de avistamientos (SQLite): cada resolución se guarda y la siguiente
+# búsqueda de la misma IP prueba primero su última ubicación conocida
+USAR_HISTORIAL = True
+HISTORIAL_ARCHIVO = "historial_avistamientos.db"
+HISTORIAL_EDAD_MAX = 7 * 86400   # seg. que una ubicación previa se usa como pista
+
+# Perfil aprendido por equipo: qué variantes de comando responden y cuánto tardan
+CAPACIDADES_ARCHIVO = "capacidades_equipos.json"
+
+# Varios 'show' en una sola escritura (un viaje de ida y vuelta): los de la
+# caracterización de un puerto y las variantes filtradas de ETAPA 1
+LOTE_COMANDOS = True
+
+# Planificador por costo: las variantes de búsqueda van filtradas -> por VLAN
+# -> tabla completa, y cada tabla completa se recuerda en la sesión (con el
+# TTL de TTL_TABLAS) para responder las variantes siguientes sin reenviarla
+PLANIFICAR_POR_COSTO = True
 
 def buscar_mac_en_texto(txt):
     for p in MAC_PATTERNS:
@@ -52,11 +81,15 @@ def buscar_mac_en_texto(txt):
         if m: return m.group(0)
     return None
 
+def es_error_cli(out):
+    return re.search(r"^\s*% ?(Invalid|Incomplete|Ambiguous|Unknown)", out or "", re.M) is not None
+
 def line_contains_ip(line, ip):
     # Coincidencia con bordes para no confundir 1.1.1.1 dentro de 11.1.1.10
     return re.search(rf"(?<!\d){re.escape(ip)}(?!\d)", line or "") is not None
 
 def conectar(dev):
+    from netmiko import ConnectHandler   # trae paramiko/cryptography: solo al abrir la primera sesión
     params = {
         "device_type": dev["device_type"],
         "host": dev["ip"],
@@ -66,14 +99,48 @@ def conectar(dev):
         "global_delay_factor": 1.0,
     }
     if dev.get("secret"): params["secret"] = dev["secret"]
-    c = ConnectHandler(**params)
+    if dev.get("port"): params["port"] = dev["port"]
+    with METRICAS.span("conexion", dev["host_name"]):
+        c = METRICAS.sesion(ConnectHandler(**params), dev["host_name"])
     try: c.send_command_timing("terminal length 0", strip_command=False)
     except: pass
     try:
         if dev.get("secret"): c.enable()
     except: pass
+    # si cambió el software del equipo, lo aprendido de sus comandos ya no vale
+    # (se mira una vez por equipo y proceso, no en cada sesión nueva)
+    if not PERFILES.version_validada(dev["ip"]):
+        try:
+            ver = c.send_command("show version | include Version", use_textfsm=False, read_timeout=15)
+            PERFILES.validar_version(dev["ip"], (ver or "").strip().splitlines()[0] if (ver or "").strip() else None)
+        except: pass
     return c
 
+PERFILES = PerfilCapacidades(CAPACIDADES_ARCHIVO)
+atexit.register(PERFILES.guardar)
+
+POOL = pool_con_cierre(conectar, max_inactiva=SESION_MAX_INACTIVA, keepalive=SESION_KEEPALIVE)
+
+CACHE_PUERTOS = CachePuertos(CACHE_TTL_LENTO, CACHE_TTL_VOLATIL, CACHE_MAX_PUERTOS, CACHE_PUERTOS_ARCHIVO)
+
+HISTORIAL = Historial(HISTORIAL_ARCHIVO)
+atexit.register(CACHE_PUERTOS.persistir)
+
+def _ttl_tabla(cmd):
+    """TTL del índice para la tabla que descarga `cmd` (el menor si no es una de las indexadas)."""
+    return next((INDICE.ttl[t] for t, cmds in IndiceRed.COMANDOS.items() if cmd in cmds), min(INDICE.ttl.values()))
+
+MEMO = MemoTablas(_ttl_tabla)
+
+def _enviar(sesion, cmd, read_timeout, fresco=False):
+    """send_command con el memo de tablas de la sesión delante (fresco=True no lo lee)."""
+    out = None if fresco or not PLANIFICAR_POR_COSTO else MEMO.obtener(sesion, cmd)
+    if out is None:
+        out = sesion.send_command(cmd, use_textfsm=False, read_timeout=read_timeout)
+        if PLANIFICAR_POR_COSTO and not es_error_cli(out):
+            MEMO.guardar(sesion, cmd, out)
+    return out
+
 def extraer_vlan_de_interfaz(ifn):
     m = re.search(r"[Vv]lan(\d+)", ifn or "")
     return m.group(1) if m else None
@@ -104,10 +171,50 @@ def es_puerto_fisico_48(p):
     return bool(m and int(m.group(2)) <= 48)
 
 # ----------------- ETAPA 1: IP -> MAC -----------------
-def descubrir_mac_por_ip(sesion, ip_addr):
+# Parsers por línea (compartidos por la consulta en vivo y por el índice)
+def _info_dhcp(linea, ip_addr):
+    mac = buscar_mac_en_texto(linea)
+    vlan_id, ifz = None, None
+    # patron robusto: <IP> <MAC> <Lease/Type> <VLAN> <Interface>
+    m = re.search(r"\s(\d+)\s+([A-Za-z]+\d+(?:/\d+)*\S*)", linea)
+    if m: vlan_id, ifz = m.group(1), m.group(2)
+    if not vlan_id: vlan_id = extraer_vlan_de_texto(linea)
+    if not vlan_id and ifz: vlan_id = extraer_vlan_de_interfaz(ifz)
+    if mac:
+        return {"ip": ip_addr, "hw_addr": mac, "fuente": "dhcp", "vlan_id": vlan_id, "ifaz": ifz}
+    return None
+
+def _info_arp(linea, ip_addr, fuente="arp-scan"):
+    mac = buscar_mac_en_texto(linea)
+    # termina con interfaz
+    m_if = re.search(r"\s([A-Za-z0-9/\.]+)\s*$", linea)
+    ifz = m_if.group(1) if m_if else None
+    vlan_id = extraer_vlan_de_interfaz(ifz or "") or extraer_vlan_de_texto(linea)
+    if mac:
+        return {"ip": ip_addr, "hw_addr": mac, "fuente": fuente, "vlan_id": vlan_id, "ifaz": ifz}
+    return None
+
+def _info_tracking(linea, vlan_out, ip_addr):
+    # vlan_out: VLAN encontrada en la salida completa del comando
+    mac = buscar_mac_en_texto(linea)
+    m_if = re.search(r"\s([A-Za-z]+[0-9/\.]+)\s", linea)
+    ifz = m_if.group(1) if m_if else None
+    vlan_id = vlan_out or extraer_vlan_de_interfaz(ifz or "")
+    if mac:
+        return {"ip": ip_addr, "hw_addr": mac, "fuente": "device-tracking", "vlan_id": vlan_id, "ifaz": ifz}
+    return None
+
+def _info_ip(tabla, linea, ip_addr, vlan_out=None):
+    """Parser de la línea según la tabla de IP de donde viene ('dhcp', 'arp' o 'tracking')."""
+    if tabla == "dhcp": return _info_dhcp(linea, ip_addr)
+    if tabla == "arp": return _info_arp(linea, ip_addr)
+    return _info_tracking(linea, vlan_out, ip_addr)
+
+def _mac_de_interfaz_local(sesion, ip_addr, out=None):
     # (A) IP DEL MISMO SWITCH (SVI/Loopback/mgmt)
     try:
-        out = sesion.send_command(f"show ip interface brief | include {ip_addr}", use_textfsm=False, read_timeout=20)
+        if out is None:
+            out = sesion.send_command(f"show ip interface brief | include {ip_addr}", use_textfsm=False, read_timeout=20)
         if line_contains_ip(out, ip_addr):
             # línea tipo: Vlan10   192.168.1.1   YES manual up up
             m_if = re.search(rf"^(\S+)\s+{re.escape(ip_addr)}\b", out, re.M)
@@ -121,255 +228,889 @@ def descubrir_mac_por_ip(sesion, ip_addr):
                 if mac:
                     return {"ip": ip_addr, "hw_addr": mac, "fuente": "local-if", "vlan_id": vlan_id, "ifaz": ifz}
     except: pass
+    return None
 
-    # (B) DHCP Snooping
-    for cmd in (f"show ip dhcp snooping binding | include {ip_addr}", "show ip dhcp snooping binding"):
-        try:
-            out = sesion.send_command(cmd, use_textfsm=False, read_timeout=20)
-            if not out: continue
-            # busca línea exacta que contenga esa IP
-            linea = next((l for l in out.splitlines() if line_contains_ip(l, ip_addr)), "")
-            if not linea: 
-                continue
-            mac = buscar_mac_en_texto(linea)
-            vlan_id, ifz = None, None
-            # patron robusto: <IP> <MAC> <Lease/Type> <VLAN> <Interface>
-            m = re.search(r"\s(\d+)\s+([A-Za-z]+\d+(?:/\d+)*\S*)", linea)
-            if m: vlan_id, ifz = m.group(1), m.group(2)
-            if not vlan_id: vlan_id = extraer_vlan_de_texto(linea)
-            if not vlan_id and ifz: vlan_id = extraer_vlan_de_interfaz(ifz)
-            if mac:
-                return {"ip": ip_addr, "hw_addr": mac, "fuente": "dhcp", "vlan_id": vlan_id, "ifaz": ifz}
-        except: pass
+def _variante_ip(plantilla, parser, read_timeout):
+    """
+    Variante de ETAPA 1 que corre un comando y busca la línea de la IP.
+    `consultar.comando(ip)` dice qué comando es (lo usan el planificador y la
+    precarga en lote); `out` trae la salida si ya se recibió.
+    """
+    def consultar(sesion, ip_addr, out=None, fresco=False):
+        if out is None:
+            out = _enviar(sesion, plantilla.format(ip=ip_addr), read_timeout, fresco)
+        if es_error_cli(out): return "error", None
+        with METRICAS.span("parseo", getattr(sesion, "equipo", None), plantilla_comando(plantilla)):
+            linea = primera_linea_con_ip(out, ip_addr)
+            info = parser(linea, out, ip_addr) if linea else None
+        return ("ok" if info else "vacio"), info
+    consultar.comando = lambda ip_addr: plantilla.format(ip=ip_addr)
+    return consultar
+
+def _variante_local_if(sesion, ip_addr, out=None, fresco=False):
+    info = _mac_de_interfaz_local(sesion, ip_addr, out)
+    return ("ok" if info else "vacio"), info
+_variante_local_if.comando = lambda ip_addr: f"show ip interface brief | include {ip_addr}"
+
+_dhcp = lambda linea, out, ip: _info_dhcp(linea, ip)
+_arp = lambda linea, out, ip: _info_arp(linea, ip)
+_tracking = lambda linea, out, ip: _info_tracking(linea, extraer_vlan_de_texto(out), ip)
 
+# Orden por defecto de ETAPA 1; el perfil de cada equipo lo reordena y salta las muertas
+VARIANTES_IP = (
+    # (A) IP DEL MISMO SWITCH (SVI/Loopback/mgmt)
+    ("local-if", _variante_local_if),
+    # (B) DHCP Snooping
+    ("dhcp-inc", _variante_ip("show ip dhcp snooping binding | include {ip}", _dhcp, 20)),
+    ("dhcp", _variante_ip("show ip dhcp snooping binding", _dhcp, 20)),
     # (C) ARP puntual (variante clásica y formato “Protocol Address …”)
+    ("arp-ip", _variante_ip("show ip arp {ip}", lambda linea, out, ip: _info_arp(linea, ip, fuente="arp"), 20)),
+    # (D) ARP general (incluye VRFs)
+    ("arp", _variante_ip("show ip arp", _arp, 25)),
+    ("arp-all", _variante_ip("show arp", _arp, 25)),
+    ("arp-vrf", _variante_ip("show ip arp vrf all", _arp, 25)),
+    # (E) IP Device Tracking (variantes)
+    ("ipdt-inc", _variante_ip("show ip device tracking all | include {ip}", _tracking, 25)),
+    ("ipdt", _variante_ip("show ip device tracking all", _tracking, 25)),
+    ("sisf-inc", _variante_ip("show device tracking database | include {ip}", _tracking, 25)),
+    ("sisf", _variante_ip("show device tracking database", _tracking, 25)),
+)
+
+def _precargar(sesion, ordenadas, *args, fresco=False):
+    """
+    Manda juntos los comandos filtrados (salida corta) que el memo no responde
+    y devuelve ({clave: salida}, segundos por comando). Si el lote falla (con
+    el canal ya vaciado) cada variante hará su propio send_command; si el
+    canal quedó desincronizado la excepción sube y el pool cierra la sesión.
+    """
+    claves = [(clave, consultar.comando(*args)) for clave, consultar in ordenadas]
+    claves = [(clave, cmd) for clave, cmd in claves
+              if costo(cmd) == COSTO_FILTRADO and (fresco or not (PLANIFICAR_POR_COSTO and MEMO.responde(sesion, cmd)))]
+    if not LOTE_COMANDOS or len(claves) < 2:
+        return {}, 0.0
+    t0 = time.time()
     try:
-        out = sesion.send_command(f"show ip arp {ip_addr}", use_textfsm=False, read_timeout=20)
-        if out and line_contains_ip(out, ip_addr):
-            linea = next((l for l in out.splitlines() if line_contains_ip(l, ip_addr)), "")
-            mac = buscar_mac_en_texto(linea)
-            # termina con interfaz
-            m_if = re.search(r"\s([A-Za-z0-9/\.]+)\s*$", linea)
-            ifz = m_if.group(1) if m_if else None
-            vlan_id = extraer_vlan_de_interfaz(ifz or "") or extraer_vlan_de_texto(linea)
-            if mac:
-                return {"ip": ip_addr, "hw_addr": mac, "fuente": "arp", "vlan_id": vlan_id, "ifaz": ifz}
-    except: pass
+        salidas = enviar_lote(sesion, [cmd for _, cmd in claves], read_timeout=25)
+    except CanalDesincronizado:
+        raise
+    except Exception as e:
+        log.debug(f"  lote de {len(claves)} comandos falló en {getattr(sesion, 'host', '?')}: {e}")
+        return {}, 0.0
+    return {clave: out for (clave, _), out in zip(claves, salidas)}, (time.time() - t0) / len(claves)
 
-    # (D) ARP general (incluye VRFs)
-    for cmd in ("show ip arp", "show arp", "show ip arp vrf all"):
+def _probar_variantes(sesion, variantes, *args, precargar=False, fresco=False, parar_en_vacio=False):
+    """
+    Recorre las variantes en el orden aprendido para el equipo (y, con
+    PLANIFICAR_POR_COSTO, por clase de costo) y registra cada intento. Con
+    precargar=True las filtradas se piden antes en un solo lote; fresco=True
+    pregunta siempre al equipo (sin el memo de tablas); parar_en_vacio=True
+    termina en la primera que responde sin error (todas miran la misma tabla).
+    """
+    equipo = getattr(sesion, "host", None)
+    ordenadas = PERFILES.ordenar(equipo, variantes)
+    if PLANIFICAR_POR_COSTO:
+        ordenadas = planificar(ordenadas, lambda consultar: consultar.comando(*args), None if fresco else MEMO, sesion)
+    precargadas, t_lote = _precargar(sesion, ordenadas, *args, fresco=fresco) if precargar else ({}, 0.0)
+    for clave, consultar in ordenadas:
+        t0 = time.time()
         try:
-            out = sesion.send_command(cmd, use_textfsm=False, read_timeout=25)
-            if not out: continue
-            linea = next((l for l in out.splitlines() if line_contains_ip(l, ip_addr)), "")
-            if not linea: 
-                continue
-            mac = buscar_mac_en_texto(linea)
-            m_if = re.search(r"\s([A-Za-z0-9/\.]+)\s*$", linea)
-            ifz = m_if.group(1) if m_if else None
-            vlan_id = extraer_vlan_de_interfaz(ifz or "") or extraer_vlan_de_texto(linea)
-            if mac:
-                return {"ip": ip_addr, "hw_addr": mac, "fuente": "arp-scan", "vlan_id": vlan_id, "ifaz": ifz}
-        except: pass
+            if clave in precargadas:
+                estado, res = consultar(sesion, *args, out=precargadas[clave])
+            else:
+                estado, res = consultar(sesion, *args, fresco=fresco)
+        except CanalDesincronizado:
+            raise   # no es culpa de la variante: la sesión ya no sirve
+        except Exception:
+            estado, res = "timeout", None   # no cuenta para dar la variante por muerta
+        PERFILES.registrar(equipo, clave, estado, time.time() - t0 + (t_lote if clave in precargadas else 0.0))
+        if res or (parar_en_vacio and estado == "vacio"):
+            return res
+    return None
 
-    # (E) IP Device Tracking (variantes)
-    for cmd in (f"show ip device tracking all | include {ip_addr}",
-                "show ip device tracking all",
-                f"show device tracking database | include {ip_addr}",
-                "show device tracking database"):
-        try:
-            out = sesion.send_command(cmd, use_textfsm=False, read_timeout=25)
-            if not out: continue
-            linea = next((l for l in out.splitlines() if line_contains_ip(l, ip_addr)), "")
-            if not linea: 
-                continue
-            mac = buscar_mac_en_texto(linea)
-            m_if = re.search(r"\s([A-Za-z]+[0-9/\.]+)\s", linea)
-            ifz = m_if.group(1) if m_if else None
-            vlan_id = extraer_vlan_de_texto(out) or extraer_vlan_de_interfaz(ifz or "")
-            if mac:
-                return {"ip": ip_addr, "hw_addr": mac, "fuente": "device-tracking", "vlan_id": vlan_id, "ifaz": ifz}
-        except: pass
+def _filtradas(variantes, *args):
+    """Las variantes cuyo comando trae solo unas líneas (| include, address, IP puntual)."""
+    return [v for v in variantes if costo(v[1].comando(*args)) == COSTO_FILTRADO]
 
-    return None
+def descubrir_mac_por_ip(sesion, ip_addr, solo_filtradas=False):
+    """
+    IP -> MAC probando las variantes de ETAPA 1. Con solo_filtradas=True se
+    usan únicamente las consultas baratas y siempre contra el equipo (para
+    cuando el índice está fresco pero no tiene la IP).
+    """
+    if solo_filtradas:
+        return _probar_variantes(sesion, _filtradas(VARIANTES_IP, ip_addr), ip_addr, precargar=True, fresco=True)
+    return _probar_variantes(sesion, VARIANTES_IP, ip_addr, precargar=True)
 
 # ----------- Caracterización del puerto (uplink vs access) -------------
-def caracterizar_puerto(sesion, ifname):
+def _switchport(sw, data):
+    if re.search(r"(Operational|Administrative)\s+Mode:\s*trunk", sw or "", re.I): data["is_trunk"] = True
+    if re.search(r"Access Mode VLAN:", sw or "", re.I) and not data["is_trunk"]: data["is_access"] = True
+    m = re.search(r"Access Mode VLAN:\s*(\d+)", sw or "", re.I)
+    if m: data["access_vlan"] = m.group(1)
+    m = re.search(r"Trunking Native Mode VLAN:\s*(\d+)", sw or "", re.I)
+    if m: data["native_vlan"] = m.group(1)
+
+def _vecino_cdp(cdp, data):
+    if re.search(r"Device ID|System Name", cdp or "", re.I): data["has_neighbor"] = True
+
+def _vecino_lldp(lldp, data):
+    if re.search(r"System Name|Chassis id", lldp or "", re.I): data["has_neighbor"] = True
+
+def _contar_macs(out, data):
+    cnt = len(re.findall(r"(?i)\bDYNAMIC\b", out or "")) or len(re.findall(r"[0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4}", out or "", re.I))
+    data["mac_count"] = cnt
+
+# Partes de la caracterización, cada una con su TTL en CACHE_PUERTOS:
+# parte -> [(comando, read_timeout, intérprete(salida, data))]
+PARTES_PUERTO = (
+    ("lento", (("show interfaces {if} switchport", 20, _switchport),          # trunk/access y VLANs
+               ("show cdp neighbors interface {if} detail", 15, _vecino_cdp),
+               ("show lldp neighbors interface {if} detail", 15, _vecino_lldp))),
+    ("volatil", (("show mac address-table interface {if}", 15, _contar_macs),)),
+)
+
+def _consultar_partes(sesion, ifname, partes, data):
+    """
+    Corre los comandos de `partes` (en un solo lote si LOTE_COMANDOS) y los
+    interpreta sobre `data`. Devuelve las partes cuyos comandos respondieron.
+    """
+    cmds = [(parte, c.format(**{"if": ifname}), t, fn) for parte, comandos in partes for c, t, fn in comandos]
+    salidas = None
+    if LOTE_COMANDOS and len(cmds) > 1:
+        try:
+            salidas = enviar_lote(sesion, [c for _, c, _, _ in cmds], read_timeout=max(t for _, _, t, _ in cmds))
+        except CanalDesincronizado:
+            raise   # sale del bloque del pool: la sesión se descarta sin caché a medias
+        except Exception as e:
+            log.debug(f"  lote de caracterización falló en {getattr(sesion, 'host', '?')} {ifname}: {e}")
+    fallidas = set()
+    for i, (parte, cmd, t, fn) in enumerate(cmds):
+        try:
+            out = salidas[i] if salidas else sesion.send_command(cmd, use_textfsm=False, read_timeout=t)
+            fn(out, data)
+        except:
+            fallidas.add(parte)
+    return [parte for parte, _ in partes if parte not in fallidas]
+
+def _contradice(guardado, parte, vlan_id):
+    """
+    True si lo guardado en caché choca con lo que se acaba de ver en la tabla
+    MAC: el puerto de acceso está en otra VLAN, o no tenía MACs y ahora sí.
+    """
+    if parte == "lento":
+        return bool(vlan_id and guardado.get("is_access") and guardado.get("access_vlan")
+                    and str(guardado["access_vlan"]) != str(vlan_id))
+    return guardado.get("mac_count") == 0
+
+def caracterizar_puerto(sesion, ifname, vlan_id=None):
+    """
+    Modo, VLANs, vecino y nº de MACs del puerto (desde CACHE_PUERTOS si está
+    fresca). `vlan_id` es la VLAN con la que la tabla MAC acaba de mostrar un
+    host en el puerto: si la caché la contradice, la entrada se invalida.
+    """
     data = {"is_trunk": False, "is_access": False, "access_vlan": None,
             "native_vlan": None, "mac_count": None, "has_neighbor": False}
-    try:
-        sw = sesion.send_command(f"show interfaces {ifname} switchport", use_textfsm=False, read_timeout=20)
-        if re.search(r"(Operational|Administrative)\s+Mode:\s*trunk", sw or "", re.I): data["is_trunk"] = True
-        if re.search(r"Access Mode VLAN:", sw or "", re.I) and not data["is_trunk"]: data["is_access"] = True
-        m = re.search(r"Access Mode VLAN:\s*(\d+)", sw or "", re.I)
-        if m: data["access_vlan"] = m.group(1)
-        m = re.search(r"Trunking Native Mode VLAN:\s*(\d+)", sw or "", re.I)
-        if m: data["native_vlan"] = m.group(1)
-    except: pass
-    try:
-        cdp = sesion.send_command(f"show cdp neighbors interface {ifname} detail", use_textfsm=False, read_timeout=15)
-        if re.search(r"Device ID|System Name", cdp or "", re.I): data["has_neighbor"] = True
-    except: pass
-    try:
-        lldp = sesion.send_command(f"show lldp neighbors interface {ifname} detail", use_textfsm=False, read_timeout=15)
-        if re.search(r"System Name|Chassis id", lldp or "", re.I): data["has_neighbor"] = True
-    except: pass
-    try:
-        out = sesion.send_command(f"show mac address-table interface {ifname}", use_textfsm=False, read_timeout=15)
-        cnt = len(re.findall(r"(?i)\bDYNAMIC\b", out or "")) or len(re.findall(r"[0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4}", out or "", re.I))
-        data["mac_count"] = cnt
-    except: pass
+    sw = getattr(sesion, "host", None)
+    cache = CACHE_PUERTOS if sw else None
+    pendientes = []
+    for parte, comandos in PARTES_PUERTO:
+        guardado = cache.obtener(sw, ifname, parte) if cache else None
+        if guardado is not None and _contradice(guardado, parte, vlan_id):
+            log.debug(f"     ... caché de {ifname} contradice la tabla MAC ({parte}); se vuelve a consultar")
+            cache.invalidar(sw, ifname)
+            return caracterizar_puerto(sesion, ifname)
+        if guardado is not None:
+            data.update(guardado)
+        else:
+            pendientes.append((parte, comandos))
+    if pendientes:
+        for parte in _consultar_partes(sesion, ifname, pendientes, data):
+            if cache:
+                cache.guardar(sw, ifname, parte, data)
     return data
 
 # ----------------- ETAPA 2: MAC -> PUERTO -----------------
-def buscar_puerto_por_mac(sesion, mac_addr, vlan_hint=None):
+def variantes_mac(mac_addr):
     mac_norm = normalizar_mac(mac_addr)
-    variants = {
+    return {
         "dot": f"{mac_norm[0:4]}.{mac_norm[4:8]}.{mac_norm[8:12]}",
         "colon": ":".join([mac_norm[i:i+2] for i in range(0,12,2)]),
         "plain": mac_norm
     }
-    comandos = []
-    if vlan_hint:
-        comandos += [f"show mac address-table vlan {vlan_hint} address {variants['dot']}"]
-    comandos += [
-        f"show mac address-table address {variants['dot']}",
-        f"show mac address-table address {variants['colon']}",
-        f"show mac address-table | include {variants['dot']}",
-        f"show mac address-table | include {variants['colon']}",
-        f"show mac address-table | include {variants['plain']}",
-        "show mac address-table"
-    ]
-
-    cand_port = None
-    for cmd in comandos:
-        try:
-            out = sesion.send_command(cmd, use_textfsm=False, read_timeout=20)
-            if not (out or "").strip(): 
-                continue
-            for ln in (out or "").splitlines():
-                if not any(v in ln for v in variants.values()): 
-                    continue
-                if re.search(r"\b(CPU|ROUTER)\b", ln, re.I): 
-                    continue
-                # VLAN
-                m_vlan = re.search(r"\s(\d+)\s", ln)
-                vlan_id = m_vlan.group(1) if m_vlan else vlan_hint
-                # Puerto (si hay lista “Gi1/0/48,Po1” nos quedamos con el físico)
-                m_ports = re.search(r"([A-Za-z]+\d+(?:/\d+)*\S*)\s*$", ln)
-                if not m_ports: 
-                    continue
-                raw = m_ports.group(1)
-                first = raw.split(",")[0]
-                port = if_long(first)
-                if not es_puerto_fisico_48(port):
-                    continue
-                cand_port = port
-                car = caracterizar_puerto(sesion, port)
-                return {
-                    "puerto": port, "vlan_id": vlan_id, "tipo": "DYNAMIC",
-                    "is_trunk": car["is_trunk"], "is_access": car["is_access"],
-                    "access_vlan": car["access_vlan"], "native_vlan": car["native_vlan"],
-                    "mac_count": car["mac_count"], "has_neighbor": car["has_neighbor"],
-                }
-        except: 
-            continue
 
+def _puerto_desde_linea(ln, variants, vlan_hint=None):
+    """Devuelve (puerto, vlan) si la línea de la tabla MAC apunta a un puerto físico válido."""
+    if not any(v in ln for v in variants.values()): 
+        return None
+    if re.search(r"\b(CPU|ROUTER)\b", ln, re.I): 
+        return None
+    # VLAN
+    m_vlan = re.search(r"\s(\d+)\s", ln)
+    vlan_id = m_vlan.group(1) if m_vlan else vlan_hint
+    # Puerto (si hay lista “Gi1/0/48,Po1” nos quedamos con el físico)
+    m_ports = re.search(r"([A-Za-z]+\d+(?:/\d+)*\S*)\s*$", ln)
+    if not m_ports: 
+        return None
+    raw = m_ports.group(1)
+    first = raw.split(",")[0]
+    port = if_long(first)
+    if not es_puerto_fisico_48(port):
+        return None
+    return port, vlan_id
+
+def _resultado_puerto(sesion, port, vlan_id):
+    return _resultado_caracterizado(port, vlan_id, caracterizar_puerto(sesion, port, vlan_id))
+
+def _resultado_caracterizado(port, vlan_id, car):
+    return {
+        "puerto": port, "vlan_id": vlan_id, "tipo": "DYNAMIC",
+        "is_trunk": car["is_trunk"], "is_access": car["is_access"],
+        "access_vlan": car["access_vlan"], "native_vlan": car["native_vlan"],
+        "mac_count": car["mac_count"], "has_neighbor": car["has_neighbor"],
+    }
+
+def _resultado_sin_caracterizar(port, vlan_hint):
+    return {"puerto": port, "vlan_id": vlan_hint, "tipo": "UNKNOWN",
+            "is_trunk": False, "is_access": False, "access_vlan": None,
+            "native_vlan": None, "mac_count": None, "has_neighbor": False}
+
+def _variante_mac(plantilla):
+    def consultar(sesion, variants, vlan_hint, vistos, fresco=False):
+        out = _enviar(sesion, plantilla.format(vlan=vlan_hint, **variants), 20, fresco)
+        if es_error_cli(out): return "error", None
+        for ln in (out or "").splitlines():
+            hallado = _puerto_desde_linea(ln, variants, vlan_hint)
+            if hallado:
+                vistos.append(hallado[0])
+                return "ok", _resultado_puerto(sesion, *hallado)
+        return "vacio", None
+    consultar.comando = lambda variants, vlan_hint, vistos: plantilla.format(vlan=vlan_hint, **variants)
+    consultar.necesita_vlan = "{vlan}" in plantilla
+    return consultar
+
+# Orden por defecto de ETAPA 2 (reordenado por el perfil de cada equipo)
+VARIANTES_MAC = (
+    ("mac-vlan-dot", _variante_mac("show mac address-table vlan {vlan} address {dot}")),
+    ("mac-addr-dot", _variante_mac("show mac address-table address {dot}")),
+    ("mac-addr-colon", _variante_mac("show mac address-table address {colon}")),
+    ("mac-inc-dot", _variante_mac("show mac address-table | include {dot}")),
+    ("mac-inc-colon", _variante_mac("show mac address-table | include {colon}")),
+    ("mac-inc-plain", _variante_mac("show mac address-table | include {plain}")),
+    ("mac-vlan", _variante_mac("show mac address-table vlan {vlan}")),
+    ("mac-full", _variante_mac("show mac address-table")),
+)
+
+def buscar_puerto_por_mac(sesion, mac_addr, vlan_hint=None, solo_filtradas=False):
+    """
+    MAC -> puerto probando las variantes de ETAPA 2. Con solo_filtradas=True
+    se hace una sola consulta barata (address / | include) contra el equipo.
+    """
+    variants = variantes_mac(mac_addr)
+    vistos = []
+    variantes = [v for v in VARIANTES_MAC if vlan_hint or not v[1].necesita_vlan]
+    if solo_filtradas:
+        variantes = _filtradas(variantes, variants, vlan_hint, vistos)
+    res = _probar_variantes(sesion, variantes, variants, vlan_hint, vistos,
+                            fresco=solo_filtradas, parar_en_vacio=solo_filtradas)
+    if res:
+        return res
     # Si no hubo retorno pero vimos algún puerto candidato, al menos devuélvelo
-    if cand_port:
-        return {"puerto": cand_port, "vlan_id": vlan_hint, "tipo": "UNKNOWN",
-                "is_trunk": False, "is_access": False, "access_vlan": None,
-                "native_vlan": None, "mac_count": None, "has_neighbor": False}
+    if vistos:
+        return _resultado_sin_caracterizar(vistos[0], vlan_hint)
     return None
 
+# ----------------- ÍNDICE DE TABLAS (snapshot por switch) -----------------
+class IndiceRed:
+    """
+    Snapshot en memoria de las tablas ARP, DHCP-snooping, device-tracking y MAC
+    de cada switch, indexado por IP y por MAC. Cada tabla se descarga completa
+    una sola vez y vale mientras no pase su TTL; las búsquedas se responden
+    desde aquí sin tocar el equipo. Las IP no encontradas se recuerdan
+    (caché negativa) para no reescanear la red en cada intento.
+    """
+    COMANDOS = {
+        "dhcp": ("show ip dhcp snooping binding",),
+        "arp": ("show ip arp", "show ip arp vrf all"),
+        "tracking": ("show device tracking database", "show ip device tracking all"),
+        "mac": ("show mac address-table",),
+    }
+    TABLAS_IP = ("dhcp", "arp", "tracking")   # mismo orden que descubrir_mac_por_ip
+
+    def __init__(self, ttl=None, ttl_negativo=TTL_NEGATIVO):
+        self.ttl = dict(TTL_TABLAS, **(ttl or {}))
+        self.ttl_negativo = ttl_negativo
+        self._tablas = {}      # (switch, tabla) -> (ts, {ip o mac: dato})
+        self._negativos = {}   # ip -> ts
+        self._lock = threading.Lock()
+
+    def fresca(self, sw, tabla):
+        t = self._tablas.get((sw, tabla))
+        return bool(t) and (time.time() - t[0]) <= self.ttl[tabla]
+
+    def vencidas(self, sw, tablas):
+        return [t for t in tablas if not self.fresca(sw, t)]
+
+    def completas(self, sw, tablas):
+        """True si cada una de `tablas` está fresca o `sw` rechaza todos sus comandos (no la tiene)."""
+        return all(self.fresca(sw, t) or all(PERFILES.muerta(sw, f"tabla:{cmd}") for cmd in self.COMANDOS[t])
+                   for t in tablas)
+
+    def refrescar(self, sesion, sw, tablas, forzar=False):
+        """
+        Descarga las tablas vencidas de `sw` (todas con forzar). Devuelve la
+        lista de las que se bajaron; si ningún comando de una tabla respondió
+        se conserva su instantánea anterior (no se carga una tabla vacía).
+        """
+        pendientes = list(tablas) if forzar else self.vencidas(sw, tablas)
+        bajadas = []
+        for tabla in pendientes:
+            texto = self._descargar(sesion, sw, tabla, fresco=forzar)
+            if texto is None:
+                log.info(f"     ... tabla {tabla} de {_nombre_equipo(sw)} no respondió; se conserva la anterior")
+                continue
+            self.cargar(sw, tabla, texto)
+            bajadas.append(tabla)
+        return bajadas
+
+    def _descargar(self, sesion, sw, tabla, fresco=False):
+        """Texto de la tabla, o None si ningún comando respondió (error, timeout o perfil muerto)."""
+        salidas, respondio = [], False
+        for cmd in self.COMANDOS[tabla]:
+            clave = f"tabla:{cmd}"
+            if PERFILES.muerta(sw, clave):
+                continue
+            t0 = time.time()
+            try:
+                out = _enviar(sesion, cmd, 60, fresco)
+            except Exception:
+                out = None
+            estado = "timeout" if out is None else "error" if es_error_cli(out) else "ok" if out.strip() else "vacio"
+            PERFILES.registrar(sw, clave, estado, time.time() - t0)
+            respondio = respondio or estado in ("ok", "vacio")
+            if estado != "ok":
+                continue
+            salidas.append(out)
+            if tabla != "arp":   # ARP: global + VRFs; el resto: primera variante que responde
+                break
+        return "\n".join(salidas) if respondio else None
+
+    def cargar(self, sw, tabla, texto):
+        with METRICAS.span("parseo", _nombre_equipo(sw), f"indice:{tabla}", bytes=len(texto or "")) as sp:
+            datos = self._indexar_mac(texto) if tabla == "mac" else self._indexar_ip(tabla, texto)
+            sp["filas"] = len(datos)
+        with self._lock:
+            self._tablas[(sw, tabla)] = (time.time(), datos)
+
+    def _indexar_ip(self, tabla, texto):
+        datos = {}
+        vlan_out = extraer_vlan_de_texto(texto) if tabla == "tracking" else None
+        for linea in (texto or "").splitlines():
+            for ip in tokens_ip(linea):
+                if ip in datos:
+                    continue
+                info = _info_ip(tabla, linea, ip, vlan_out)
+                if info: datos[ip] = info
+        return datos
+
+    def _indexar_mac(self, texto):
+        datos = {}
+        for linea in (texto or "").splitlines():
+            for mac in dict.fromkeys(tokens_mac(linea)):
+                datos.setdefault(mac, []).append(linea)
+        return datos
+
+    # ------------- consultas -------------
+    def instantanea(self, sw, tabla):
+        """(ts, {clave: dato}) de la última descarga de `tabla` en `sw`, fresca o no; None si nunca se bajó."""
+        with self._lock:
+            t = self._tablas.get((sw, tabla))
+        return (t[0], dict(t[1])) if t else None
+
+    def ip(self, sw, ip_addr):
+        """Info IP->MAC desde las tablas frescas de `sw`, o None."""
+        for tabla in self.TABLAS_IP:
+            t = self._tablas.get((sw, tabla))
+            if t and self.fresca(sw, tabla) and ip_addr in t[1]:
+                return dict(t[1][ip_addr])
+        return None
+
+    def lineas_mac(self, sw, mac_addr):
+        """Líneas de la tabla MAC de `sw` con esa MAC; None si la tabla no está fresca."""
+        if not self.fresca(sw, "mac"):
+            return None
+        return list(self._tablas[(sw, "mac")][1].get(normalizar_mac(mac_addr), []))
+
+    def anterior_a(self, sw, tablas, t):
+        """True si alguna de `tablas` de `sw` se bajó antes de `t` (o nunca)."""
+        with self._lock:
+            return any((sw, tabla) not in self._tablas or self._tablas[(sw, tabla)][0] < t for tabla in tablas)
+
+    def marcar_negativo(self, ip_addr):
+        self._negativos[ip_addr] = time.time()
+
+    def es_negativo(self, ip_addr):
+        t = self._negativos.get(ip_addr)
+        if t is None:
+            return False
+        if time.time() - t > self.ttl_negativo:
+            self._negativos.pop(ip_addr, None)
+            return False
+        return True
+
+INDICE = IndiceRed()
+
+def _nombre_equipo(sw):
+    """host_name del equipo con IP `sw` (para etiquetar métricas)."""
+    return next((eq["host_name"] for eq in EQUIPOS_RED if eq["ip"] == sw), sw)
+
+def _equipo_por_nombre(nombre):
+    return next((eq for eq in EQUIPOS_RED if eq["host_name"] == nombre), None)
+
+# `desde` (2ª pasada, cuando la 1ª no encontró nada): si alguna tabla del
+# índice es anterior a ese instante puede no tener un host recién aparecido,
+# así que antes de darlo por no encontrado se pregunta al equipo con las
+# consultas filtradas (| include {ip}, address {mac}), que son baratas.
+def _etapa1_indice(eq, ip_objetivo, desde=None):
+    sw = eq["ip"]
+    info = INDICE.ip(sw, ip_objetivo)
+    if info: return info
+    with POOL.sesion(eq) as s:
+        if INDICE.refrescar(s, sw, IndiceRed.TABLAS_IP):
+            info = INDICE.ip(sw, ip_objetivo)
+            if info: return info
+        if desde and INDICE.anterior_a(sw, IndiceRed.TABLAS_IP, desde):
+            return descubrir_mac_por_ip(s, ip_objetivo, solo_filtradas=True)
+        # las tablas no cubren IPs propias del switch (SVI/Loopback/mgmt)
+        return _mac_de_interfaz_local(s, ip_objetivo)
+
+def _etapa2_indice(eq, mac, vlan_hint, desde=None):
+    sw = eq["ip"]
+    lineas = INDICE.lineas_mac(sw, mac)
+    if lineas is None:
+        with POOL.sesion(eq) as s:
+            INDICE.refrescar(s, sw, ("mac",))
+        lineas = INDICE.lineas_mac(sw, mac) or []
+    if not lineas and desde and INDICE.anterior_a(sw, ("mac",), desde):
+        with POOL.sesion(eq) as s:
+            return buscar_puerto_por_mac(s, mac, vlan_hint=vlan_hint, solo_filtradas=True)
+    variants = variantes_mac(mac)
+    hallado = next((h for h in (_puerto_desde_linea(ln, variants, vlan_hint) for ln in lineas) if h), None)
+    if not hallado:
+        return None
+    try:
+        with POOL.sesion(eq) as s:
+            return _resultado_puerto(s, *hallado)
+    except Exception:
+        return _resultado_sin_caracterizar(hallado[0], vlan_hint)
+
 # ----------------- ORQUESTADOR (misma lógica) -----------------
-def iniciar_localizacion_ip(ip_objetivo):
-    print("\n" + "="*50)
-    print("  🔎 INICIANDO RASTREO DE DISPOSITIVO 🔎")
-    print(f"  IP Objetivo: {ip_objetivo}")
-    print("="*50 + "\n")
+def puntuar_candidato(d):
+    # mismo scoring que ya tenías
+    score = 0
+    score += 60 if (d.get("is_access") and not d.get("is_trunk")) else -60
+    if d.get("has_neighbor"): score -= 30
+    mc = d.get("mac_count") or 0
+    if mc >= 8: score -= 25
+    elif mc >= 3: score -= 12
+    else: score += 8
+    if VLAN_BUSQUEDA and (d.get("vlan_id") == VLAN_BUSQUEDA or d.get("access_vlan") == VLAN_BUSQUEDA):
+        score += 10
+    if re.search(r"Po\d+|Port-Channel|^Te|^Fo", d["puerto"], re.I): score -= 40
+    return score
 
-    # ETAPA 1
-    print("--- [ETAPA 1: Resolución IP -> MAC] ---")
-    datos_mac, equipo_origen = None, None
+def _etapa1_en(eq, ip_objetivo, desde=None):
+    log.info(f"  ↪ Consultando [{eq['host_name']}]...")
+    with METRICAS.etapa("etapa1"):
+        if USAR_INDICE:
+            return _etapa1_indice(eq, ip_objetivo, desde)
+        with POOL.sesion(eq) as s:
+            return descubrir_mac_por_ip(s, ip_objetivo)
+
+def _etapa2_en(eq, mac, vlan_hint, desde=None):
+    log.info(f"  ↪ Buscando MAC {mac} en [{eq['host_name']}]...")
+    with METRICAS.etapa("etapa2"):
+        if USAR_INDICE:
+            return _etapa2_indice(eq, mac, vlan_hint, desde)
+        with POOL.sesion(eq) as s:
+            return buscar_puerto_por_mac(s, mac, vlan_hint=vlan_hint)
+
+def _reportar_etapa1(eq, ip_objetivo, info):
+    if info:
+        print(f"  💡 ¡MAC resuelta! En [{eq['host_name']}]")
+        print(f"     HW Address: {info['hw_addr']} (Fuente: {info['fuente']})")
+        print(f"     Info: IF:{info.get('ifaz','?')} VLAN:{info.get('vlan_id','?')}\n")
+    else:
+        log.info(f"     ... Sin registros para {ip_objetivo}.")
+
+def _etapa1_secuencial(ip_objetivo, desde=None):
     for eq in EQUIPOS_RED:
-        print(f"  ↪ Consultando [{eq['host_name']}]...")
         try:
-            s = conectar(eq)
-            info = descubrir_mac_por_ip(s, ip_objetivo)
-            s.disconnect()
+            info = _etapa1_en(eq, ip_objetivo, desde)
+            _reportar_etapa1(eq, ip_objetivo, info)
             if info:
-                datos_mac, equipo_origen = info, eq
-                print(f"  💡 ¡MAC resuelta! En [{eq['host_name']}]")
-                print(f"     HW Address: {info['hw_addr']} (Fuente: {info['fuente']})")
-                print(f"     Info: IF:{info.get('ifaz','?')} VLAN:{info.get('vlan_id','?')}\n")
-                break
-            else:
-                print(f"     ... Sin registros para {ip_objetivo}.")
+                return info, eq
         except Exception as e:
-            print(f"  ❌ ERROR conectando a {eq['host_name']} ({eq['ip']}): {e}")
+            log.warning(f"  ❌ ERROR conectando a {eq['host_name']} ({eq['ip']}): {e}")
+    return None, None
 
-    if not datos_mac:
-        print("\n" + "-"*50)
-        print("  ⛔ RASTREO FALLIDO (ETAPA 1)")
-        print(f"  No se pudo determinar la MAC para {ip_objetivo}.")
-        print("-"*50 + "\n")
+def _etapa1_concurrente(ip_objetivo, desde=None):
+    """
+    Lanza ETAPA 1 en todos los switches a la vez. Gana el primer switch
+    (en orden de EQUIPOS_RED) que resuelve la MAC, igual que en secuencial:
+    en cuanto un switch i responde, se cancelan los j > i aún en cola y se
+    espera solo a los anteriores a i.
+    """
+    resultados = {}
+    ex = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        futs = {ex.submit(_etapa1_en, eq, ip_objetivo, desde): i for i, eq in enumerate(EQUIPOS_RED)}
+        por_indice = {i: f for f, i in futs.items()}
+        ganador = None
+        for fut in as_completed(futs):
+            if fut.cancelled():
+                continue
+            i = futs[fut]
+            eq = EQUIPOS_RED[i]
+            try:
+                info = fut.result()
+            except Exception as e:
+                log.warning(f"  ❌ ERROR conectando a {eq['host_name']} ({eq['ip']}): {e}")
+                info = None
+            resultados[i] = info
+            if info and (ganador is None or i < ganador):
+                ganador = i
+                for j, f in por_indice.items():
+                    if j > i: f.cancel()
+            # ¿ya terminaron todos los anteriores al ganador?
+            if ganador is not None and all(j in resultados for j in range(ganador)):
+                break
+    finally:
+        # no esperamos a los switches que siguen en curso: terminan solos y devuelven su sesión al pool
+        ex.shutdown(wait=False, cancel_futures=True)
+    for i in sorted(resultados):
+        _reportar_etapa1(EQUIPOS_RED[i], ip_objetivo, resultados[i])
+        if resultados[i]:
+            return resultados[i], EQUIPOS_RED[i]
+    return None, None
+
+def _por_switch(fn, concurrente):
+    """Ejecuta fn(eq) en cada switch y va entregando (eq, resultado) según terminan."""
+    if not concurrente:
+        for eq in EQUIPOS_RED:
+            try:
+                yield eq, fn(eq)
+            except Exception as e:
+                log.warning(f"  ❌ ERROR conectando a {eq['host_name']} ({eq['ip']}): {e}")
         return
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futs = {ex.submit(fn, eq): eq for eq in EQUIPOS_RED}
+        for fut in as_completed(futs):
+            eq = futs[fut]
+            try:
+                yield eq, fut.result()
+            except Exception as e:
+                log.warning(f"  ❌ ERROR conectando a {eq['host_name']} ({eq['ip']}): {e}")
+
+def _elegir_mejor(resultados, verbose=True):
+    """Puntúa los candidatos (eq, d) según llegan y devuelve (mejor, equipo)."""
+    mejor, equipo_final, orden_mejor = None, None, None
+    orden = {id(eq): i for i, eq in enumerate(EQUIPOS_RED)}
+    for eq, d in resultados:
+        if not d:
+            continue
+        if verbose:
+            log.info(f"     ... MAC vista en {d['puerto']}  (VLAN:{d.get('vlan_id')}  tipo:{d.get('tipo')})")
+        d["score"] = puntuar_candidato(d)
+        # en empate gana el switch que va antes en EQUIPOS_RED (igual que el recorrido secuencial)
+        i = orden[id(eq)]
+        if (mejor is None) or (d["score"] > mejor["score"]) or (d["score"] == mejor["score"] and i < orden_mejor):
+            mejor, equipo_final, orden_mejor = d, eq, i
+    return mejor, equipo_final
+
+# Campos del reporte final (pantalla, CSV y JSON lines)
+CAMPOS_REPORTE = ("ip", "estado", "switch", "puerto", "mac", "vlan", "tipo_puerto",
+                  "vecino", "mac_count", "fuente", "origen")
+
+def _reporte(ip_objetivo, datos_mac=None, equipo_origen=None, mejor=None, equipo_final=None, estado=None):
+    r = dict.fromkeys(CAMPOS_REPORTE)
+    r["ip"] = ip_objetivo
+    if datos_mac:
+        r["mac"] = datos_mac["hw_addr"]
+        r["fuente"] = datos_mac.get("fuente")
+        r["origen"] = equipo_origen["host_name"] if equipo_origen else None
+        r["vlan"] = datos_mac.get("vlan_id")
+    if mejor and equipo_final:
+        r["switch"] = equipo_final["host_name"]
+        r["puerto"] = mejor["puerto"]
+        r["vlan"] = mejor.get("vlan_id") or mejor.get("access_vlan") or r["vlan"]
+        r["tipo_puerto"] = "ACCESS" if mejor.get("is_access") else "TRUNK"
+        r["vecino"] = bool(mejor.get("has_neighbor"))
+        r["mac_count"] = mejor.get("mac_count")
+    r["estado"] = estado or ("ok" if r["puerto"] else "sin-puerto" if r["mac"] else "sin-mac")
+    return r
+
+def _confirmar_historial(ip_objetivo):
+    """
+    Prueba primero la última ubicación conocida de la IP: si el switch de
+    origen sigue resolviendo la misma MAC y esa MAC sigue en el mismo puerto
+    de acceso (sin vecino) del mismo switch, se da por localizada sin
+    recorrer el resto de la red. Devuelve el reporte o None.
+    """
+    previo = HISTORIAL.ultimo(ip=ip_objetivo, edad_max=HISTORIAL_EDAD_MAX)
+    origen = final = None
+    if previo:
+        origen, final = _equipo_por_nombre(previo["origen"]), _equipo_por_nombre(previo["switch"])
+    if not (origen and final):
+        return None
+    print("--- [HISTORIAL: última ubicación conocida] ---")
+    print(f"  {previo['switch']} {previo['puerto']} (MAC {previo['mac']})")
+    try:
+        info = _etapa1_en(origen, ip_objetivo)
+        d = None
+        if info and normalizar_mac(info["hw_addr"]) == normalizar_mac(previo["mac"]):
+            d = _etapa2_en(final, info["hw_addr"], info.get("vlan_id"))
+    except Exception as e:
+        log.warning(f"  ❌ ERROR confirmando en {final['host_name']} ({final['ip']}): {e}")
+        d = None
+    if not d or clave_puerto(d["puerto"]) != clave_puerto(previo["puerto"]) \
+            or d.get("is_trunk") or d.get("has_neighbor"):
+        print("  ... ya no está ahí; se recorre la red.\n")
+        # el host se fue de ese puerto: lo que la caché sabe de él (MACs, modo) puede ser viejo
+        CACHE_PUERTOS.invalidar(final["ip"], previo["puerto"])
+        return None
+    print("  📌 Confirmada; no se recorre el resto de la red.")
+    d["score"] = puntuar_candidato(d)
+    return _reporte(ip_objetivo, info, origen, d, final)
+
+def localizar(ip_objetivo, concurrente=None):
+    """Ejecuta ETAPA 1 y ETAPA 2 para una IP y devuelve el reporte (dict con CAMPOS_REPORTE)."""
+    if concurrente is None: concurrente = MODO_CONCURRENTE
+    if USAR_INDICE and INDICE.es_negativo(ip_objetivo):
+        print("--- [ETAPA 1: Resolución IP -> MAC] ---")
+        return _reporte(ip_objetivo, estado="negativo")
+
+    if USAR_HISTORIAL:
+        r = _confirmar_historial(ip_objetivo)
+        if r:
+            HISTORIAL.registrar(r, via="historial")
+            return r
+
+    r = _localizar_recorrido(ip_objetivo, concurrente)
+    if USAR_HISTORIAL:
+        HISTORIAL.registrar(r, via="recorrido")
+    return r
+
+def _localizar_recorrido(ip_objetivo, concurrente):
+    # ETAPA 1
+    print("--- [ETAPA 1: Resolución IP -> MAC] ---")
+    etapa1 = _etapa1_concurrente if concurrente else _etapa1_secuencial
+    t0 = time.time()
+    datos_mac, equipo_origen = etapa1(ip_objetivo)
+    if not datos_mac and USAR_INDICE:
+        # el índice puede ser anterior a que apareciera el host: consultas
+        # filtradas a los equipos con tablas viejas antes de la caché negativa
+        datos_mac, equipo_origen = etapa1(ip_objetivo, desde=t0)
+
+    if not datos_mac:
+        if USAR_INDICE: INDICE.marcar_negativo(ip_objetivo)
+        return _reporte(ip_objetivo)
 
     # ETAPA 2
     print("\n--- [ETAPA 2: Localización MAC -> Puerto] ---")
     mac = datos_mac["hw_addr"]
-    mejor, equipo_final = None, None
     vlan_hint = datos_mac.get("vlan_id")
+    mejor, equipo_final = _elegir_mejor(_por_switch(lambda eq: _etapa2_en(eq, mac, vlan_hint), concurrente))
+    if not mejor and USAR_INDICE:
+        mejor, equipo_final = _elegir_mejor(
+            _por_switch(lambda eq: _etapa2_en(eq, mac, vlan_hint, desde=t0), concurrente))
+    return _reporte(ip_objetivo, datos_mac, equipo_origen, mejor, equipo_final)
 
-    for eq in EQUIPOS_RED:
-        print(f"  ↪ Buscando MAC {mac} en [{eq['host_name']}]...")
-        try:
-            s = conectar(eq)
-            d = buscar_puerto_por_mac(s, mac, vlan_hint=vlan_hint)
-            s.disconnect()
-            if d:
-                print(f"     ... MAC vista en {d['puerto']}  (VLAN:{d.get('vlan_id')}  tipo:{d.get('tipo')})")
-                # mismo scoring que ya tenías
-                score = 0
-                score += 60 if (d.get("is_access") and not d.get("is_trunk")) else -60
-                if d.get("has_neighbor"): score -= 30
-                mc = d.get("mac_count") or 0
-                if mc >= 8: score -= 25
-                elif mc >= 3: score -= 12
-                else: score += 8
-                if VLAN_BUSQUEDA and (d.get("vlan_id") == VLAN_BUSQUEDA or d.get("access_vlan") == VLAN_BUSQUEDA):
-                    score += 10
-                if re.search(r"Po\d+|Port-Channel|^Te|^Fo", d["puerto"], re.I): score -= 40
-
-                d["score"] = score
-                if (mejor is None) or (score > mejor["score"]):
-                    mejor, equipo_final = d, eq
-        except Exception as e:
-            print(f"  ❌ ERROR conectando a {eq['host_name']} ({eq['ip']}): {e}")
-
-    if mejor and equipo_final:
+def imprimir_reporte(r):
+    if r["estado"] in ("sin-mac", "negativo"):
+        print("\n" + "-"*50)
+        print("  ⛔ RASTREO FALLIDO (ETAPA 1)")
+        if r["estado"] == "negativo":
+            print(f"  {r['ip']} no apareció hace menos de {INDICE.ttl_negativo}s (caché negativa).")
+        else:
+            print(f"  No se pudo determinar la MAC para {r['ip']}.")
+        print("-"*50 + "\n")
+    elif r["estado"] == "ok":
         print("\n" + "*"*50)
         print("  ✅ RASTREO COMPLETADO CON ÉXITO ✅")
         print("*"*50)
-        print(f"    💻 Switch:        {equipo_final['host_name']}")
-        print(f"    🔌 Puerto:         {mejor['puerto']}")
-        print(f"    🌐 IP Consultada:  {ip_objetivo}")
-        print(f"    🏷 MAC Address:    {mac}")
-        print(f"    🛂 VLAN Detectada: {mejor.get('vlan_id') or mejor.get('access_vlan') or datos_mac.get('vlan_id','?')}")
-        print(f"    ℹ  Puerto:        {'ACCESS' if mejor.get('is_access') else 'TRUNK'}"
-              f" | Vecino:{'sí' if mejor.get('has_neighbor') else 'no'}"
-              f" | MACs:{mejor.get('mac_count')}")
+        print(f"    💻 Switch:        {r['switch']}")
+        print(f"    🔌 Puerto:         {r['puerto']}")
+        print(f"    🌐 IP Consultada:  {r['ip']}")
+        print(f"    🏷 MAC Address:    {r['mac']}")
+        print(f"    🛂 VLAN Detectada: {r['vlan'] or '?'}")
+        print(f"    ℹ  Puerto:        {r['tipo_puerto']}"
+              f" | Vecino:{'sí' if r['vecino'] else 'no'}"
+              f" | MACs:{r['mac_count']}")
         print("*"*50 + "\n")
     else:
         print("\n" + "-"*50)
         print("  ⚠ RASTREO INCOMPLETO (ETAPA 2)")
         print(f"  MAC resuelta pero no localizada en CAM Tables.")
-        print(f"  IP:{ip_objetivo} | MAC:{mac} | Origen:{equipo_origen['host_name']}")
+        print(f"  IP:{r['ip']} | MAC:{r['mac']} | Origen:{r['origen']}")
         print("-"*50 + "\n")
 
-if __name__ == "__main__":
-    enable_discreet_mode()  
+def iniciar_localizacion_ip(ip_objetivo, concurrente=None):
+    print("\n" + "="*50)
+    print("  🔎 INICIANDO RASTREO DE DISPOSITIVO 🔎")
+    print(f"  IP Objetivo: {ip_objetivo}")
+    print("="*50 + "\n")
+    r = localizar(ip_objetivo, concurrente)
+    imprimir_reporte(r)
+    return r
+
+# ----------------- MODO LOTE (muchas IPs en una pasada) -----------------
+def expandir_objetivos(items, prefijo_min=None, max_ips=None):
+    """
+    IPs sueltas o CIDR (10.0.0.0/24) -> lista de IPs sin repetir, en orden.
+    Solo IPv4; una red más grande que /prefijo_min (LOTE_PREFIJO_MIN por
+    defecto) o más de `max_ips` IPs en total dan ValueError en vez de expandirse.
+    """
+    if prefijo_min is None: prefijo_min = LOTE_PREFIJO_MIN
+    ips = []
+    for it in items:
+        it = it.split("#", 1)[0].strip()
+        if not it:
+            continue
+        if "/" in it:
+            red = ipaddress.ip_network(it, strict=False)
+            if red.version != 4:
+                raise ValueError(f"{it}: solo se admiten redes IPv4")
+            if red.prefixlen < prefijo_min:
+                raise ValueError(f"{it}: red demasiado grande (máximo /{prefijo_min})")
+            ips += [str(h) for h in red.hosts()]
+        else:
+            ip = ipaddress.ip_address(it)
+            if ip.version != 4:
+                raise ValueError(f"{it}: solo se admiten IPs IPv4")
+            ips.append(str(ip))
+        if max_ips is not None and len(ips) > max_ips:
+            raise ValueError(f"demasiados objetivos (máximo {max_ips} IPs)")
+    return list(dict.fromkeys(ips))
+
+def _cruzar_ips(textos, ips):
+    """{ip: info} de las `ips` que aparecen en las tablas de IP de un switch ({tabla: texto}), una pasada por tabla."""
+    res = {}
+    for tabla in IndiceRed.TABLAS_IP:
+        texto = textos.get(tabla)
+        faltan = [ip for ip in ips if ip not in res]
+        if not (texto and faltan):
+            continue
+        vlan_out = extraer_vlan_de_texto(texto) if tabla == "tracking" else None
+        for ip, lineas in MatcherDirecciones(ips=faltan).escanear(texto).items():
+            info = next((i for i in (_info_ip(tabla, ln, ip, vlan_out) for ln in lineas) if i), None)
+            if info: res[ip] = info
+    return res
+
+def localizar_lote(ips, concurrente=None):
+    """
+    Resuelve muchas IPs en una sola pasada: cada tabla (DHCP, ARP, tracking,
+    MAC) se descarga una vez por switch y se cruza contra todas las IPs, y
+    cada puerto candidato se caracteriza una sola vez aunque lo compartan
+    varias IPs. Las IPs propias de los switches (SVI/Loopback) no se
+    resuelven en lote; para ellas usar el modo interactivo.
+    Una IP que no aparece solo entra en la caché negativa si todos los
+    switches entregaron sus tablas de IP; si alguno falló queda 'sin-mac'.
+    Con USAR_INDICE=False no se toca el índice: las tablas se bajan siempre y
+    cada una se recorre una vez con MatcherDirecciones buscando solo las IPs
+    (y luego las MACs) del lote; no hay caché negativa.
+    """
+    if concurrente is None: concurrente = MODO_CONCURRENTE
+    ips = list(dict.fromkeys(ips))
+    tablas = {}   # sin índice: id(eq) -> {tabla: texto}
+
+    def refrescar(eq):
+        with METRICAS.etapa("lote"), POOL.sesion(eq) as s:
+            if not USAR_INDICE:
+                tablas[id(eq)] = {t: INDICE._descargar(s, eq["ip"], t, fresco=True) or ""
+                                  for t in IndiceRed.TABLAS_IP + ("mac",)}
+                return True
+            INDICE.refrescar(s, eq["ip"], IndiceRed.TABLAS_IP + ("mac",))
+        return INDICE.completas(eq["ip"], IndiceRed.TABLAS_IP)
+    listos = [eq for eq, ok in _por_switch(refrescar, concurrente) if ok]
+    red_completa = len(listos) == len(EQUIPOS_RED)
+    if not red_completa:
+        faltan = [eq["host_name"] for eq in EQUIPOS_RED if eq not in listos]
+        log.warning(f"  ⚠ tablas de IP incompletas en {', '.join(faltan)}: las IPs no halladas no se cachean como negativas")
+
+    # ETAPA 1 (desde el índice o las tablas recién bajadas, en orden de EQUIPOS_RED)
+    if USAR_INDICE:
+        ip_en = lambda eq, ip: INDICE.ip(eq["ip"], ip)
+    else:
+        cruces = {k: _cruzar_ips(textos, ips) for k, textos in tablas.items()}
+        ip_en = lambda eq, ip: cruces.get(id(eq), {}).get(ip)
+    etapa1 = {}
+    for ip in ips:
+        for eq in EQUIPOS_RED:
+            info = ip_en(eq, ip)
+            if info:
+                etapa1[ip] = (info, eq)
+                break
+
+    # ETAPA 2: candidatos por switch; cada puerto se caracteriza una vez
+    def etapa2(eq):
+        if USAR_INDICE:
+            lineas_de = lambda mac: INDICE.lineas_mac(eq["ip"], mac) or []
+        else:
+            macs = [info["hw_addr"] for info, _ in etapa1.values()]
+            hits = MatcherDirecciones(macs=macs).escanear(tablas.get(id(eq), {}).get("mac", "")) if macs else {}
+            lineas_de = lambda mac: hits.get(normalizar_mac(mac), [])
+        cands = {}
+        for ip, (info, _) in etapa1.items():
+            variants = variantes_mac(info["hw_addr"])
+            lineas = lineas_de(info["hw_addr"])
+            h = next((h for h in (_puerto_desde_linea(ln, variants, info.get("vlan_id")) for ln in lineas) if h), None)
+            if h: cands[ip] = h
+        if not cands:
+            return {}
+        car = {}
+        with METRICAS.etapa("etapa2"), POOL.sesion(eq) as s:
+            for port, vlan in cands.values():
+                if port not in car:
+                    car[port] = caracterizar_puerto(s, port, vlan)
+        return {ip: _resultado_caracterizado(port, vlan, car[port]) for ip, (port, vlan) in cands.items()}
+
+    por_switch = dict((id(eq), (eq, res)) for eq, res in _por_switch(etapa2, concurrente))
+    reportes = []
+    for ip in ips:
+        if ip not in etapa1:
+            if USAR_INDICE and red_completa:
+                INDICE.marcar_negativo(ip)
+            reportes.append(_reporte(ip))
+            continue
+        info, origen = etapa1[ip]
+        candidatos = ((eq, res.get(ip)) for eq, res in (por_switch.get(id(e), (e, {})) for e in EQUIPOS_RED))
+        mejor, equipo_final = _elegir_mejor(candidatos, verbose=False)
+        reportes.append(_reporte(ip, info, origen, mejor, equipo_final))
+    if USAR_HISTORIAL:
+        HISTORIAL.registrar_muchos(reportes, via="lote")
+    return reportes
+
+def escribir_reportes(reportes, destino, formato="csv"):
+    """Escribe los reportes como CSV o JSON lines en `destino` ('-' = stdout)."""
+    f = sys.stdout if destino == "-" else open(destino, "w", newline="", encoding="utf-8")
+    try:
+        if formato == "jsonl":
+            for r in reportes:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        else:
+            w = csv.DictWriter(f, fieldnames=CAMPOS_REPORTE)
+            w.writeheader()
+            w.writerows(reportes)
+    finally:
+        if f is not sys.stdout: f.close()
+
+def exportar_metricas(prefijo):
+    METRICAS.exportar_jsonl(prefijo + ".jsonl")
+    METRICAS.exportar_prometheus(prefijo + ".prom", prefijo="lucero")
+    for (tipo, equipo, etapa, nombre), t in METRICAS.resumen(5):
+        log.debug(f"  ⏱ {t['segundos']:7.2f}s  {t['n']:>4}x  {equipo} [{etapa}] {nombre}")
+
+def modo_interactivo():
     print("--- Herramienta de Localización de IP en Red Cisco ---")
     while True:
         ip_usuario = input("\n>>> Introduce la IP a localizar (o 'salir'): ").strip()
@@ -386,3 +1127,52 @@ if __name__ == "__main__":
             sys.exit(0)
         except Exception as e:
             print(f"\n[!!] Error inesperado: {e}")
+
+def main(argv=None):
+    global MODO_CONCURRENTE, USAR_HISTORIAL
+    ap = argparse.ArgumentParser(description="Localiza IPs (switch/puerto) en la red Cisco.")
+    ap.add_argument("--lote", metavar="ARCHIVO", help="archivo con una IP o CIDR por línea")
+    ap.add_argument("--cidr", action="append", default=[], help="red a auditar completa (se puede repetir)")
+    ap.add_argument("--formato", choices=("csv", "jsonl"), default="csv")
+    ap.add_argument("--salida", help="archivo de salida del lote ('-' = pantalla)")
+    ap.add_argument("--secuencial", action="store_true", help="consulta los switches de uno en uno")
+    ap.add_argument("--sin-historial", action="store_true",
+                    help="ni consulta ni guarda el historial de avistamientos (ver historial.py)")
+    ap.add_argument("--nivel-log", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="ERROR",
+                    help="INFO muestra el avance por switch; DEBUG además cada conexión/comando/parseo")
+    ap.add_argument("--metricas", metavar="PREFIJO",
+                    help="al salir escribe PREFIJO.jsonl (spans) y PREFIJO.prom (Prometheus)")
+    args = ap.parse_args(argv)
+
+    enable_discreet_mode(getattr(logging, args.nivel_log))
+    if args.metricas:
+        atexit.register(exportar_metricas, args.metricas)
+    if args.secuencial:
+        MODO_CONCURRENTE = False
+    if args.sin_historial:
+        USAR_HISTORIAL = False
+    if not (args.lote or args.cidr):
+        return modo_interactivo()
+
+    items = list(args.cidr)
+    if args.lote:
+        try:
+            with open(args.lote, encoding="utf-8") as f:
+                items += f.read().splitlines()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"[!] No se pudo leer el lote {args.lote}: {getattr(e, 'strerror', None) or e}")
+            return 2
+    try:
+        ips = expandir_objetivos(items)
+    except ValueError as e:
+        print(f"[!] Objetivo inválido: {e}")
+        return 2
+    salida = args.salida or f"localizacion_lote.{args.formato}"
+    reportes = localizar_lote(ips)
+    escribir_reportes(reportes, salida, args.formato)
+    ok = sum(1 for r in reportes if r["estado"] == "ok")
+    if salida != "-":
+        print(f"✅ {ok}/{len(reportes)} IPs localizadas. Resultado: {salida}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# metricas.py — spans de instrumentación (conexión, comando, parseo) y exportación
+#
+#   from metricas import Metricas
+#   METRICAS = Metricas(logging.getLogger("lucero"))
+#   sesion = METRICAS.sesion(ConnectHandler(...), "SW1")   # cada send_command es un span
+#   with METRICAS.etapa("etapa1"):                         # etiqueta los spans de este hilo
+#       with METRICAS.span("parseo", "SW1", "arp") as s:
+#           ...
+#           s["filas"] = 120
+#   METRICAS.exportar_jsonl("metricas.jsonl")
+#   METRICAS.exportar_prometheus("metricas.prom")
+#
+# Cada span guarda tipo, equipo, etapa, nombre (el comando con IP/MAC/interfaz
+# reemplazadas por {ip}/{mac}/{if}, para que las series no exploten), duración,
+# bytes de salida y error si lo hubo. Además se acumulan totales por
+# (tipo, equipo, etapa, nombre) para el archivo de Prometheus y el resumen.
+# Con el logger en DEBUG cada span se registra al terminar.
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+_IP_RE = re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}\b")
+_MAC_RE = re.compile(r"\b[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\b|\b[0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5}\b"
+                     r"|\b[0-9a-fA-F]{12}\b")
+_IF_RE = re.compile(r"\b(?:[A-Za-z][A-Za-z-]*?)\d+(?:/\d+)+(?:\.\d+)?\b|\b(?:Vlan|Vl|Loopback|Lo|Port-channel|Po)\d+\b",
+                    re.I)
+
+
+def plantilla_comando(cmd):
+    """'show ip arp 10.0.0.5' -> 'show ip arp {ip}' (etiqueta de baja cardinalidad)."""
+    cmd = _IP_RE.sub("{ip}", cmd or "")
+    cmd = _MAC_RE.sub("{mac}", cmd)
+    cmd = _IF_RE.sub("{if}", cmd)
+    return " ".join(cmd.split())
+
+
+class HandlerConsola(logging.Handler):
+    """Escribe el mensaje tal cual con print (respeta redirect_stdout y la consola actual)."""
+
+    def emit(self, record):
+        try:
+            print(self.format(record), flush=True)
+        except Exception:
+            self.handleError(record)
+
+
+def logger_consola(nombre, nivel=logging.INFO):
+    log = logging.getLogger(nombre)
+    if not any(isinstance(h, HandlerConsola) for h in log.handlers):
+        h = HandlerConsola()
+        h.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(h)
+        log.propagate = False
+    log.setLevel(nivel)
+    return log
+
+
+class SesionInstrumentada:
+    """Envuelve una sesión netmiko: send_command / send_command_timing quedan medidos."""
+
+    def __init__(self, sesion, metricas, equipo):
+        self._sesion = sesion
+        self._metricas = metricas
+        self.equipo = equipo
+
+    def span(self, cmd, **tags):
+        """Span 'comando' para envíos que no pasan por send_command (p.ej. sesiones.enviar_lote)."""
+        return self._metricas.span("comando", self.equipo, plantilla_comando(cmd), **tags)
+
+    def _medir(self, metodo, cmd, *args, **kwargs):
+        with self.span(cmd, textfsm=bool(kwargs.get("use_textfsm"))) as s:
+            out = getattr(self._sesion, metodo)(cmd, *args, **kwargs)
+            s["bytes"] = len(out) if isinstance(out, str) else None
+            return out
+
+    def send_command(self, cmd, *args, **kwargs):
+        return self._medir("send_command", cmd, *args, **kwargs)
+
+    def send_command_timing(self, cmd, *args, **kwargs):
+        return self._medir("send_command_timing", cmd, *args, **kwargs)
+
+    def __getattr__(self, nombre):
+        return getattr(self._sesion, nombre)
+
+
+class Metricas:
+    def __init__(self, log=None, max_spans=20000):
+        self.log = log or logging.getLogger("metricas")
+        self._spans = deque(maxlen=max_spans)
+        self._totales = {}   # (tipo, equipo, etapa, nombre) -> {"n", "segundos", "bytes", "errores"}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def etapa(self, nombre):
+        """Etiqueta con `nombre` los spans que se abran en este hilo."""
+        previa = getattr(self._local, "etapa", None)
+        self._local.etapa = nombre
+        try:
+            yield
+        finally:
+            self._local.etapa = previa
+
+    def en_etapa(self, nombre):
+        """Decorador: la función corre dentro de etapa(nombre)."""
+        def deco(fn):
+            @functools.wraps(fn)
+            def envuelta(*args, **kwargs):
+                with self.etapa(nombre):
+                    return fn(*args, **kwargs)
+            return envuelta
+        return deco
+
+    @contextlib.contextmanager
+    def span(self, tipo, equipo=None, nombre=None, **tags):
+        rec = {"tipo": tipo, "equipo": equipo, "etapa": getattr(self._local, "etapa", None), "nombre": nombre}
+        rec.update(tags)
+        ts, t0 = time.time(), time.perf_counter()
+        try:
+            yield rec
+        except BaseException as e:
+            rec["error"] = type(e).__name__
+            raise
+        finally:
+            rec["segundos"] = round(time.perf_counter() - t0, 6)
+            rec["ts"] = round(ts, 3)
+            self._registrar(rec)
+
+    def sesion(self, sesion, equipo):
+        return SesionInstrumentada(sesion, self, equipo)
+
+    def _registrar(self, rec):
+        clave = (rec["tipo"], rec["equipo"], rec["etapa"], rec["nombre"])
+        with self._lock:
+            self._spans.append(rec)
+            t = self._totales.setdefault(clave, {"n": 0, "segundos": 0.0, "bytes": 0, "errores": 0})
+            t["n"] += 1
+            t["segundos"] += rec["segundos"]
+            t["bytes"] += rec.get("bytes") or 0
+            t["errores"] += 1 if rec.get("error") else 0
+        if self.log.isEnabledFor(logging.DEBUG):
+            extra = f" {rec['bytes']}B" if rec.get("bytes") is not None else ""
+            error = f" ERROR {rec['error']}" if rec.get("error") else ""
+            self.log.debug(f"    [span] {rec['tipo']:<8} {rec['equipo'] or '-':<12} {rec['etapa'] or '-':<8} "
+                           f"{rec['segundos'] * 1000:8.1f} ms{extra}  {rec['nombre'] or ''}{error}")
+
+    # ------------- consultas y exportación -------------
+    def totales(self):
+        with self._lock:
+            return {k: dict(v) for k, v in self._totales.items()}
+
+    def resumen(self, n=10, tipo="comando"):
+        """Las `n` series de `tipo` que más tiempo acumulan: [(clave, totales), ...]."""
+        filas = [(k, v) for k, v in self.totales().items() if tipo is None or k[0] == tipo]
+        return sorted(filas, key=lambda kv: kv[1]["segundos"], reverse=True)[:n]
+
+    def exportar_jsonl(self, path, vaciar=True):
+        """Añade los spans pendientes a `path` (uno por línea). Devuelve cuántos escribió."""
+        with self._lock:
+            spans = list(self._spans)
+            if vaciar:
+                self._spans.clear()
+        with open(path, "a", encoding="utf-8") as f:
+            for rec in spans:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        return len(spans)
+
+    def exportar_prometheus(self, path, prefijo="lucero"):
+        """Escribe los totales en formato texto de Prometheus (p.ej. para el textfile collector)."""
+        def etiquetas(k):
+            pares = zip(("tipo", "equipo", "etapa", "nombre"), k)
+            return ",".join(f'{n}="{_escapar(v)}"' for n, v in pares if v is not None)
+
+        series = (
+            ("span_seconds_total", "counter", "Tiempo acumulado por span", "segundos"),
+            ("span_total", "counter", "Número de spans", "n"),
+            ("span_errors_total", "counter", "Spans que terminaron con excepción", "errores"),
+            ("output_bytes_total", "counter", "Bytes de salida de los comandos", "bytes"),
+        )
+        totales = self.totales()
+        lineas = []
+        for nombre, tipo, ayuda, campo in series:
+            lineas.append(f"# HELP {prefijo}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {prefijo}_{nombre} {tipo}")
+            for k, v in sorted(totales.items(), key=lambda kv: tuple(str(x) for x in kv[0])):
+                if campo == "bytes" and k[0] != "comando":
+                    continue
+                lineas.append(f"{prefijo}_{nombre}{{{etiquetas(k)}}} {v[campo]:g}")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+        os.replace(tmp, path)
+
+
+def _escapar(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,164 @@
+# planificador.py — orden por costo de los comandos de búsqueda y memo de tablas completas por sesión
+#
+# Cada variante de búsqueda de lucero es un comando 'show' con un costo
+# esperado muy distinto según lo que descarga:
+#   filtrado  -> '| include', 'address <mac>', 'interface <if>', 'show ip arp <ip>': unas líneas
+#   vlan      -> 'show mac address-table vlan <n>': la tabla de una VLAN
+#   tabla     -> 'show mac address-table', 'show ip arp', ...: la tabla entera
+# planificar() ordena las variantes por esa clase (dentro de cada clase se
+# respeta el orden aprendido por capacidades.py).
+#
+# MemoTablas guarda la salida de cada tabla completa mientras viva la sesión
+# que la bajó (y no pase su TTL). Las variantes posteriores de la misma tabla
+# — las filtradas y sus equivalentes ('show arp' / 'show ip arp') — se
+# responden filtrando esa salida en local, sin volver a pedirla al equipo; y
+# una variante cuya respuesta ya está en el memo pasa a costar cero.
+
+import re
+import threading
+import time
+import weakref
+
+from coincidencias import tokens_ip, tokens_mac
+
+COSTO_MEMO, COSTO_FILTRADO, COSTO_VLAN, COSTO_TABLA = 0, 1, 2, 3
+
+# Comandos que devuelven la misma tabla
+EQUIVALENTES = {"show arp": "show ip arp"}
+
+_INCLUDE_RE = re.compile(r"^(?P<base>.+?)\s*\|\s*include\s+(?P<patron>.+)$", re.I)
+_ARP_IP_RE = re.compile(r"^(?P<base>show (?:ip )?arp)\s+(?P<ip>\d{1,3}(?:\.\d{1,3}){3})$", re.I)
+_MAC_RE = re.compile(r"^(?P<base>show mac address-table)(?:\s+vlan\s+(?P<vlan>\d+))?"
+                     r"(?:\s+address\s+(?P<mac>\S+))?(?:\s+interface\s+(?P<ifz>\S+))?$", re.I)
+
+
+def _base(cmd):
+    cmd = " ".join(cmd.split())
+    return EQUIVALENTES.get(cmd.lower(), cmd)
+
+
+def derivar(cmd):
+    """
+    (tabla, filtro) si `cmd` se puede responder filtrando la salida de la
+    tabla completa `tabla`; filtro(linea) dice si la línea sale. None si no.
+    """
+    cmd = " ".join(cmd.split())
+    m = _INCLUDE_RE.match(cmd)
+    if m:
+        # '| include' de IOS: regex sensible a mayúsculas
+        try:
+            rx = re.compile(m["patron"])
+        except re.error:
+            rx = re.compile(re.escape(m["patron"]))
+        return _base(m["base"]), lambda linea: bool(rx.search(linea))
+    m = _ARP_IP_RE.match(cmd)
+    if m:
+        ip = m["ip"]
+        return _base(m["base"]), lambda linea: ip in tokens_ip(linea)
+    m = _MAC_RE.match(cmd)
+    if m and (m["vlan"] or m["mac"]) and not m["ifz"]:
+        vlan, mac = m["vlan"], re.sub(r"[^0-9a-f]", "", (m["mac"] or "").lower())
+
+        def filtro(linea):
+            campos = linea.split()
+            if not campos or (vlan and campos[0] != vlan):
+                return False
+            return mac in tokens_mac(linea) if mac else bool(tokens_mac(linea))
+        return _base(m["base"]), filtro
+    return None
+
+
+def costo(cmd):
+    """Clase de costo esperada de un comando (sin mirar el memo)."""
+    cmd = " ".join(cmd.split())
+    if _INCLUDE_RE.match(cmd) or _ARP_IP_RE.match(cmd):
+        return COSTO_FILTRADO
+    m = _MAC_RE.match(cmd)
+    if m and (m["mac"] or m["ifz"]):
+        return COSTO_FILTRADO
+    if m and m["vlan"]:
+        return COSTO_VLAN
+    return COSTO_TABLA
+
+
+def planificar(ordenadas, comando_de, memo=None, sesion=None):
+    """
+    Reordena `ordenadas` [(clave, variante), ...] por costo: las que el memo de
+    `sesion` ya responde, luego filtradas, por VLAN y tablas completas. El
+    orden previo (el aprendido) se conserva dentro de cada clase.
+    comando_de(variante) da el comando que correría, o None si no se sabe
+    (esas se tratan como filtradas).
+    """
+    def clave(item):
+        i, (_, variante) = item
+        cmd = comando_de(variante)
+        if cmd is None:
+            return (COSTO_FILTRADO, i)
+        if memo is not None and sesion is not None and memo.responde(sesion, cmd):
+            return (COSTO_MEMO, i)
+        return (costo(cmd), i)
+    return [v for _, v in sorted(enumerate(ordenadas), key=clave)]
+
+
+class MemoTablas:
+    """
+    Salidas de tablas completas por sesión. La entrada muere con la sesión (se
+    guarda por referencia débil) o al pasar su TTL; ttl_de(cmd) da los
+    segundos de frescura de cada tabla.
+    """
+
+    def __init__(self, ttl_de=lambda cmd: 60.0):
+        self.ttl_de = ttl_de
+        self._datos = weakref.WeakKeyDictionary()   # sesion -> {tabla: (ts, salida)}
+        self._lock = threading.Lock()
+        self.stats = {"aciertos": 0, "derivadas": 0, "guardadas": 0}
+
+    def _vigente(self, sesion, tabla):
+        try:
+            item = self._datos.get(sesion, {}).get(tabla)
+        except TypeError:   # la sesión no admite referencias débiles
+            return None
+        if item and time.time() - item[0] <= self.ttl_de(tabla):
+            return item[1]
+        return None
+
+    def responde(self, sesion, cmd):
+        """True si obtener(sesion, cmd) no necesitaría tocar el equipo."""
+        d = derivar(cmd)
+        with self._lock:
+            return self._vigente(sesion, _base(cmd)) is not None or \
+                bool(d and self._vigente(sesion, d[0]) is not None)
+
+    def obtener(self, sesion, cmd):
+        """Salida de `cmd` desde el memo (exacta o filtrada de su tabla), o None."""
+        with self._lock:
+            out = self._vigente(sesion, _base(cmd))
+            if out is not None:
+                self.stats["aciertos"] += 1
+                return out
+            d = derivar(cmd)
+            texto = self._vigente(sesion, d[0]) if d else None
+            if texto is None:
+                return None
+            self.stats["derivadas"] += 1
+        lineas = [ln for ln in texto.splitlines() if d[1](ln)]
+        return "\n".join(lineas) + ("\n" if lineas else "")
+
+    def guardar(self, sesion, cmd, salida):
+        """Guarda `salida` si `cmd` es una tabla completa; devuelve True si la guardó."""
+        if costo(cmd) != COSTO_TABLA or derivar(cmd) is not None:
+            return False
+        with self._lock:
+            try:
+                self._datos.setdefault(sesion, {})[_base(cmd)] = (time.time(), salida)
+            except TypeError:
+                return False
+            self.stats["guardadas"] += 1
+        return True
+
+    def invalidar(self, sesion=None):
+        with self._lock:
+            if sesion is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(sesion, None)
@@ -0,0 +1,216 @@
+# plantillas.py — registro de plantillas TextFSM compiladas una sola vez
+#
+#   from plantillas import REGISTRO
+#   REGISTRO.registrar("show_version", texto=TPL_STRING)
+#   headers, rows = REGISTRO.parsear("show_version", salida)
+#
+# Cada plantilla se compila la primera vez que se usa (desde archivo .tpl o
+# desde un string embebido). Cada hilo reutiliza su propia instancia con
+# Reset(), así que parsear no vuelve a leer ni compilar la plantilla.
+# Para salidas de columnas fijas se puede registrar una ruta nativa
+# (`rapida`) que da exactamente las mismas filas sin pasar por TextFSM.
+# textfsm se importa al compilar la primera plantilla: quien solo use rutas
+# nativas no lo carga.
+
+import codecs
+import copy
+import io
+import os
+import re
+import threading
+
+
+class RegistroPlantillas:
+    def __init__(self):
+        self._fuentes = {}      # nombre -> texto de la plantilla
+        self._rapidas = {}      # nombre -> (header, fn(texto) -> rows)
+        self._compiladas = {}   # nombre -> TextFSM prototipo
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def registrar(self, nombre, texto=None, archivo=None, rapida=None):
+        """
+        Registra una plantilla. Si `archivo` existe se usa su contenido; si no,
+        `texto`. `rapida` = (header, fn) para la ruta nativa opcional.
+        """
+        if archivo and os.path.exists(archivo):
+            with open(archivo, encoding="utf-8") as f:
+                texto = f.read()
+        if texto is None:
+            raise FileNotFoundError(f"No existe la plantilla '{archivo}' y no hay texto embebido para '{nombre}'")
+        with self._lock:
+            self._fuentes[nombre] = texto.replace("\r", "")
+            self._compiladas.pop(nombre, None)
+            if rapida:
+                self._rapidas[nombre] = rapida
+            else:
+                self._rapidas.pop(nombre, None)
+        self._local = threading.local()   # invalida instancias por hilo ya creadas
+
+    def registrar_archivo(self, nombre, archivo):
+        return self.registrar(nombre, archivo=archivo)
+
+    def _prototipo(self, nombre):
+        fsm = self._compiladas.get(nombre)
+        if fsm is None:
+            with self._lock:
+                fsm = self._compiladas.get(nombre)
+                if fsm is None:
+                    import textfsm
+                    fsm = textfsm.TextFSM(io.StringIO(self._fuentes[nombre]))
+                    self._compiladas[nombre] = fsm
+        return fsm
+
+    def parser(self, nombre):
+        """TextFSM nuevo e independiente (sin volver a compilar la plantilla)."""
+        fsm = copy.deepcopy(self._prototipo(nombre))
+        fsm.Reset()
+        return fsm
+
+    def _del_hilo(self, nombre):
+        cache = self._local.__dict__.setdefault("fsm", {})
+        fsm = cache.get(nombre)
+        if fsm is None:
+            fsm = cache[nombre] = self.parser(nombre)
+        else:
+            fsm.Reset()
+        return fsm
+
+    def parsear(self, nombre, texto, rapida=True):
+        """Devuelve (headers, rows). Usa la ruta nativa si existe y rapida=True."""
+        if rapida and nombre in self._rapidas:
+            header, fn = self._rapidas[nombre]
+            return list(header), fn(texto or "")
+        fsm = self._del_hilo(nombre)
+        rows = fsm.ParseText(texto or "")
+        return list(fsm.header), rows
+
+    def ruta_rapida(self, nombre):
+        """(header, fn) de la ruta nativa de `nombre`, o None."""
+        return self._rapidas.get(nombre)
+
+    def verificar_rapida(self, nombre, texto):
+        """True si la ruta nativa da las mismas filas y encabezados que TextFSM."""
+        return self.parsear(nombre, texto, rapida=True) == self.parsear(nombre, texto, rapida=False)
+
+
+REGISTRO = RegistroPlantillas()
+
+
+class ParserIncremental:
+    """
+    Parseo en streaming: recibe trozos (bytes o str) tal como llegan del
+    puerto y devuelve las filas nuevas en cuanto se completa cada línea.
+    No guarda la salida completa: solo la línea a medio llegar y el registro
+    en curso del FSM.
+
+    TextFSM no tiene API pública para parsear por partes sin acumular: se
+    usan dos atributos internos del FSM (_cur_state_name, para parar en End
+    como ParseText, y _result, que se vacía tras entregar cada fila). Probado
+    con textfsm 2.1. Si una versión no los tiene, o la plantilla usa Fillup
+    (que reescribe filas ya entregadas), el texto se junta y se parsea entero
+    en cerrar() (mismas filas, sin streaming).
+
+        p = ParserIncremental("show_ip_int_brief")
+        for trozo in trozos:
+            for fila in p.alimentar(trozo): ...
+        for fila in p.cerrar(): ...
+    """
+
+    def __init__(self, nombre, registro=None, encoding="utf-8", rapida=True):
+        registro = registro or REGISTRO
+        self._dec = codecs.getincrementaldecoder(encoding)(errors="ignore")
+        self._pend = ""
+        self._fsm = None
+        ruta = registro.ruta_rapida(nombre) if rapida else None
+        if ruta:
+            self.header, self._fn = list(ruta[0]), ruta[1]
+        else:
+            self._fsm = registro.parser(nombre)
+            self.header = list(self._fsm.header)
+        self._lineas = None if self._fsm is None or _fsm_incremental(self._fsm) else []
+        self.filas = 0
+
+    def _linea(self, linea):
+        if self._fsm is None:
+            return self._fn(linea)
+        if self._lineas is not None:
+            self._lineas.append(linea)
+            return []
+        # TextFSM deja de leer al llegar a End/EOF, igual que ParseText con el texto completo
+        if self._fsm._cur_state_name in ("End", "EOF"):
+            return []
+        # "\n" para que una línea vacía también pase por las reglas
+        self._fsm.ParseText(linea + "\n", eof=False)
+        return self._vaciar()
+
+    def _vaciar(self):
+        nuevas, self._fsm._result = self._fsm._result, []
+        return nuevas
+
+    def alimentar(self, datos):
+        texto = self._dec.decode(datos) if isinstance(datos, (bytes, bytearray)) else datos
+        if not texto:
+            return []
+        partes = (self._pend + texto).split("\n")
+        self._pend = partes.pop()
+        nuevas = []
+        for linea in partes:
+            nuevas += self._linea(linea.rstrip("\r"))
+        self.filas += len(nuevas)
+        return nuevas
+
+    def cerrar(self):
+        """Procesa la última línea pendiente y el fin de texto (Record implícito / EOF)."""
+        resto = self._pend + self._dec.decode(b"", final=True)
+        self._pend = ""
+        nuevas = self._linea(resto.rstrip("\r")) if resto else []
+        if self._lineas is not None:
+            nuevas = self._fsm.ParseText("\n".join(self._lineas) + "\n")
+            self._lineas = []
+        elif self._fsm is not None:
+            self._fsm.ParseText("", eof=True)
+            nuevas += self._vaciar()
+        self.filas += len(nuevas)
+        return nuevas
+
+
+def _fsm_incremental(fsm):
+    """True si el FSM se puede parsear por partes (atributos internos presentes y sin Fillup)."""
+    if not (isinstance(getattr(fsm, "_result", None), list) and hasattr(fsm, "_cur_state_name")):
+        return False
+    return not any("Fillup" in v.OptionNames() for v in getattr(fsm, "values", ()))
+
+
+# ---------- ruta nativa: 'show ip interface brief' ----------
+# Misma regla que la línea Record de cisco_sh_ip_int_brief.tpl
+HEADER_IP_INT_BRIEF = ("INTERFACE", "IPADDR", "OK", "METHOD", "STATUS", "PROTOCOL")
+_IP_INT_BRIEF_RE = re.compile(
+    r"(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+"
+    r"(administratively down|up|down|deleted|reset|testing|unknown)\s+(up|down)\s*$"
+)
+
+
+def parse_ip_int_brief(texto):
+    match = _IP_INT_BRIEF_RE.match
+    return [list(m.groups()) for m in map(match, texto.splitlines()) if m]
+
+
+RAPIDA_IP_INT_BRIEF = (HEADER_IP_INT_BRIEF, parse_ip_int_brief)
+
+
+if __name__ == "__main__":
+    # Comprueba la ruta nativa contra TextFSM con la plantilla del repo y filas del CSV de ejemplo
+    import csv
+    import sys
+
+    base = os.path.dirname(os.path.abspath(__file__))
+    REGISTRO.registrar("show_ip_int_brief", archivo=os.path.join(base, "cisco_sh_ip_int_brief.tpl"),
+                       rapida=RAPIDA_IP_INT_BRIEF)
+    with open(os.path.join(base, "show_ip_int_brief.csv"), encoding="utf-8") as f:
+        filas = list(csv.reader(f))[1:]
+    texto = "Router#show ip interface brief\nInterface              IP-Address      OK? Method Status                Protocol\n"
+    texto += "\n".join(f"{r[0]:<23}{r[1]:<16}{r[2]:<4}{r[3]:<7}{r[4]:<22}{r[5]}" for r in filas * 200) + "\nRouter#"
+    ok = REGISTRO.verificar_rapida("show_ip_int_brief", texto)
+    print("ruta nativa == TextFSM:", ok)
+    sys.exit(0 if ok else 1)
@@ -1,5 +1,7 @@
-import sys, io, os, csv, time
-import textfsm
+import sys, os, csv, time
+from plantillas import REGISTRO, RAPIDA_IP_INT_BRIEF, ParserIncremental
+from lector_consola import LectorPrompt
+from inventario import Inventario, equipo_de_salida
 
 # Forzar UTF-8 en Windows (bordes)
 try:
@@ -22,6 +24,15 @@ Start
   ^.* -> Continue
 """
 
+# Se compila una sola vez; si existe el .tpl del repo se usa ese, si no la TPL embebida.
+# 'show ip interface brief' tiene además ruta nativa (mismas filas que TextFSM).
+TPL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cisco_sh_ip_int_brief.tpl")
+REGISTRO.registrar("show_ip_int_brief", texto=TPL, archivo=TPL_FILE, rapida=RAPIDA_IP_INT_BRIEF)
+
+# Inventario histórico (ver inventario.py): además del CSV, cada lectura se
+# guarda por (equipo, interfaz, hora) sin duplicar filas que no cambiaron.
+INVENTARIO_DIR = "inventario"   # None = solo CSV
+
 def print_table(headers, rows):
     w = [len(h) for h in headers]
     for r in rows:
@@ -41,11 +52,57 @@ def print_table(headers, rows):
         print(row(r))
     print(line('└', '┴', '┘'))
 
+# ---- NUEVO: salida en streaming (tabla y CSV fila a fila) ----
+# Anchos de columna de 'show ip interface brief' en IOS; si un valor no cabe, la fila se ensancha
+ANCHOS_IP_INT_BRIEF = (23, 15, 3, 7, 21, 8)
+
+class TablaIncremental:
+    """Igual que print_table, pero imprime cada fila en cuanto llega (anchos fijos)."""
+    def __init__(self, headers, anchos=None):
+        self.w = [max(len(h), a) for h, a in zip(headers, anchos or [12] * len(headers))]
+        self.headers = headers
+        self.abierta = False
+
+    def _line(self, l, m, r, fill='─'):
+        return l + m.join(fill * (x + 2) for x in self.w) + r
+
+    def _row(self, vals):
+        return '│' + '│'.join(f' {str(v).ljust(self.w[i])} ' for i, v in enumerate(vals)) + '│'
+
+    def fila(self, r):
+        if not self.abierta:
+            print(self._line('┌', '┬', '┐'))
+            print(self._row(self.headers))
+            print(self._line('├', '┼', '┤'))
+            self.abierta = True
+        print(self._row(r), flush=True)
+
+    def cerrar(self):
+        if self.abierta:
+            print(self._line('└', '┴', '┘'))
+
+class CsvIncremental:
+    """Igual que save_csv_append, pero escribe las filas según llegan."""
+    def __init__(self, headers, path="show_ip_int_brief.csv"):
+        self.headers, self.path = headers, path
+        self.f = self.w = None
+
+    def fila(self, r):
+        if self.f is None:
+            exists = os.path.exists(self.path)
+            self.f = open(self.path, "a", newline="", encoding="utf-8")
+            self.w = csv.writer(self.f)
+            if not exists:
+                self.w.writerow(self.headers)
+        self.w.writerow(r)
+
+    def cerrar(self):
+        if self.f:
+            self.f.close()
+        return os.path.abspath(self.path)
+
 def parse_text(text):
-    tpl = io.StringIO(TPL.replace("\r", ""))
-    fsm = textfsm.TextFSM(tpl)
-    rows = fsm.ParseText(text or "")
-    return fsm.header, rows
+    return REGISTRO.parsear("show_ip_int_brief", text or "")
 
 def save_csv(headers, rows, path="show_ip_int_brief.csv"):
     # comportamiento original: sobrescribe
@@ -65,6 +122,18 @@ def save_csv_append(headers, rows, path="show_ip_int_brief.csv"):
         w.writerows(rows)
     return os.path.abspath(path)
 
+def save_inventory(headers, rows, device, ts=None):
+    """Guarda las filas en el inventario; devuelve (nuevas, sin_cambios) o None si está desactivado."""
+    if not INVENTARIO_DIR:
+        return None
+    return Inventario(INVENTARIO_DIR).registrar("ip_int_brief", device, headers, rows, ts)
+
+def open_inventory(headers, device, ts=None):
+    """Como save_inventory pero fila a fila: .fila(r) según llegan y .cerrar(guardar=True); None si está desactivado."""
+    if not INVENTARIO_DIR:
+        return None
+    return Inventario(INVENTARIO_DIR).registro("ip_int_brief", device, headers, ts)
+
 def try_serial():
     try:
         import serial, serial.tools.list_ports
@@ -87,11 +156,9 @@ def try_serial():
         import serial
         with serial.Serial(port=port, baudrate=9600, timeout=1) as ser:
             time.sleep(1.8)
-            ser.write(b"terminal length 0\r\n"); time.sleep(0.4); _ = ser.read(ser.in_waiting or 1)
-            ser.write(b"show ip interface brief\r\n"); time.sleep(2.0)
-            out = ser.read(ser.in_waiting or 1).decode(errors="ignore")
-            time.sleep(0.8)
-            out += ser.read(ser.in_waiting or 1).decode(errors="ignore")
+            lector = LectorPrompt(ser)
+            lector.comando("terminal length 0", espera_max=1.0)
+            out = lector.comando("show ip interface brief", espera_max=2.0, silencio=0.8)
             return out if out.strip() else None
     except Exception:
         return None
@@ -114,12 +181,15 @@ def detect_port():
     return ports[0].device if ports else None
 
 def send_and_read(ser, cmd, wait=1.0):
-    ser.write((cmd + "\r\n").encode())
-    time.sleep(wait)
-    data = ser.read(ser.in_waiting or 1).decode(errors="ignore")
-    time.sleep(0.3)
-    data += ser.read(ser.in_waiting or 1).decode(errors="ignore")
-    return data
+    """Envía cmd y devuelve la salida en cuanto aparece el prompt (máx `wait` s sin datos)."""
+    return LectorPrompt(ser).comando(cmd, espera_max=wait, silencio=0.8)
+
+def stream_command(ser, cmd, wait=2.0, quiet=0.8):
+    """
+    Envía cmd y va entregando el texto según llega. Termina al ver el prompt
+    tras la respuesta, tras `quiet` s sin datos, o si en `wait` s no llegó nada.
+    """
+    return LectorPrompt(ser).comando_trozos(cmd, espera_max=wait, silencio=quiet)
 
 def is_show_ip_int_brief(cmd: str) -> bool:
     c = " ".join(cmd.strip().lower().split())
@@ -144,30 +214,49 @@ def manual_commands_mode():
     try:
         with serial.Serial(port=port, baudrate=9600, timeout=1) as ser:
             time.sleep(1.5)
-            send_and_read(ser, "terminal length 0", 0.3)
+            device = equipo_de_salida(send_and_read(ser, "terminal length 0", 0.3)) or port
             print(f"\n🔗 Modo manual en {port}. Escribe ':salir' para terminar.\n")
             while True:
                 cmd = input("> ").strip()
                 if cmd == "" or cmd.lower() == ":salir":
                     break
 
-                out = send_and_read(ser, cmd, wait=2.0)
-
                 if is_show_ip_int_brief(cmd):
-                    # Parsear y tabla
-                    headers, rows = parse_text(out)
-                    if rows:
-                        print("\n📊 Resultado (TextFSM):\n")
-                        print_table(headers, rows)
-                        path = save_csv_append(headers, rows)  # anexa, no borra
-                        print(f"\n💾 CSV actualizado: {path}\n")
+                    # Parsear y tabla fila a fila, según llegan los bytes
+                    parser = ParserIncremental("show_ip_int_brief")
+                    tabla = TablaIncremental(parser.header, ANCHOS_IP_INT_BRIEF)
+                    salida_csv = CsvIncremental(parser.header)  # anexa, no borra
+                    inventario = open_inventory(parser.header, device)  # también fila a fila
+                    crudo = []  # solo se guarda mientras no haya filas (para mostrarlo si falla)
+                    for chunk in stream_command(ser, cmd, wait=2.0):
+                        if crudo is not None:
+                            crudo.append(chunk)
+                        for r in parser.alimentar(chunk):
+                            if not tabla.abierta:
+                                print("\n📊 Resultado (TextFSM):\n")
+                                crudo = None
+                            tabla.fila(r)
+                            salida_csv.fila(r)
+                            if inventario: inventario.fila(r)
+                    for r in parser.cerrar():
+                        tabla.fila(r)
+                        salida_csv.fila(r)
+                        if inventario: inventario.fila(r)
+                    tabla.cerrar()
+                    path = salida_csv.cerrar()
+                    if parser.filas:
+                        print(f"\n💾 CSV actualizado: {path}")
+                        inv = inventario.cerrar(guardar=True) if inventario else None
+                        if inv:
+                            print(f"🗃  Inventario ({device}): {inv[0]} filas nuevas, {inv[1]} sin cambios\n")
                     else:
                         print("\n(No se pudo parsear con TextFSM, salida cruda):\n")
-                        print(out)
+                        print("".join(crudo or []))
                 else:
-                    # Cualquier otro comando: salida cruda
+                    # Cualquier otro comando: salida cruda, según llega
                     print("\n--- Salida ---\n")
-                    print(out)
+                    for chunk in stream_command(ser, cmd, wait=2.0):
+                        print(chunk, end="", flush=True)
                     print("\n--------------\n")
 
     except Exception as e:
@@ -197,6 +286,10 @@ def main():
     print_table(headers, rows)
     out_csv = save_csv(headers, rows)  # comportamiento original
     print(f"\n💾 CSV guardado: {out_csv}")
+    device = equipo_de_salida(text) or "consola"
+    inv = save_inventory(headers, rows, device)
+    if inv:
+        print(f"🗃  Inventario ({device}): {inv[0]} filas nuevas, {inv[1]} sin cambios")
 
     # ---- NUEVO: preguntar si quieres entrar al modo manual ----
     ans = input("\n¿Entrar a modo de comandos manuales? (s/n): ").strip().lower()
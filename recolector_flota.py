@@ -0,0 +1,246 @@
+# recolector_flota.py — 'show ip interface brief' de muchos equipos a la vez (SSH o consola)
+#
+#   python recolector_flota.py equipos.csv [--paralelo 16] [--formato csv|columnas]
+#                              [--salida ip_int_brief_flota] [--timeout 20]
+#
+# equipos.csv (cabeceras sin distinguir mayúsculas; sirve también Data.csv):
+#   equipo,host,username,password[,device_type][,ssh_port]      -> por SSH (netmiko)
+#   Device,Port,User,Password[,baudios]                         -> por consola si Port es COMx o /dev/...
+#
+# Los equipos SSH se recolectan con un pool acotado de hilos; los de consola
+# con un hilo por puerto (las filas que comparten puerto van en orden). El
+# parseo es el mismo TPL de 'python show_ip_int_brief_mi.py' y la salida se
+# escribe con su save_csv: un solo archivo por corrida con DEVICE y
+# COLLECTED_AT delante de las columnas del TPL (o, con --formato columnas, un
+# JSON con una lista por columna). Las filas van además al inventario
+# histórico. Al final se imprime y guarda un resumen con el tiempo y el
+# error de cada equipo.
+
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from inventario import Inventario
+
+SCRIPT_IP_INT_BRIEF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python show_ip_int_brief_mi.py")
+COMANDO = "show ip interface brief"
+MAX_PARALELO = 16
+TIMEOUT_S = 20
+CAMPOS_RESUMEN = ("equipo", "via", "destino", "estado", "filas", "segundos", "error")
+
+_CONSOLA_RE = re.compile(r"^(COM\d+|/dev/\S+)$", re.I)
+
+
+def _cargar_script():
+    # el nombre del archivo tiene un espacio: no se puede importar con 'import'
+    spec = importlib.util.spec_from_file_location("show_ip_int_brief_mi", SCRIPT_IP_INT_BRIEF)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+IIB = _cargar_script()
+
+
+# ----------------- inventario de equipos -----------------
+def _campo(fila, *nombres):
+    for n in nombres:
+        v = fila.get(n)
+        if v:
+            return v
+    return ""
+
+
+def leer_equipos(path):
+    """Filas del CSV -> dicts {equipo, via ('ssh'|'consola'), destino, ...}."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        filas = [{(k or "").strip().lower(): (v or "").strip() for k, v in r.items()} for r in csv.DictReader(f)]
+    equipos = []
+    for r in filas:
+        host = _campo(r, "host", "ip")
+        consola = _campo(r, "port", "puerto_serie", "consola")
+        eq = {
+            "equipo": _campo(r, "equipo", "device", "name", "host_name") or host or consola,
+            "username": _campo(r, "username", "user", "usuario"),
+            "password": _campo(r, "password", "clave"),
+            "secret": _campo(r, "secret", "enable"),
+        }
+        if host:
+            eq.update(via="ssh", destino=host, device_type=_campo(r, "device_type") or "cisco_ios",
+                      puerto=int(_campo(r, "ssh_port") or 22))
+        elif _CONSOLA_RE.match(consola):
+            eq.update(via="consola", destino=consola, baudios=int(_campo(r, "baudios", "baud") or 9600))
+        else:
+            continue
+        equipos.append(eq)
+    return equipos
+
+
+# ----------------- recolección -----------------
+def _por_ssh(eq, timeout):
+    from netmiko import ConnectHandler   # solo hace falta si hay equipos por SSH
+    conn = ConnectHandler(device_type=eq["device_type"], host=eq["destino"], port=eq["puerto"],
+                          username=eq["username"], password=eq["password"], secret=eq["secret"] or "",
+                          conn_timeout=timeout)
+    try:
+        return conn.send_command(COMANDO, use_textfsm=False, read_timeout=timeout)
+    finally:
+        conn.disconnect()
+
+
+def _por_consola(eq, timeout):
+    from baudios import abrir_consola
+    from lector_consola import LectorPrompt
+    ser, _ = abrir_consola(eq["destino"], candidatos=(eq["baudios"], 9600, 115200))
+    if ser is None:
+        raise RuntimeError("la consola no respondió")
+    try:
+        lector = LectorPrompt(ser)
+        lector.comando("terminal length 0", espera_max=1.0)
+        return lector.comando(COMANDO, espera_max=timeout, silencio=0.8)
+    finally:
+        ser.close()
+
+
+def recolectar_equipo(eq, timeout=TIMEOUT_S):
+    """Devuelve (resumen, headers, filas) de un equipo; nunca lanza."""
+    t0 = time.monotonic()
+    res = {"equipo": eq["equipo"], "via": eq["via"], "destino": eq["destino"],
+           "estado": "ok", "filas": 0, "segundos": 0.0, "error": ""}
+    headers, filas = [], []
+    try:
+        texto = (_por_ssh if eq["via"] == "ssh" else _por_consola)(eq, timeout)
+        headers, filas = IIB.parse_text(texto)
+        res["filas"] = len(filas)
+        if not filas:
+            res.update(estado="sin-filas", error=" ".join((texto or "").split())[:120])
+    except Exception as e:
+        res.update(estado="error", error=f"{type(e).__name__}: {e}")
+    res["segundos"] = round(time.monotonic() - t0, 2)
+    return res, headers, filas
+
+
+def recolectar(equipos, paralelo=MAX_PARALELO, timeout=TIMEOUT_S, al_terminar=None):
+    """
+    Recolecta todos los equipos. SSH en un pool de `paralelo` hilos; consola
+    en un hilo por puerto. al_terminar(resumen) se llama según acaba cada uno.
+    Devuelve [(resumen, headers, filas)] en el orden del inventario.
+    """
+    orden = {id(eq): i for i, eq in enumerate(equipos)}
+    por_puerto = OrderedDict()
+    for eq in equipos:
+        if eq["via"] == "consola":
+            por_puerto.setdefault(eq["destino"].upper(), []).append(eq)
+
+    def puerto(eqs):
+        return [(eq, recolectar_equipo(eq, timeout)) for eq in eqs]
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(1, paralelo)) as ex_ssh, \
+            ThreadPoolExecutor(max_workers=max(1, len(por_puerto))) as ex_consola:
+        futs = [ex_ssh.submit(lambda e=eq: [(e, recolectar_equipo(e, timeout))])
+                for eq in equipos if eq["via"] == "ssh"]
+        futs += [ex_consola.submit(puerto, eqs) for eqs in por_puerto.values()]
+        for fut in as_completed(futs):
+            for eq, r in fut.result():
+                resultados[orden[id(eq)]] = r
+                if al_terminar:
+                    al_terminar(r[0])
+    return [resultados[i] for i in sorted(resultados)]
+
+
+# ----------------- salida -----------------
+def escribir(resultados, base, formato="csv", ts=None):
+    """Un archivo por corrida con DEVICE y COLLECTED_AT delante. Devuelve la ruta."""
+    ts = ts or time.time()
+    cuando = datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+    headers = next((h for _, h, f in resultados if h), None)
+    if headers is None:
+        return None
+    cols = ["DEVICE", "COLLECTED_AT"] + list(headers)
+    filas = [[r["equipo"], cuando] + list(f) for r, h, fs in resultados for f in fs]
+    sello = datetime.fromtimestamp(ts).strftime("%Y%m%d-%H%M%S")
+    if formato == "columnas":
+        path = f"{base}_{sello}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"columnas": cols, "datos": {c: [fila[i] for fila in filas] for i, c in enumerate(cols)}},
+                      f, ensure_ascii=False)
+        return os.path.abspath(path)
+    return IIB.save_csv(cols, filas, f"{base}_{sello}.csv")
+
+
+def guardar_inventario(resultados, ts=None):
+    if not IIB.INVENTARIO_DIR:
+        return None
+    inv = Inventario(IIB.INVENTARIO_DIR)
+    total = [0, 0]
+    for r, headers, filas in resultados:
+        if filas:
+            nuevas, iguales = inv.registrar("ip_int_brief", r["equipo"], headers, filas, ts, guardar=False)
+            total[0] += nuevas
+            total[1] += iguales
+    inv.guardar()
+    return tuple(total)
+
+
+def escribir_resumen(resultados, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=CAMPOS_RESUMEN)
+        w.writeheader()
+        w.writerows(r for r, _, _ in resultados)
+    return os.path.abspath(path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="show ip interface brief de toda la flota")
+    ap.add_argument("equipos", help="CSV con los equipos (SSH y/o consola)")
+    ap.add_argument("--paralelo", type=int, default=MAX_PARALELO, help="sesiones SSH a la vez")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT_S, help="s por equipo (conexión y comando)")
+    ap.add_argument("--formato", choices=("csv", "columnas"), default="csv")
+    ap.add_argument("--salida", default="ip_int_brief_flota", help="prefijo de los archivos de salida")
+    args = ap.parse_args(argv)
+
+    equipos = leer_equipos(args.equipos)
+    if not equipos:
+        print("⚠️ El inventario no tiene equipos con host (SSH) ni puerto de consola.")
+        return 2
+    print(f"🔎 Recolectando {len(equipos)} equipos ({args.paralelo} SSH a la vez)...")
+    t0, ts = time.monotonic(), time.time()
+    hechos = [0]
+
+    def avance(r):
+        hechos[0] += 1
+        marca = "✅" if r["estado"] == "ok" else "❌"
+        print(f"  [{hechos[0]:>4}/{len(equipos)}] {marca} {r['equipo']:<24} {r['segundos']:>6.1f}s  "
+              f"{r['filas']:>3} filas  {r['error']}", flush=True)
+
+    resultados = recolectar(equipos, args.paralelo, args.timeout, avance)
+    salida = escribir(resultados, args.salida, args.formato, ts)
+    inv = guardar_inventario(resultados, ts)
+    resumen = escribir_resumen(resultados, f"{args.salida}_{datetime.fromtimestamp(ts):%Y%m%d-%H%M%S}_resumen.csv")
+
+    ok = [r for r, _, _ in resultados if r["estado"] == "ok"]
+    fallos = [r for r, _, _ in resultados if r["estado"] != "ok"]
+    tiempos = sorted(r["segundos"] for r, _, _ in resultados)
+    print(f"\n📊 {len(ok)}/{len(resultados)} equipos OK en {time.monotonic() - t0:.1f}s "
+          f"(por equipo: mediana {tiempos[len(tiempos) // 2]:.1f}s, máx {tiempos[-1]:.1f}s)")
+    for r in sorted(fallos, key=lambda r: r["equipo"]):
+        print(f"   ❌ {r['equipo']:<24} {r['via']:<8} {r['estado']:<10} {r['error']}")
+    if salida:
+        print(f"💾 Salida: {salida}")
+    if inv:
+        print(f"🗃  Inventario: {inv[0]} filas nuevas, {inv[1]} sin cambios")
+    print(f"📄 Resumen: {resumen}")
+    return 0 if not fallos else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,7 @@
-import re
 import time
 import serial  # pyserial
 
-# Detecta prompt típico de Cisco (ej: Router> o R1#)
-PROMPT_RE = re.compile(r"[^\r\n]{1,64}[>#]\s?$")
+from lector_consola import LectorPrompt, PROMPT_RE  # PROMPT_RE: detecta prompt típico de Cisco (ej: Router> o R1#)
 
 class RouterCisco:
     def __init__(self, puerto="COM10", baudios=9600, timeout=1):
@@ -25,23 +23,29 @@ class RouterCisco:
             print(f"[!] Error al abrir {self.puerto}: {e}")
             self.conexion = None
 
+    def _trozos_hasta_prompt(self, espera_max=3.0):
+        """Entrega el texto según llega, hasta detectar el prompt o agotar tiempo."""
+        if not self.conexion or not self.conexion.is_open:
+            return
+        yield from LectorPrompt(self.conexion).trozos(espera_max=espera_max)
+
     def _leer_hasta_prompt(self, espera_max=3.0):
         """Lee datos hasta detectar el prompt o agotar tiempo."""
+        return "".join(self._trozos_hasta_prompt(espera_max))
+
+    def enviar_comando_stream(self, comando: str, espera_max=3.0):
+        """
+        Como enviar_comando, pero entrega la salida en trozos (str) según llega,
+        para imprimirla o parsearla (ver plantillas.ParserIncremental) sin esperar al final.
+        """
         if not self.conexion or not self.conexion.is_open:
-            return ""
-        fin = time.time() + espera_max
-        buffer = bytearray()
-        while time.time() < fin:
-            chunk = self.conexion.read(self.conexion.in_waiting or 1)
-            if chunk:
-                buffer += chunk
-                # ¿ya terminó en prompt?
-                ult_linea = buffer.decode("utf-8", errors="ignore").splitlines()[-1:] or [""]
-                if PROMPT_RE.search(ult_linea[0]):
-                    break
-            else:
-                time.sleep(0.05)
-        return buffer.decode("utf-8", errors="ignore")
+            print("[!] No hay conexión abierta.")
+            return
+        try:
+            self.conexion.write((comando + "\r\n").encode("utf-8", errors="ignore"))
+            yield from self._trozos_hasta_prompt(espera_max=espera_max)
+        except serial.SerialException as e:
+            yield f"[!] Error de E/S serial: {e}"
 
     def enviar_comando(self, comando: str):
         """
@@ -80,9 +84,12 @@ def main():
             cmd = input("> ").strip()
             if cmd.lower() in ("quit", "salir"):
                 break
-            respuesta = router.enviar_comando(cmd)
-            if respuesta:
-                print(respuesta, end="" if respuesta.endswith("\n") else "\n")
+            ultimo = "\n"
+            for trozo in router.enviar_comando_stream(cmd):
+                print(trozo, end="", flush=True)
+                ultimo = trozo
+            if not ultimo.endswith("\n"):
+                print()
     finally:
         router.cerrar()
 
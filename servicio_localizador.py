@@ -0,0 +1,311 @@
+# servicio_localizador.py — lucero residente: sesiones, tablas y resultados calientes tras una API HTTP local
+#
+#   python servicio_localizador.py [--puerto 8765] [--escuchar 127.0.0.1] [--precalentar]
+#                                  [--sondeo] [--resultado-ttl 30] [--sesion-inactiva 1800]
+#                                  [--nivel-log WARNING] [--verboso]
+#
+# Cada ejecución de lucero.py / uni2.py paga la importación de netmiko y
+# textfsm, los logins SSH y las tablas frías antes de la primera búsqueda.
+# Este proceso se queda vivo y conserva todo eso entre consultas: el pool de
+# sesiones de lucero (con keepalive), el índice de tablas ARP/DHCP/MAC, la
+# caché de puertos, el historial y además los reportes recientes por IP.
+# Varias consultas a la vez a la misma IP comparten un solo recorrido.
+#
+# API (JSON, solo en localhost por defecto):
+#   GET  /localizar?ip=10.0.0.5[&motor=lucero|uni2][&fresco=1]
+#        -> {"reporte": {...CAMPOS_REPORTE...}, "cache": false, "segundos": 0.41}
+#   POST /lote   {"ips": ["10.0.0.5", "10.0.1.0/24"]}   -> {"reportes": [...], "segundos": ...}
+#        (hasta LOTE_MAX_IPS IPs; solo los reportes 'ok' quedan para /localizar)
+#   GET  /estado -> contadores del servicio, del pool de sesiones y del sondeo
+#
+# Con --sondeo corre además sondeo.py en un hilo, que mantiene las tablas
+# frescas y registra los cambios. El cliente es localizar.py.
+
+import argparse
+import ipaddress
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import lucero
+
+PUERTO = 8765
+ESCUCHAR = "127.0.0.1"
+RESULTADO_TTL = 30          # seg. que se devuelve el mismo reporte sin volver a buscar
+RESULTADOS_MAX = 4096
+LOTE_MAX_IPS = 4096         # IPs por POST /lote (ya expandidas las redes)
+SESION_MAX_INACTIVA = 1800  # el servicio conserva las sesiones más que un script suelto
+MOTORES = ("lucero", "uni2")
+
+log = logging.getLogger("servicio_localizador")
+
+
+# ----------------- reportes recientes -----------------
+class ResultadosRecientes:
+    """
+    Reportes por clave con TTL. Si llegan varias consultas por la misma clave
+    mientras se calcula, esperan al primero en vez de repetir el recorrido.
+    """
+
+    def __init__(self, ttl=RESULTADO_TTL, maximo=RESULTADOS_MAX):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos = {}       # clave -> (t, reporte), en orden de inserción
+        self._en_curso = {}    # clave -> Event
+        self._lock = threading.Lock()
+
+    def _vigente(self, clave):
+        hit = self._datos.get(clave)
+        return hit[1] if hit and time.monotonic() - hit[0] < self.ttl else None
+
+    def obtener(self, clave, calcular, fresco=False):
+        """Devuelve (reporte, de_cache)."""
+        with self._lock:
+            r = None if fresco else self._vigente(clave)
+            if r is not None:
+                return r, True
+            ev = self._en_curso.get(clave)
+            propio = ev is None
+            if propio:
+                ev = self._en_curso[clave] = threading.Event()
+        if not propio:
+            ev.wait()
+            with self._lock:
+                r = self._vigente(clave)
+            if r is not None:
+                return r, True
+            return calcular(), False   # el primero falló: se intenta aparte
+        try:
+            r = calcular()
+            self.guardar(clave, r)
+            return r, False
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+            ev.set()
+
+    def guardar(self, clave, reporte):
+        with self._lock:
+            self._datos.pop(clave, None)
+            self._datos[clave] = (time.monotonic(), reporte)
+            while len(self._datos) > self.maximo:
+                del self._datos[next(iter(self._datos))]
+
+    def __len__(self):
+        return len(self._datos)
+
+
+# ----------------- motores -----------------
+def _localizar_lucero(ip):
+    return lucero.localizar(ip)
+
+
+def _localizar_uni2(ip):
+    import uni2   # solo se carga (tabulate, TextFSM) si alguien lo pide
+    uni2.log.setLevel(lucero.log.level)   # el mismo --nivel-log que lucero
+    info = None
+    if uni2.TRACE_MODE:
+        uni2.TOPOLOGY.start()
+        try:
+            info = uni2.trace_location(ip)
+        except Exception as e:
+            log.warning(f"traza LLDP de {ip} falló ({e}); se consultan todos los switches")
+    info = info or uni2.resolve_location(ip)
+    if not info:
+        return {"ip": ip, "estado": "sin-puerto"}
+    return dict(info, estado="ok", puerto=info["port"])
+
+
+LOCALIZADORES = {"lucero": _localizar_lucero, "uni2": _localizar_uni2}
+
+
+# ----------------- servicio -----------------
+class Servicio:
+    def __init__(self, resultado_ttl=RESULTADO_TTL):
+        self.resultados = ResultadosRecientes(resultado_ttl)
+        self.inicio = time.time()
+        self.sondeo = None
+        self._lock = threading.Lock()
+        self.contadores = {"consultas": 0, "desde_cache": 0, "lotes": 0, "errores": 0, "en_curso": 0}
+
+    def _contar(self, **deltas):
+        with self._lock:
+            for k, d in deltas.items():
+                self.contadores[k] += d
+
+    def localizar(self, ip, motor="lucero", fresco=False):
+        if "/" in (ip or ""):
+            raise ValueError(f"{ip} es una red; para varias IPs usar /lote")
+        ip = str(ipaddress.ip_address((ip or "").strip()))
+        if motor not in LOCALIZADORES:
+            raise ValueError(f"motor desconocido: {motor}")
+        t0 = time.monotonic()
+        self._contar(consultas=1, en_curso=1)
+        try:
+            r, de_cache = self.resultados.obtener((motor, ip), lambda: LOCALIZADORES[motor](ip), fresco)
+        except Exception:
+            self._contar(errores=1)
+            raise
+        finally:
+            self._contar(en_curso=-1)
+        if de_cache:
+            self._contar(desde_cache=1)
+        return {"reporte": r, "cache": de_cache, "segundos": round(time.monotonic() - t0, 3)}
+
+    def lote(self, objetivos):
+        if isinstance(objetivos, str) or not isinstance(objetivos, list):
+            raise ValueError("'ips' debe ser una lista")
+        if len(objetivos) > LOTE_MAX_IPS:
+            raise ValueError(f"demasiados objetivos (máximo {LOTE_MAX_IPS} IPs)")
+        ips = lucero.expandir_objetivos(objetivos, max_ips=LOTE_MAX_IPS)
+        t0 = time.monotonic()
+        self._contar(lotes=1, en_curso=1)
+        try:
+            reportes = lucero.localizar_lote(ips)
+        finally:
+            self._contar(en_curso=-1)
+        # un lote con un switch caído da 'sin-mac' falsos: solo se recuerdan los hallados
+        for r in reportes:
+            if r["estado"] == "ok":
+                self.resultados.guardar(("lucero", r["ip"]), r)
+        return {"reportes": reportes, "segundos": round(time.monotonic() - t0, 3)}
+
+    def precalentar(self):
+        """Abre las sesiones y descarga las tablas de todos los switches de lucero."""
+        def refrescar(eq):
+            with lucero.POOL.sesion(eq) as s:
+                lucero.INDICE.refrescar(s, eq["ip"], lucero.IndiceRed.TABLAS_IP + ("mac",))
+        t0 = time.monotonic()
+        res = list(lucero._por_switch(refrescar, True))
+        log.warning(f"precalentados {len(res)} switches en {time.monotonic() - t0:.1f}s")
+
+    def arrancar_sondeo(self, **kw):
+        from sondeo import Sondeo
+        self.sondeo = Sondeo(list(lucero.EQUIPOS_RED), **kw)
+        threading.Thread(target=self.sondeo.correr, name="sondeo", daemon=True).start()
+
+    def estado(self):
+        with self._lock:
+            c = dict(self.contadores)
+        return {
+            "activo_desde": round(self.inicio, 3),
+            "segundos_activo": round(time.time() - self.inicio, 1),
+            "contadores": c,
+            "reportes_recientes": len(self.resultados),
+            "sesiones": dict(lucero.POOL.stats),
+            "memo_tablas": dict(lucero.MEMO.stats),
+            "motores_cargados": [m for m in MOTORES if m in sys.modules],
+            "sondeo": self.sondeo.resumen() if self.sondeo else None,
+        }
+
+
+class Manejador(BaseHTTPRequestHandler):
+    servicio = None   # lo asigna servir()
+
+    def log_message(self, fmt, *args):
+        log.info("%s %s", self.address_string(), fmt % args)
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _atender(self, fn):
+        try:
+            self._responder(200, fn())
+        except (ValueError, KeyError) as e:
+            self._responder(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            log.exception("error atendiendo %s", self.path)
+            self._responder(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/localizar":
+            self._atender(lambda: self.servicio.localizar(q["ip"], q.get("motor", "lucero"),
+                                                          q.get("fresco") in ("1", "true", "si")))
+        elif url.path == "/estado":
+            self._atender(self.servicio.estado)
+        else:
+            self._responder(404, {"error": f"ruta desconocida: {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/lote":
+            return self._responder(404, {"error": f"ruta desconocida: {self.path}"})
+
+        def lote():
+            n = int(self.headers.get("Content-Length") or 0)
+            cuerpo = json.loads(self.rfile.read(n) or b"{}")
+            return self.servicio.lote(cuerpo["ips"])
+        self._atender(lote)
+
+
+def _silenciar_stdout():
+    """
+    Los print() de lucero/uni2 son para la consola interactiva; en el servicio
+    se descartan y sus loggers escriben en stderr.
+    """
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    for nombre in ("lucero", "uni2"):
+        h = logging.StreamHandler(sys.stderr)
+        h.setFormatter(logging.Formatter("%(message)s"))
+        logging.getLogger(nombre).addHandler(h)
+
+
+def servir(puerto=PUERTO, escuchar=ESCUCHAR, servicio=None):
+    """Crea el servidor HTTP (sin arrancarlo). Devuelve (servidor, servicio)."""
+    servicio = servicio or Servicio()
+    manejador = type("ManejadorLocalizador", (Manejador,), {"servicio": servicio})
+    srv = ThreadingHTTPServer((escuchar, puerto), manejador)
+    srv.daemon_threads = True
+    return srv, servicio
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Servicio residente de localización de IPs")
+    ap.add_argument("--puerto", type=int, default=PUERTO)
+    ap.add_argument("--escuchar", default=ESCUCHAR, help="dirección de escucha (por defecto solo localhost)")
+    ap.add_argument("--resultado-ttl", type=float, default=RESULTADO_TTL,
+                    help="seg. que se reutiliza el reporte de una IP (0 = nunca)")
+    ap.add_argument("--sesion-inactiva", type=float, default=SESION_MAX_INACTIVA,
+                    help="seg. sin uso antes de cerrar una sesión SSH del pool")
+    ap.add_argument("--precalentar", action="store_true", help="al arrancar abre sesiones y descarga tablas")
+    ap.add_argument("--sondeo", action="store_true", help="mantiene las tablas frescas con sondeo.py")
+    ap.add_argument("--nivel-log", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="WARNING")
+    ap.add_argument("--verboso", action="store_true", help="deja en pantalla los print() de cada búsqueda")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.nivel_log), format="%(asctime)s %(message)s")
+    lucero.enable_discreet_mode(getattr(logging, args.nivel_log))
+    lucero.POOL.max_inactiva = args.sesion_inactiva
+    srv, servicio = servir(args.puerto, args.escuchar, Servicio(args.resultado_ttl))
+    print(f"Localizador escuchando en http://{args.escuchar}:{args.puerto} "
+          f"({len(lucero.EQUIPOS_RED)} switches). Ctrl+C para salir.", flush=True)
+    if not args.verboso:
+        _silenciar_stdout()
+    if args.precalentar:
+        servicio.precalentar()
+    if args.sondeo:
+        servicio.arrancar_sondeo()
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        if servicio.sondeo:
+            servicio.sondeo.detener()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+# sesiones.py — pool de sesiones SSH persistentes, reutilizables entre etapas y búsquedas
+#
+# Uso:
+#   POOL = PoolSesiones(conectar)          # conectar(dev) -> sesión netmiko
+#   with POOL.sesion(dev) as s:
+#       s.send_command("show ip arp")
+#
+# Cada equipo tiene su propia lista de sesiones libres. Al pedir una sesión se
+# reutiliza una libre (verificando que el canal siga vivo) o se abre una nueva.
+# Un hilo de mantenimiento manda keepalives a las sesiones ociosas y cierra las
+# que llevan demasiado tiempo sin usarse.
+#
+# enviar_lote(sesion, comandos) manda varios 'show' en una sola escritura al
+# canal y separa las salidas por el eco de cada comando y el prompt que la
+# cierra: N comandos cuestan un viaje de ida y vuelta en vez de N. Si el lote
+# falla, el canal se vacía hasta un prompt propio antes de seguir; si no se
+# logra, se lanza CanalDesincronizado para que el pool descarte la sesión.
+
+import atexit
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+def clave_equipo(dev):
+    """Identifica a un equipo: misma clave => se puede reutilizar la sesión."""
+    return (dev.get("device_type"), dev.get("ip") or dev.get("host"),
+            dev.get("port"), dev.get("username"))
+
+
+def _cerrar(s):
+    try:
+        s.disconnect()
+    except Exception:
+        pass
+
+
+def _esta_viva(s):
+    try:
+        return bool(s.is_alive())
+    except Exception:
+        return False
+
+
+class PoolSesiones:
+    def __init__(self, fabrica, max_inactiva=300.0, keepalive=60.0, max_por_equipo=2):
+        """
+        fabrica:        función dev -> sesión nueva (handshake + terminal length 0 + enable).
+        max_inactiva:   segundos sin uso tras los cuales la sesión se cierra.
+        keepalive:      cada cuánto se comprueba (y mantiene) una sesión ociosa.
+        max_por_equipo: sesiones libres que se guardan por equipo.
+        """
+        self.fabrica = fabrica
+        self.max_inactiva = max_inactiva
+        self.keepalive = keepalive
+        self.max_por_equipo = max_por_equipo
+        self._libres = {}   # clave -> [[sesion, t_ultimo_uso, t_ultimo_check], ...]
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._parar = threading.Event()
+        self.stats = {"nuevas": 0, "reusadas": 0, "reconectadas": 0, "expiradas": 0}
+
+    # ---------------- API ----------------
+    @contextmanager
+    def sesion(self, dev):
+        """Presta una sesión para `dev`. Si el bloque lanza excepción la sesión se descarta."""
+        s = self.tomar(dev)
+        try:
+            yield s
+        except Exception:
+            _cerrar(s)
+            raise
+        else:
+            self.devolver(dev, s)
+
+    def tomar(self, dev):
+        k = clave_equipo(dev)
+        while True:
+            with self._lock:
+                libres = self._libres.get(k)
+                item = libres.pop() if libres else None
+            if item is None:
+                break
+            s, t_uso, t_check = item
+            ahora = time.time()
+            if ahora - t_uso > self.max_inactiva:
+                self.stats["expiradas"] += 1
+                _cerrar(s)
+                continue
+            if ahora - t_check > self.keepalive and not _esta_viva(s):
+                # canal caducado (timeout del equipo, reinicio, etc.): reconectar
+                self.stats["reconectadas"] += 1
+                _cerrar(s)
+                continue
+            self.stats["reusadas"] += 1
+            return s
+        self.stats["nuevas"] += 1
+        return self.fabrica(dev)
+
+    def devolver(self, dev, s):
+        k = clave_equipo(dev)
+        ahora = time.time()
+        with self._lock:
+            libres = self._libres.setdefault(k, [])
+            if len(libres) < self.max_por_equipo:
+                libres.append([s, ahora, ahora])
+                s = None
+        if s is not None:
+            _cerrar(s)
+        self._arrancar_mantenimiento()
+
+    def descartar(self, dev=None):
+        """Cierra las sesiones libres de un equipo (o de todos si dev es None)."""
+        with self._lock:
+            if dev is None:
+                items = [it for libres in self._libres.values() for it in libres]
+                self._libres.clear()
+            else:
+                items = self._libres.pop(clave_equipo(dev), [])
+        for s, _, _ in items:
+            _cerrar(s)
+
+    def cerrar_todo(self):
+        self._parar.set()
+        self.descartar()
+
+    # ------------- mantenimiento -------------
+    def _arrancar_mantenimiento(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="pool-sesiones", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while not self._parar.wait(max(1.0, self.keepalive / 2)):
+            self.mantenimiento()
+
+    def mantenimiento(self):
+        """Expulsa sesiones ociosas y manda keepalive a las que lo necesitan."""
+        ahora = time.time()
+        revisar = []
+        with self._lock:
+            for k, libres in self._libres.items():
+                vigentes = []
+                for it in libres:
+                    if ahora - it[1] > self.max_inactiva:
+                        self.stats["expiradas"] += 1
+                        _cerrar(it[0])
+                    elif ahora - it[2] > self.keepalive:
+                        revisar.append((k, it))   # se saca del pool mientras se revisa
+                    else:
+                        vigentes.append(it)
+                libres[:] = vigentes
+        for k, it in revisar:
+            if not _esta_viva(it[0]):   # is_alive() también sirve de keepalive
+                _cerrar(it[0])
+                continue
+            it[2] = time.time()
+            with self._lock:
+                self._libres.setdefault(k, []).append(it)
+
+
+def pool_con_cierre(fabrica, **kw):
+    """Crea un pool y registra su cierre al salir del proceso."""
+    pool = PoolSesiones(fabrica, **kw)
+    atexit.register(pool.cerrar_todo)
+    return pool
+
+
+# ----------------- varios comandos en un viaje -----------------
+_FIN_LINEA_RE = re.compile(r"\r+\n?")
+
+
+class CanalDesincronizado(ConnectionError):
+    """
+    Quedó salida sin leer en el canal y no se pudo vaciar: la sesión ya no
+    sirve (la próxima lectura devolvería la respuesta de otro comando). No
+    hay que atraparla dentro de POOL.sesion(), así el pool la cierra.
+    """
+
+
+def resincronizar(sesion, base_prompt, espera=10.0, silencio=0.3):
+    """
+    Manda un salto de línea y lee (descartando) hasta que el canal termina en
+    el prompt y no llega nada más durante `silencio` s. Así lo que quedó
+    pendiente de un lote (salidas a medias, prompts atrasados) sale antes del
+    prompt que responde a ese salto. Devuelve True si se logró en `espera` s.
+    """
+    final_re = re.compile(rf"[\r\n]{re.escape(base_prompt)}\S*[>#]\s*$")
+    try:
+        sesion.write_channel(getattr(sesion, "RETURN", "\n"))
+        resto, fin = "", time.monotonic() + espera
+        quieto = time.monotonic()
+        while time.monotonic() < fin:
+            nuevo = sesion.read_channel()
+            if nuevo:
+                resto, quieto = resto + nuevo, time.monotonic()
+            elif final_re.search("\n" + resto) and time.monotonic() - quieto >= silencio:
+                return True
+            time.sleep(0.02)
+    except Exception:
+        pass
+    return False
+
+
+def dividir_salidas(texto, comandos, base_prompt):
+    """
+    Separa la salida de un lote: cada comando empieza en su eco y termina en
+    la siguiente línea que abre con el prompt. Devuelve las salidas que se
+    pudieron delimitar (menos que comandos si el texto está incompleto).
+    """
+    texto = _FIN_LINEA_RE.sub("\n", texto)
+    prompt_re = re.compile(rf"^{re.escape(base_prompt)}\S*[>#]", re.M)
+    salidas, pos = [], 0
+    for cmd in comandos:
+        eco = texto.find(cmd.strip(), pos)
+        ini = texto.find("\n", eco) if eco >= 0 else -1
+        fin = prompt_re.search(texto, ini + 1) if ini >= 0 else None
+        if fin is None:
+            break
+        salidas.append(texto[ini + 1:fin.start()])
+        pos = fin.end()
+    return salidas
+
+
+def enviar_lote(sesion, comandos, read_timeout=20.0):
+    """
+    Ejecuta `comandos` en `sesion` (netmiko, ya en el prompt y sin paginación)
+    con una sola escritura y devuelve sus salidas en el mismo orden. Si la
+    sesión no expone el canal (o es un solo comando) se usa send_command.
+    Lanza TimeoutError si no llegan todos los prompts en `read_timeout` s
+    (con el canal ya vaciado: se puede seguir con send_command) y
+    CanalDesincronizado si tras un fallo el canal no vuelve al prompt.
+    """
+    comandos = list(comandos)
+    base_prompt = getattr(sesion, "base_prompt", None)
+    if len(comandos) < 2 or not (base_prompt and hasattr(sesion, "write_channel")):
+        return [sesion.send_command(c, use_textfsm=False, read_timeout=read_timeout) for c in comandos]
+
+    span = getattr(sesion, "span", None)   # SesionInstrumentada: un span por lote
+    with span(" ; ".join(comandos), lote=len(comandos)) if span else nullcontext({}) as rec:
+        prompt_re = re.compile(rf"(?:^|[\r\n]){re.escape(base_prompt)}\S*[>#]")
+        final_re = re.compile(rf"[\r\n]{re.escape(base_prompt)}\S*[>#]\s*$")
+        retorno = getattr(sesion, "RETURN", "\n")
+        texto, fin = "", time.monotonic() + read_timeout
+        try:
+            sesion.write_channel(retorno.join(comandos) + retorno)
+            while True:
+                texto += sesion.read_channel()
+                if final_re.search(texto) and len(prompt_re.findall(texto)) >= len(comandos):
+                    break
+                if time.monotonic() > fin:
+                    raise TimeoutError(f"lote de {len(comandos)} comandos sin respuesta completa en {read_timeout}s")
+                time.sleep(0.01)
+        except Exception as e:
+            if not resincronizar(sesion, base_prompt, espera=max(read_timeout, 10.0)):
+                raise CanalDesincronizado(f"canal sin prompt tras fallar el lote: {e}") from e
+            raise
+        finally:
+            rec["bytes"] = len(texto)
+    salidas = dividir_salidas(texto, comandos, base_prompt)
+    if len(salidas) < len(comandos):
+        # algún eco no se encontró (terminal que lo recorta): el resto va de a
+        # uno, pero antes el canal tiene que quedar en un prompt propio
+        if not resincronizar(sesion, base_prompt, espera=max(read_timeout, 10.0)):
+            raise CanalDesincronizado(f"canal sin prompt tras dividir {len(salidas)}/{len(comandos)} salidas")
+    return salidas + [sesion.send_command(c, use_textfsm=False, read_timeout=read_timeout)
+                      for c in comandos[len(salidas):]]
@@ -1,49 +1,50 @@
-import io
 import re
-import time
 import csv
 from pathlib import Path
 
 # ====== DEPENDENCIAS ======
 # pip install textfsm pyserial
-import textfsm
-import serial
-import serial.tools.list_ports
+from plantillas import REGISTRO
+from lector_consola import LectorPrompt
+from baudios import abrir_consola
+from inventario import Inventario
+# pyserial (serial) se importa al buscar el puerto: sin él se usa directo el archivo de respaldo
 
 # ====== CONFIG ======
 BAUDRATES = [9600, 115200]
 SERIAL_TIMEOUT = 1.2         # segundos para lecturas no bloqueantes
-BOOT_SETTLE = 2.0            # espera al abrir el puerto
-READ_WINDOW_S = 5.0          # ventana total de lectura tras enviar comando
+PROBE_WAIT = 0.3             # espera del prompt al probar cada baudrate (se recuerda el que funciona)
+READ_WINDOW_S = 5.0          # máximo sin datos tras enviar comando (se corta antes al ver el prompt)
 CSV_NAME = "show_version_parsed.csv"
 FALLBACK_TXT = "show_version.txt"  # si el serial falla, intentamos parsear este archivo
+INVENTARIO_DIR = "inventario"      # inventario histórico por equipo (ver inventario.py); None = solo CSV
 
 # ====== PLANTILLA TEXTFSM (EMBEBIDA) ======
-TPL_STRING = r"""
-# Plantilla TextFSM para 'show version' (Cisco IOS / IOS-XE)
+# (TextFSM toma la primera línea en blanco como fin de los Value: nada de líneas vacías antes)
+TPL_STRING = r"""# Plantilla TextFSM para 'show version' (Cisco IOS / IOS-XE)
 # Extrae: HOSTNAME, VERSION, UPTIME
-
 Value Filldown HOSTNAME (\S+)
 Value Filldown VERSION ([0-9A-Za-z.\-()+]+)
 Value Filldown UPTIME (.+)
 
 Start
   ^${HOSTNAME}\s+uptime is\s+${UPTIME} -> Continue
-  ^Cisco IOS Software.*, Version\s+${VERSION}(?:,|$) -> Record
-  ^Cisco IOS XE Software.*, Version\s+${VERSION}(?:,|$) -> Record
-  ^IOS \(tm\).*, Version\s+${VERSION}(?:,|$) -> Record
+  ^Cisco IOS Software.*, Version\s+${VERSION}(?:,|$$)
+  ^Cisco IOS XE Software.*, Version\s+${VERSION}(?:,|$$)
+  ^IOS \(tm\).*, Version\s+${VERSION}(?:,|$$)
   ^.* -> Continue
-
-EOF
-  ^ -> Record
 """
+REGISTRO.registrar("show_version", texto=TPL_STRING)
 
-def pick_serial_port():
+def pick_serial_port_info():
     """
-    Selecciona automáticamente un puerto que parezca USB-Serial.
-    Preferimos los que tengan 'USB', 'Prolific', 'Silicon', 'FTDI', 'CH340', 'Manhattan' en la descripción.
-    Si no hay coincidencias, tomamos el primero disponible.
+    Igual que pick_serial_port, pero devuelve la info completa del puerto
+    (device, description, hwid...) o None.
     """
+    try:
+        import serial.tools.list_ports
+    except ImportError:
+        return None
     ports = list(serial.tools.list_ports.comports())
     if not ports:
         return None
@@ -53,85 +54,75 @@ def pick_serial_port():
     for p in ports:
         desc = f"{p.description} {p.manufacturer or ''} {p.hwid or ''}"
         if any(k.lower() in desc.lower() for k in keywords):
-            return p.device
+            return p
     # fallback: first port
-    return ports[0].device
+    return ports[0]
+
+def pick_serial_port():
+    """
+    Selecciona automáticamente un puerto que parezca USB-Serial.
+    Preferimos los que tengan 'USB', 'Prolific', 'Silicon', 'FTDI', 'CH340', 'Manhattan' en la descripción.
+    Si no hay coincidencias, tomamos el primero disponible.
+    """
+    info = pick_serial_port_info()
+    return info.device if info else None
 
 def serial_read_all(ser, duration_s=READ_WINDOW_S):
     """
-    Lee todo lo que salga por el puerto durante 'duration_s' segundos.
+    Lee lo que salga por el puerto hasta ver el prompt, o hasta 'duration_s'
+    segundos sin recibir nada.
     """
-    end_t = time.time() + duration_s
-    buff = bytearray()
-    while time.time() < end_t:
-        chunk = ser.read(ser.in_waiting or 1)
-        if chunk:
-            buff += chunk
-        else:
-            time.sleep(0.05)
-    try:
-        return buff.decode(errors="ignore")
-    except Exception:
-        return buff.decode("latin-1", errors="ignore")
+    return LectorPrompt(ser).leer(espera_max=duration_s)
 
 def try_get_show_version():
     """
     Intenta:
       1) Detectar un puerto
-      2) Abrirlo a cada baudrate
+      2) Abrirlo una vez y probar cada baudrate con un CR (prompt en ~300 ms)
       3) Enviar 'terminal length 0' y 'show version'
       4) Devolver la salida de show version (str)
     Si falla todo, retorna None.
     """
-    port = pick_serial_port()
-    if not port:
+    info = pick_serial_port_info()
+    if not info:
         return None
 
-    for baud in BAUDRATES:
-        try:
-            with serial.Serial(port=port, baudrate=baud, timeout=SERIAL_TIMEOUT) as ser:
-                # dar tiempo a que la consola despierte
-                time.sleep(BOOT_SETTLE)
-
-                # "despertar" la consola, limpiar paginación y pedir show version
-                ser.write(b"\r\n")
-                time.sleep(0.3)
-                _ = serial_read_all(ser, 1.0)
-
-                ser.write(b"terminal length 0\r\n")
-                time.sleep(0.2)
-                _ = serial_read_all(ser, 0.8)
-
-                ser.write(b"show version\r\n")
-                output = serial_read_all(ser, READ_WINDOW_S)
-
-                # algunas consolas tardan más; si está corto, espera otro poco
-                if len(output.strip()) < 50:
-                    time.sleep(1.5)
-                    output += serial_read_all(ser, 2.5)
-
-                # limpieza básica de más prompts
-                output = output.replace("\r", "")
-                # intenta recortar desde la línea del comando
-                m = re.search(r"(?im)^\s*show version\s*$", output)
-                if m:
-                    output = output[m.end():]
-
-                if "version" in output.lower() or "uptime" in output.lower():
-                    return output
-        except Exception:
-            # probamos con otro baudrate o fallamos
-            continue
+    try:
+        # probar cada baudrate con un CR (el que funcionó la última vez va primero)
+        ser, baud = abrir_consola(info.device, clave=info.hwid or info.device, candidatos=BAUDRATES,
+                                  espera=PROBE_WAIT, timeout=SERIAL_TIMEOUT)
+        if not ser:
+            return None
+        with ser:
+            # limpiar paginación y pedir show version
+            ser.write(b"terminal length 0\r\n")
+            _ = serial_read_all(ser, 0.8)
+
+            ser.write(b"show version\r\n")
+            output = serial_read_all(ser, READ_WINDOW_S)
+
+            # algunas consolas tardan más; si está corto, espera otro poco
+            if len(output.strip()) < 50:
+                output += serial_read_all(ser, 4.0)
+
+            # limpieza básica de más prompts
+            output = output.replace("\r", "")
+            # intenta recortar desde la línea del comando
+            m = re.search(r"(?im)^\s*show version\s*$", output)
+            if m:
+                output = output[m.end():]
+
+            if "version" in output.lower() or "uptime" in output.lower():
+                return output
+    except Exception:
+        pass
     return None
 
 def parse_show_version_text(text):
     """
     Parsea el texto con la plantilla embebida y retorna (headers, rows).
     """
-    with io.StringIO(TPL_STRING) as tpl:
-        fsm = textfsm.TextFSM(tpl)
-        rows = fsm.ParseText(text)
-    return fsm.header, rows
+    return REGISTRO.parsear("show_version", text)
 
 def save_csv(headers, rows, path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -140,6 +131,25 @@ def save_csv(headers, rows, path: Path):
         w.writerow(headers)
         w.writerows(rows)
 
+def save_inventory(headers, rows, ts=None):
+    """
+    Guarda cada fila en el inventario bajo su HOSTNAME (UPTIME no cuenta como
+    cambio). Devuelve (nuevas, sin_cambios) o None si está desactivado.
+    """
+    if not INVENTARIO_DIR:
+        return None
+    inv = Inventario(INVENTARIO_DIR)
+    i = headers.index("HOSTNAME")
+    por_equipo = {}
+    for r in rows:
+        por_equipo.setdefault(r[i] or "consola", []).append(r)
+    total = [0, 0]
+    for equipo, filas in por_equipo.items():
+        nuevas, iguales = inv.registrar("version", equipo, headers, filas, ts)
+        total[0] += nuevas
+        total[1] += iguales
+    return tuple(total)
+
 def main():
     base = Path.cwd()
     csv_path = base / CSV_NAME
@@ -174,14 +184,17 @@ def main():
         (base / "DEBUG_show_version_raw.txt").write_text(sv_text, encoding="utf-8", errors="ignore")
         return
 
-    # 4) Guardar CSV
+    # 4) Guardar CSV (+ inventario histórico)
     save_csv(headers, rows, csv_path)
+    inv = save_inventory(headers, rows)
 
     print("✅ Listo.")
     print("Encabezados:", headers)
     for r in rows:
         print(r)
     print(f"📄 CSV generado: {csv_path.resolve()}")
+    if inv:
+        print(f"🗃  Inventario: {inv[0]} registros nuevos, {inv[1]} sin cambios")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,465 @@
+# simulador_ios.py — flota de switches Cisco IOS simulados por SSH (para pruebas y benchmarks)
+#
+#   from simulador_ios import Flota
+#   flota = Flota(n_switches=50, hosts_por_switch=24, latencia=0.02).iniciar()
+#   flota.equipos_lucero()   # -> lista para lucero.EQUIPOS_RED
+#   flota.equipos_uni2()     # -> lista para uni2.DEVICES
+#   flota.ubicacion("10.0.1.5")  # -> ("SW1", "Gi1/0/5") para validar el resultado
+#   flota.detener()
+#
+#   python simulador_ios.py --switches 3          # deja la flota escuchando
+#
+# Topología en estrella: SW-CORE (índice 0) con un enlace Te1/1/<i> hacia cada
+# SWi, que sube por su Te1/1/1. Cada switch de acceso tiene `hosts_por_switch`
+# hosts en Gi1/0/1..48 (VLAN 1); el CORE tiene el ARP de todos y cada acceso
+# el DHCP snooping / device-tracking de los suyos. Las tablas MAC incluyen
+# todos los hosts (los remotos por el uplink) y `mac_extra` entradas de relleno
+# para escalar el tamaño. Las salidas siguen el formato de IOS que esperan
+# lucero.py, uni2.py y las plantillas de ntc-templates.
+#
+# Cada switch escucha en su propia IP de loopback (127.0.1.1, 127.0.1.2, ...)
+# en el mismo puerto, porque lucero identifica los equipos por IP. Cada
+# comando puede tardar `latencia` s (+ `latencia_kb` por KB de salida); con
+# `latencias` se fija por prefijo de comando, p.ej. {"show mac address-table": 0.3}.
+# `rtt` simula un enlace WAN: cada escritura del cliente que llega al switch
+# espera ese tiempo antes de atenderse (varios comandos en una sola escritura
+# pagan un solo rtt).
+
+import argparse
+import json
+import re
+import selectors
+import socket
+import threading
+import time
+
+import paramiko
+
+USUARIO = "cisco"
+CLAVE = "cisco99"
+VERSION = "Cisco IOS Software, C3850 Software (CAT3K_CAA-UNIVERSALK9-M), Version 16.9.4, RELEASE SOFTWARE (fc2)"
+INVALIDO = "                    ^\n% Invalid input detected at '^' marker.\n"
+FILTRO_RE = re.compile(r"^(.*?)\s+\|\s+(include|exclude|begin)\s+(.+)$", re.I)
+
+
+def mac_host(sw, p):
+    h = f"02{sw:04x}{p:06x}"
+    return f"{h[0:4]}.{h[4:8]}.{h[8:12]}"
+
+
+def mac_extra(sw, k):
+    h = f"06{sw:04x}{k:06x}"
+    return f"{h[0:4]}.{h[4:8]}.{h[8:12]}"
+
+
+def ip_host(sw, p):
+    return f"10.{sw >> 8}.{sw & 255}.{p}"
+
+
+def _colon(mac):
+    h = mac.replace(".", "").upper()
+    return ":".join(h[i:i + 2] for i in range(0, 12, 2))
+
+
+class SwitchSimulado:
+    def __init__(self, flota, indice, ip):
+        self.flota = flota
+        self.indice = indice
+        self.ip = ip
+        self.nombre = "SW-CORE" if indice == 0 else f"SW{indice}"
+        self.es_core = indice == 0
+
+    # ---------- datos ----------
+    def _puerto_host(self, p):
+        return f"Gi1/0/{(p - 1) % 48 + 1}"
+
+    def _uplinks(self):
+        """{puerto_local: switch_vecino}"""
+        if self.es_core:
+            return {f"Te1/1/{s.indice}": s for s in self.flota.switches[1:]}
+        return {"Te1/1/1": self.flota.switches[0]}
+
+    def _entradas_mac(self):
+        """(vlan, mac, tipo, puerto) — se generan al vuelo, sin guardar la tabla."""
+        f = self.flota
+        for s in range(1, len(f.switches)):
+            for p in range(1, f.hosts_por_switch + 1):
+                if self.es_core:
+                    puerto = f"Te1/1/{s}"
+                elif s == self.indice:
+                    puerto = self._puerto_host(p)
+                else:
+                    puerto = "Te1/1/1"
+                yield "1", mac_host(s, p), "DYNAMIC", puerto
+        for k in range(f.mac_extra):
+            yield "1", mac_extra(self.indice, k), "DYNAMIC", "Te1/1/1" if not self.es_core else f"Te1/1/{k % max(1, len(f.switches) - 1) + 1}"
+
+    def _hosts_locales(self):
+        for p in range(1, self.flota.hosts_por_switch + 1):
+            yield ip_host(self.indice, p), mac_host(self.indice, p), self._puerto_host(p)
+
+    # ---------- comandos ----------
+    def _mac_table(self, args):
+        vlan = mac = ifz = None
+        m = re.search(r"\bvlan\s+(\d+)", args)
+        if m: vlan = m.group(1)
+        m = re.search(r"\baddress\s+(\S+)", args)
+        if m: mac = re.sub(r"[^0-9a-f]", "", m.group(1).lower())
+        m = re.search(r"\binterface\s+(\S+)", args)
+        if m: ifz = _corto(m.group(1))
+        filas = ["          Mac Address Table", "-------------------------------------------", "",
+                 "Vlan    Mac Address       Type        Ports", "----    -----------       --------    -----"]
+        n = 0
+        for v, mc, tipo, puerto in self._entradas_mac():
+            if vlan and v != vlan: continue
+            if mac and mc.replace(".", "") != mac: continue
+            if ifz and puerto.lower() != ifz.lower(): continue
+            filas.append(f" {v:<4}   {mc}    {tipo:<8}    {puerto}")
+            n += 1
+        filas.append(f"Total Mac Addresses for this criterion: {n}")
+        return "\n".join(filas) + "\n"
+
+    def _arp(self, args):
+        m = re.search(r"(\d+\.\d+\.\d+\.\d+)", args)
+        ip = m.group(1) if m else None
+        if "vrf" in args and "all" not in args:
+            return ""
+        filas = ["Protocol  Address          Age (min)  Hardware Addr   Type   Interface"]
+        if not ip or ip == self.ip:
+            filas.append(f"Internet  {self.ip:<16}        -   {mac_extra(self.indice, 0xffffff)}  ARPA   Vlan1")
+        if self.es_core:
+            f = self.flota
+            for s in range(1, len(f.switches)):
+                for p in range(1, f.hosts_por_switch + 1):
+                    h = ip_host(s, p)
+                    if ip and h != ip: continue
+                    filas.append(f"Internet  {h:<16} {p % 240:>8}   {mac_host(s, p)}  ARPA   Vlan1")
+        if ip and len(filas) == 1:
+            return ""
+        return "\n".join(filas) + "\n"
+
+    def _dhcp(self):
+        filas = ["MacAddress          IpAddress        Lease(sec)  Type           VLAN  Interface",
+                 "------------------  ---------------  ----------  -------------  ----  --------------------"]
+        n = 0
+        if not self.es_core:
+            for ip, mac, puerto in self._hosts_locales():
+                filas.append(f"{_colon(mac):<19} {ip:<16} {86400 - n:<11} dhcp-snooping  1     {_largo(puerto)}")
+                n += 1
+        filas.append(f"Total number of bindings: {n}")
+        return "\n".join(filas) + "\n"
+
+    def _sisf(self):
+        filas = ["Binding Table has %d entries, 0 dynamic (limit 200000)" % (0 if self.es_core else self.flota.hosts_por_switch),
+                 "Codes: L - Local, S - Static, ND - Neighbor Discovery, ARP - Address Resolution Protocol, DH4 - IPv4 DHCP",
+                 "",
+                 "    Network Layer Address               Link Layer Address Interface        vlan prlvl  age    state     Time left"]
+        if not self.es_core:
+            for ip, mac, puerto in self._hosts_locales():
+                filas.append(f"DH4 {ip:<35} {mac:<18} {puerto:<16} 1    0024  12s    REACHABLE  250 s")
+        return "\n".join(filas) + "\n"
+
+    def _switchport(self, ifz):
+        modo = "trunk" if _corto(ifz) in self._uplinks() else "static access"
+        return (f"Name: {_corto(ifz)}\nSwitchport: Enabled\nAdministrative Mode: {modo}\n"
+                f"Operational Mode: {modo}\nAdministrative Trunking Encapsulation: dot1q\n"
+                "Access Mode VLAN: 1 (default)\nTrunking Native Mode VLAN: 1 (default)\n")
+
+    def _lldp_detalle(self, ifz=None):
+        bloques = []
+        for local, vec in self._uplinks().items():
+            if ifz and local.lower() != _corto(ifz).lower():
+                continue
+            remoto = "Te1/1/1" if self.es_core else f"Te1/1/{self.indice}"
+            bloques.append(
+                "------------------------------------------------\n"
+                f"Local Intf: {local}\nChassis id: {mac_extra(vec.indice, 0xfffffe)}\nPort id: {remoto}\n"
+                f"Port Description: {_largo(remoto)}\nSystem Name: {vec.nombre}\n\n"
+                f"System Description: \n{VERSION}\n\nTime remaining: 95 seconds\n"
+                "System Capabilities: B,R\nEnabled Capabilities: B\n"
+                f"Management Addresses:\n    IP: {vec.ip}\nAuto Negotiation - not supported\n"
+                "Physical media capabilities - not advertised\nMedia Attachment Unit type - not advertised\n"
+                "Vlan ID: - not advertised\n")
+        return "\n".join(bloques) + f"\nTotal entries displayed: {len(bloques)}\n"
+
+    def _cdp_detalle(self, ifz):
+        vec = self._uplinks().get(_corto(ifz))
+        if not vec:
+            return ""
+        remoto = "Te1/1/1" if self.es_core else f"Te1/1/{self.indice}"
+        return ("-------------------------\n"
+                f"Device ID: {vec.nombre}\nEntry address(es): \n  IP address: {vec.ip}\n"
+                "Platform: cisco WS-C3850-48P,  Capabilities: Switch IGMP \n"
+                f"Interface: {_largo(ifz)},  Port ID (outgoing port): {_largo(remoto)}\n"
+                f"Holdtime : 150 sec\n\nVersion :\n{VERSION}\n")
+
+    def _ip_int_brief(self):
+        return ("Interface              IP-Address      OK? Method Status                Protocol\n"
+                f"Vlan1                  {self.ip:<15} YES manual up                    up\n"
+                "GigabitEthernet0/0     unassigned      YES unset  administratively down down\n")
+
+    def _responder(self, cmd):
+        c = " ".join(cmd.split())
+        cl = c.lower()
+        if cl in ("", "enable", "terminal length 0", "terminal width 511") or cl.startswith(("terminal ", "term ")):
+            return ""
+        if cl.startswith("show version"):
+            return f"{VERSION}\nTechnical Support: http://www.cisco.com/techsupport\n{self.nombre} uptime is 5 weeks\n"
+        if cl.startswith("ping "):
+            m = re.search(r"(\d+\.\d+\.\d+\.\d+)", c)
+            return (f"Type escape sequence to abort.\nSending 2, 100-byte ICMP Echos to {m.group(1) if m else '?'}, "
+                    "timeout is 0 seconds:\n!!\nSuccess rate is 100 percent (2/2), round-trip min/avg/max = 1/1/1 ms\n")
+        if cl.startswith("show mac address-table") or cl.startswith("show mac-address-table"):
+            return self._mac_table(cl)
+        if cl.startswith(("show ip arp", "show arp")):
+            return self._arp(cl)
+        if cl.startswith("show ip dhcp snooping binding"):
+            return self._dhcp()
+        if cl.startswith("show device tracking database"):
+            return self._sisf()
+        if cl.startswith("show ip device tracking"):
+            return INVALIDO   # IOS-XE 16.x ya no lo tiene: sirve para probar las variantes muertas
+        if cl.startswith("show ip interface brief"):
+            return self._ip_int_brief()
+        m = re.match(r"show interfaces? (\S+) switchport$", cl)
+        if m:
+            return self._switchport(m.group(1))
+        m = re.match(r"show interfaces? (\S+)$", cl)
+        if m:
+            mac = mac_extra(self.indice, 0xffffff) if m.group(1).startswith("vl") else mac_extra(self.indice, 0xfffffd)
+            return f"{_largo(m.group(1))} is up, line protocol is up\n  Hardware is EtherSVI, address is {mac} (bia {mac})\n"
+        m = re.match(r"show cdp neighbors? (?:interface )?(\S+) detail$", cl)
+        if m:
+            return self._cdp_detalle(m.group(1))
+        m = re.match(r"show lldp neighbors?(?: interface (\S+))? detail$", cl)
+        if m:
+            return self._lldp_detalle(m.group(1))
+        return INVALIDO
+
+    def ejecutar(self, cmd):
+        """Salida del comando (con | include/exclude/begin) tras la latencia configurada."""
+        t0 = time.monotonic()
+        base, filtro = cmd.strip(), None
+        m = FILTRO_RE.match(base)
+        if m:
+            base, filtro = m.group(1), (m.group(2).lower(), m.group(3).strip())
+        salida = self._responder(base)
+        if filtro and salida != INVALIDO:
+            modo, patron = filtro
+            try:
+                rx = re.compile(patron, re.I)
+            except re.error:
+                rx = re.compile(re.escape(patron), re.I)
+            lineas = salida.splitlines()
+            if modo == "include":
+                lineas = [l for l in lineas if rx.search(l)]
+            elif modo == "exclude":
+                lineas = [l for l in lineas if not rx.search(l)]
+            else:
+                i = next((i for i, l in enumerate(lineas) if rx.search(l)), len(lineas))
+                lineas = lineas[i:]
+            salida = "\n".join(lineas) + ("\n" if lineas else "")
+        espera = self.flota.latencia_de(base) + self.flota.latencia_kb * len(salida) / 1024
+        resto = espera - (time.monotonic() - t0)
+        if resto > 0:
+            time.sleep(resto)
+        self.flota.contar(self.nombre, base)
+        return salida
+
+
+def _corto(ifz):
+    ifz = ifz.strip()
+    for largo, corto in (("tengigabitethernet", "Te"), ("gigabitethernet", "Gi"), ("fastethernet", "Fa"), ("vlan", "Vlan")):
+        if ifz.lower().startswith(largo):
+            return corto + ifz[len(largo):]
+    m = re.match(r"^(te|gi|fa)(\d.*)$", ifz, re.I)
+    return (m.group(1).capitalize() + m.group(2)) if m else ifz
+
+
+def _largo(ifz):
+    return (ifz.replace("Te", "TenGigabitEthernet", 1) if ifz.startswith("Te")
+            else ifz.replace("Gi", "GigabitEthernet", 1) if ifz.startswith("Gi") else ifz)
+
+
+class _ServidorSSH(paramiko.ServerInterface):
+    def __init__(self, usuario, clave):
+        self.usuario, self.clave = usuario, clave
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        ok = username == self.usuario and password == self.clave
+        return paramiko.AUTH_SUCCESSFUL if ok else paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        return True
+
+
+class Flota:
+    def __init__(self, n_switches=3, hosts_por_switch=24, mac_extra=0, latencia=0.0, latencia_kb=0.0,
+                 latencias=None, rtt=0.0, puerto=2222, usuario=USUARIO, clave=CLAVE, clave_host=None):
+        if n_switches < 2:
+            raise ValueError("se necesitan al menos 2 switches (CORE + 1 de acceso)")
+        self.hosts_por_switch = hosts_por_switch
+        self.mac_extra = mac_extra
+        self.latencia = latencia
+        self.latencia_kb = latencia_kb
+        self.latencias = dict(latencias or {})
+        self.rtt = rtt
+        self.puerto = puerto
+        self.usuario, self.clave = usuario, clave
+        self.clave_host = clave_host
+        self.switches = [SwitchSimulado(self, i, f"127.0.{1 + i // 254}.{i % 254 + 1}") for i in range(n_switches)]
+        self.comandos = {}     # nombre -> nº de comandos atendidos
+        self._lock = threading.Lock()
+        self._sel = None
+        self._socks = []
+        self._activo = False
+
+    def latencia_de(self, cmd):
+        cl = cmd.lower()
+        for pref, seg in self.latencias.items():
+            if cl.startswith(pref.lower()):
+                return seg
+        return self.latencia
+
+    def contar(self, nombre, cmd):
+        with self._lock:
+            self.comandos[nombre] = self.comandos.get(nombre, 0) + 1
+
+    def total_comandos(self):
+        with self._lock:
+            return sum(self.comandos.values())
+
+    # ---------- verdad de referencia ----------
+    def ips(self):
+        return [ip_host(s, p) for s in range(1, len(self.switches)) for p in range(1, self.hosts_por_switch + 1)]
+
+    def ubicacion(self, ip):
+        m = re.match(r"^10\.(\d+)\.(\d+)\.(\d+)$", ip)
+        if not m:
+            return None
+        s, p = (int(m.group(1)) << 8) | int(m.group(2)), int(m.group(3))
+        if not (1 <= s < len(self.switches) and 1 <= p <= self.hosts_por_switch):
+            return None
+        sw = self.switches[s]
+        return sw.nombre, sw._puerto_host(p), mac_host(s, p)
+
+    # ---------- listas de equipos para los scripts ----------
+    def equipos_lucero(self):
+        return [{"device_type": "cisco_ios", "ip": s.ip, "port": self.puerto, "username": self.usuario,
+                 "password": self.clave, "host_name": s.nombre} for s in self.switches]
+
+    def equipos_uni2(self):
+        return [{"name": s.nombre, "host": s.ip, "port": self.puerto, "device_type": "cisco_ios",
+                 "username": self.usuario, "password": self.clave} for s in self.switches]
+
+    # ---------- servidor SSH ----------
+    def iniciar(self):
+        if self.clave_host is None:
+            self.clave_host = paramiko.RSAKey.generate(2048)
+        self._sel = selectors.DefaultSelector()
+        for sw in self.switches:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((sw.ip, self.puerto))
+            s.listen(16)
+            s.setblocking(False)
+            self._sel.register(s, selectors.EVENT_READ, sw)
+            self._socks.append(s)
+        self._activo = True
+        threading.Thread(target=self._aceptar, name="sim-ios-accept", daemon=True).start()
+        return self
+
+    def detener(self):
+        self._activo = False
+        for s in self._socks:
+            try:
+                s.close()
+            except OSError:
+                pass
+        self._socks = []
+
+    def _aceptar(self):
+        while self._activo:
+            try:
+                eventos = self._sel.select(timeout=0.2)
+            except (OSError, ValueError):
+                break
+            for key, _ in eventos:
+                try:
+                    conn, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                conn.setblocking(True)
+                threading.Thread(target=self._atender, args=(conn, key.data), daemon=True).start()
+
+    def _atender(self, sock, sw):
+        t = paramiko.Transport(sock)
+        try:
+            t.add_server_key(self.clave_host)
+            t.start_server(server=_ServidorSSH(self.usuario, self.clave))
+            chan = t.accept(20)
+            if chan is None:
+                return
+            prompt = f"{sw.nombre}#"
+            chan.sendall(f"\r\n{prompt}")
+            buf, cr_previo = "", False
+            while True:
+                datos = chan.recv(4096)
+                if not datos:
+                    break
+                if self.rtt:
+                    time.sleep(self.rtt)
+                for ch in datos.decode(errors="ignore"):
+                    if ch in "\r\n":
+                        if ch == "\n" and cr_previo:
+                            cr_previo = False
+                            continue
+                        cr_previo = ch == "\r"
+                        linea, buf = buf, ""
+                        if linea.strip().lower() in ("exit", "logout", "quit"):
+                            chan.sendall(linea + "\r\n")
+                            return
+                        salida = sw.ejecutar(linea).replace("\n", "\r\n")
+                        chan.sendall(linea + "\r\n" + salida + prompt)
+                    else:
+                        cr_previo = False
+                        buf += ch
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            t.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Flota de switches IOS simulados por SSH")
+    ap.add_argument("--switches", type=int, default=3)
+    ap.add_argument("--hosts", type=int, default=24, help="hosts por switch de acceso")
+    ap.add_argument("--mac-extra", type=int, default=0, help="entradas MAC de relleno por switch")
+    ap.add_argument("--latencia", type=float, default=0.0, help="s por comando")
+    ap.add_argument("--latencia-kb", type=float, default=0.0, help="s extra por KB de salida")
+    ap.add_argument("--rtt", type=float, default=0.0, help="s de ida y vuelta por escritura (enlace WAN)")
+    ap.add_argument("--puerto", type=int, default=2222)
+    args = ap.parse_args(argv)
+
+    flota = Flota(args.switches, args.hosts, args.mac_extra, args.latencia, args.latencia_kb,
+                  rtt=args.rtt, puerto=args.puerto).iniciar()
+    print(json.dumps(flota.equipos_uni2(), indent=1))
+    print(f"\n{args.switches} switches escuchando (usuario {USUARIO} / {CLAVE}). Ctrl+C para salir.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        flota.detener()
+
+
+if __name__ == "__main__":
+    main()
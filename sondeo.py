@@ -0,0 +1,241 @@
+# sondeo.py — sondeo periódico de las tablas ARP/MAC con registro de cambios
+#
+#   python sondeo.py [--cambios cambios_red.jsonl] [--intervalo 120] [--min 30] [--max 900]
+#                    [--jitter 0.2] [--paralelo 2] [--duracion SEG] [--equipos lucero|uni2]
+#
+# Cada switch tiene su propio intervalo. Cuando le toca, se descargan sus
+# tablas con el índice de lucero (así las búsquedas en el mismo proceso las
+# encuentran frescas), se comparan con la instantánea anterior y solo se
+# escriben los cambios, una línea JSON por cambio:
+#   {"ts": ..., "switch": "SW2", "tabla": "mac", "evento": "movimiento",
+#    "clave": "0011.2233.4455", "antes": "10 Gi1/0/5", "ahora": "10 Gi1/0/7"}
+# Eventos: "alta" (entrada nueva), "movimiento" (MAC en otro puerto/VLAN, IP
+# con otra MAC) y "baja" (la entrada envejeció y salió de la tabla).
+#
+# El intervalo se adapta al movimiento de cada switch: se acorta a la mitad
+# si en una pasada cambió más de UMBRAL_CAMBIOS de la tabla, y se alarga un
+# 50 % si no cambió nada. A cada espera se le suma un jitter aleatorio para
+# que los switches no se sondeen todos a la vez, y nunca hay más de
+# --paralelo descargas en curso.
+
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import lucero
+from historial import mac_punteada
+
+ARCHIVO_CAMBIOS = "cambios_red.jsonl"
+TABLAS = ("arp", "mac")
+INTERVALO_INICIAL = 120     # seg.
+INTERVALO_MIN = 30
+INTERVALO_MAX = 900
+JITTER = 0.2                # ±20 % sobre cada espera
+MAX_SONDEOS = 2             # switches descargando a la vez
+UMBRAL_CAMBIOS = 0.02       # fracción de la tabla que cambió a partir de la cual se acorta el intervalo
+
+_VLAN_RE = re.compile(r"^\s*\*?\s*(\d+)\s")
+
+log = lucero.log
+
+
+# ----------------- instantáneas y diferencias -----------------
+def entradas_mac(datos):
+    """Índice MAC de lucero ({mac: [líneas]}) -> {mac: 'vlan puerto'}."""
+    res = {}
+    for mac, lineas in datos.items():
+        ubic = []
+        for ln in lineas:
+            partes = ln.split()
+            m = _VLAN_RE.match(ln)
+            ubic.append(f"{m.group(1) if m else '-'} {partes[-1] if partes else '-'}")
+        res[mac_punteada(mac)] = ", ".join(sorted(set(ubic)))
+    return res
+
+
+def entradas_arp(datos):
+    """Índice ARP de lucero ({ip: info}) -> {ip: mac}."""
+    return {ip: mac_punteada(info.get("hw_addr")) for ip, info in datos.items()}
+
+
+def diferencias(antes, ahora):
+    """[(evento, clave, antes, ahora)] entre dos instantáneas {clave: valor}."""
+    cambios = [("alta", k, None, v) for k, v in ahora.items() if k not in antes]
+    cambios += [("movimiento", k, antes[k], v) for k, v in ahora.items() if k in antes and antes[k] != v]
+    cambios += [("baja", k, v, None) for k, v in antes.items() if k not in ahora]
+    return cambios
+
+
+CONVERSORES = {"arp": entradas_arp, "mac": entradas_mac}
+
+
+# ----------------- planificador -----------------
+class EstadoEquipo:
+    def __init__(self, eq, intervalo):
+        self.eq = eq
+        self.intervalo = intervalo
+        self.proximo = 0.0
+        self.ocupado = False
+        self.instantaneas = {}   # tabla -> {clave: valor}
+        self.sondeos = 0
+        self.cambios = 0
+        self.errores = 0
+
+
+class Sondeo:
+    def __init__(self, equipos, archivo=ARCHIVO_CAMBIOS, tablas=TABLAS, intervalo=INTERVALO_INICIAL,
+                 minimo=INTERVALO_MIN, maximo=INTERVALO_MAX, jitter=JITTER, max_sondeos=MAX_SONDEOS,
+                 umbral=UMBRAL_CAMBIOS):
+        self.archivo = archivo
+        self.tablas = tuple(tablas)
+        self.minimo, self.maximo = minimo, maximo
+        self.jitter = jitter
+        self.max_sondeos = max_sondeos
+        self.umbral = umbral
+        self.estados = [EstadoEquipo(eq, intervalo) for eq in equipos]
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        # la primera pasada se reparte en el primer tramo de jitter para no arrancar en ráfaga
+        ahora = time.monotonic()
+        for e in self.estados:
+            e.proximo = ahora + random.uniform(0, intervalo * jitter)
+
+    def _espera(self, intervalo):
+        return intervalo * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def sondear(self, estado):
+        """
+        Descarga las tablas de un switch y registra sus cambios. Devuelve cuántos
+        hubo. Una tabla que no respondió no se compara: se conservan su
+        instantánea anterior y la del índice (si no, la pasada fallida se vería
+        como una baja masiva y la siguiente como un alta masiva).
+        """
+        eq, sw = estado.eq, estado.eq["ip"]
+        with lucero.METRICAS.etapa("sondeo"), lucero.POOL.sesion(eq) as s:
+            bajadas = lucero.INDICE.refrescar(s, sw, self.tablas, forzar=True)
+        if not bajadas:
+            raise RuntimeError(f"ninguna tabla respondió ({', '.join(self.tablas)})")
+        fallidas = [t for t in self.tablas if t not in bajadas]
+        if fallidas:
+            estado.errores += 1
+            log.warning(f"  ⚠ [{eq['host_name']}] sin respuesta de {', '.join(fallidas)}; se compara en la próxima pasada")
+        eventos, filas, ts = [], 0, time.time()
+        for tabla in bajadas:
+            inst = lucero.INDICE.instantanea(sw, tabla)
+            ahora = CONVERSORES[tabla](inst[1]) if inst else {}
+            filas += len(ahora)
+            antes = estado.instantaneas.get(tabla)
+            estado.instantaneas[tabla] = ahora
+            if antes is None:
+                continue   # primera pasada: solo línea base
+            eventos += [{"ts": round(ts, 3), "switch": eq["host_name"], "tabla": tabla, "evento": ev,
+                         "clave": k, "antes": a, "ahora": b} for ev, k, a, b in diferencias(antes, ahora)]
+        if estado.sondeos == 0:
+            log.info(f"  ↪ [{eq['host_name']}] línea base: {filas} entradas")
+        estado.sondeos += 1
+        estado.cambios += len(eventos)
+        self._escribir(eventos)
+        self._ajustar(estado, len(eventos), filas)
+        if eventos:
+            log.info(f"  ↪ [{eq['host_name']}] {len(eventos)} cambios; próximo intervalo {estado.intervalo:.0f}s")
+        return len(eventos)
+
+    def _ajustar(self, estado, cambios, filas):
+        if estado.sondeos < 2:
+            return
+        if cambios > self.umbral * max(1, filas):
+            estado.intervalo = max(self.minimo, estado.intervalo / 2)
+        elif cambios == 0:
+            estado.intervalo = min(self.maximo, estado.intervalo * 1.5)
+
+    def _escribir(self, eventos):
+        if not (eventos and self.archivo):
+            return
+        with self._lock, open(self.archivo, "a", encoding="utf-8") as f:
+            for ev in eventos:
+                f.write(json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def _tarea(self, estado):
+        try:
+            self.sondear(estado)
+        except Exception as e:
+            estado.errores += 1
+            estado.intervalo = min(self.maximo, estado.intervalo * 2)
+            log.warning(f"  ❌ ERROR sondeando {estado.eq['host_name']} ({estado.eq['ip']}): {e}")
+        finally:
+            with self._lock:
+                estado.proximo = time.monotonic() + self._espera(estado.intervalo)
+                estado.ocupado = False
+
+    def correr(self, duracion=None):
+        """Sondea hasta detener() o hasta que pasen `duracion` segundos."""
+        fin = time.monotonic() + duracion if duracion else None
+        with ThreadPoolExecutor(max_workers=self.max_sondeos) as ex:
+            while not self._parar.is_set():
+                ahora = time.monotonic()
+                if fin and ahora >= fin:
+                    break
+                with self._lock:
+                    libres = [e for e in self.estados if not e.ocupado]
+                    # el pool ya limita la concurrencia; no encolamos más de lo que puede atender
+                    en_curso = len(self.estados) - len(libres)
+                    vencidos = sorted((e for e in libres if e.proximo <= ahora), key=lambda e: e.proximo)
+                    for e in vencidos[:max(0, self.max_sondeos - en_curso)]:
+                        e.ocupado = True
+                        ex.submit(self._tarea, e)
+                    proximo = min((e.proximo for e in libres if not e.ocupado), default=ahora + 1)
+                self._parar.wait(min(max(0.05, proximo - ahora), 1.0))
+
+    def detener(self):
+        self._parar.set()
+
+    def resumen(self):
+        return [{"switch": e.eq["host_name"], "sondeos": e.sondeos, "cambios": e.cambios,
+                 "errores": e.errores, "intervalo": round(e.intervalo, 1)} for e in self.estados]
+
+
+def equipos_uni2():
+    """uni2.DEVICES en el formato de EQUIPOS_RED."""
+    import uni2
+    return [dict({k: v for k, v in d.items() if k not in ("name", "host")}, ip=d["host"], host_name=d["name"])
+            for d in uni2.DEVICES]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sondeo periódico de ARP/MAC con registro de cambios")
+    ap.add_argument("--cambios", default=ARCHIVO_CAMBIOS, help="archivo JSON lines de cambios")
+    ap.add_argument("--intervalo", type=float, default=INTERVALO_INICIAL)
+    ap.add_argument("--min", type=float, default=INTERVALO_MIN)
+    ap.add_argument("--max", type=float, default=INTERVALO_MAX)
+    ap.add_argument("--jitter", type=float, default=JITTER)
+    ap.add_argument("--paralelo", type=int, default=MAX_SONDEOS, help="switches descargando a la vez")
+    ap.add_argument("--duracion", type=float, help="segundos (por defecto hasta Ctrl+C)")
+    ap.add_argument("--equipos", choices=("lucero", "uni2"), default="lucero",
+                    help="lista de equipos: EQUIPOS_RED de lucero o DEVICES de uni2")
+    ap.add_argument("--nivel-log", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="INFO")
+    args = ap.parse_args(argv)
+
+    lucero.enable_discreet_mode(getattr(logging, args.nivel_log))
+    equipos = equipos_uni2() if args.equipos == "uni2" else list(lucero.EQUIPOS_RED)
+    sondeo = Sondeo(equipos, args.cambios, intervalo=args.intervalo, minimo=args.min, maximo=args.max,
+                    jitter=args.jitter, max_sondeos=args.paralelo)
+    print(f"Sondeando {len(equipos)} switches (intervalo {args.intervalo:.0f}s, ±{args.jitter:.0%}); "
+          f"cambios en {args.cambios}. Ctrl+C para salir.")
+    try:
+        sondeo.correr(args.duracion)
+    except KeyboardInterrupt:
+        sondeo.detener()
+    for r in sondeo.resumen():
+        print(f"  {r['switch']:<14} {r['sondeos']:>4} sondeos  {r['cambios']:>6} cambios  "
+              f"{r['errores']:>3} errores  intervalo {r['intervalo']:>6.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
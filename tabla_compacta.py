@@ -0,0 +1,232 @@
+# tabla_compacta.py — tablas MAC / ARP en arrays paralelos (enteros en vez de dicts de strings)
+#
+#   from tabla_compacta import TablaMac, TablaArp
+#   t = TablaMac.desde_texto(salida_show_mac)        # o TablaMac.desde_textfsm(filas_ntc)
+#   t.buscar("0011.2233.4455")   # [{"vlan": "10", "port": "Gi1/0/5", "type": "DYNAMIC"}]
+#   t.filtrar(vlan="10", puerto="Gi1/0/5")            # mismas filas, sin recorrer la tabla
+#
+# Cada fila ocupa unos pocos bytes: la MAC como entero de 48 bits (array 'Q'),
+# la IP como entero de 32 bits (array 'I'), y VLAN, puerto y tipo como ids
+# pequeños (array 'B'/'H') de cadenas internadas una sola vez. Las filas se
+# ordenan por MAC (o IP) al construir, así la búsqueda es una bisección
+# O(log n). Los filtros por VLAN y puerto usan listas de filas por id que se
+# construyen la primera vez que se piden.
+
+import re
+from array import array
+from bisect import bisect_left
+
+from coincidencias import MAC_TOKEN_RE
+
+_IP_RE = re.compile(r"(?<![\d.])(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})(?![\d.])")
+_MAC = rf"(?<![0-9a-fA-F])({MAC_TOKEN_RE.pattern})(?![0-9a-fA-F])"
+# fila de 'show mac address-table': (VLAN o "", MAC, primer campo tras la MAC, último campo o "")
+_FILA_MAC_RE = re.compile(rf"^[ \t*]*(\d*)[^\n]*?{_MAC}[ \t]+(\S+)(?:[^\n]*[ \t](\S+))?[ \t]*$", re.M)
+# fila de ARP: (lo de antes de la MAC, MAC, lo de después)
+_FILA_ARP_RE = re.compile(rf"^([^\n]*?){_MAC}([^\n]*)$", re.M)
+_SIN_SEPARADORES = str.maketrans("", "", ".:-")
+
+
+def mac_a_int(mac):
+    h = (mac or "").translate(_SIN_SEPARADORES)
+    if len(h) != 12:
+        return None
+    try:
+        return int(h, 16)
+    except ValueError:
+        return None
+
+
+def int_a_mac(n):
+    h = f"{n:012x}"
+    return f"{h[0:4]}.{h[4:8]}.{h[8:12]}"
+
+
+def ip_a_int(ip):
+    a, b, c, d = (int(x) for x in ip.split("."))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def int_a_ip(n):
+    return f"{n >> 24}.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def _tipo_ids(n):
+    return "B" if n < 256 else "H" if n < 65536 else "I"
+
+
+class _Columnas:
+    """
+    Base: arrays paralelos ordenados por `clave` + columnas internadas con
+    índice invertido perezoso. Cada columna internada llega como array de ids
+    y un dict {cadena: id} con ids consecutivos en orden de inserción.
+    """
+    CLAVE = None          # nombre del array ordenado ('macs' / 'ips')
+    INTERNADAS = ()       # columnas de strings internados
+
+    def __init__(self, claves, columnas, internadas):
+        orden = sorted(range(len(claves)), key=claves.__getitem__)
+        setattr(self, self.CLAVE, array(claves.typecode, map(claves.__getitem__, orden)))
+        for nombre in self.INTERNADAS:
+            col = columnas[nombre]
+            setattr(self, nombre, array(_tipo_ids(len(internadas[nombre])), map(col.__getitem__, orden)))
+        self._ids = internadas
+        self._valores = {n: list(d) for n, d in internadas.items()}
+        self._invertidos = {}
+
+    def __len__(self):
+        return len(getattr(self, self.CLAVE))
+
+    def nbytes(self):
+        """Bytes de los arrays (sin contar las cadenas internadas, que son pocas)."""
+        return sum(a.itemsize * len(a) for a in (getattr(self, n) for n in (self.CLAVE,) + self.INTERNADAS))
+
+    def _rango(self, clave):
+        claves = getattr(self, self.CLAVE)
+        i = bisect_left(claves, clave)
+        j = i
+        while j < len(claves) and claves[j] == clave:
+            j += 1
+        return range(i, j)
+
+    def _filas_con(self, columna, valor):
+        """Filas cuyo `columna` vale `valor` (array de índices, ordenado)."""
+        vid = self._ids[columna].get(valor)
+        if vid is None:
+            return array("I")
+        inv = self._invertidos.get(columna)
+        if inv is None:
+            inv = {}
+            for i, v in enumerate(getattr(self, columna)):
+                inv.setdefault(v, array("I")).append(i)
+            self._invertidos[columna] = inv
+        return inv.get(vid, array("I"))
+
+    def _valor(self, columna, fila):
+        return self._valores[columna][getattr(self, columna)[fila]]
+
+
+class TablaMac(_Columnas):
+    CLAVE = "macs"
+    INTERNADAS = ("vlans", "puertos", "tipos")
+
+    @classmethod
+    def desde_filas(cls, filas):
+        """filas: iterable de (vlan, mac, tipo, puerto) como strings."""
+        macs = array("Q")
+        cols = {n: array("I") for n in cls.INTERNADAS}
+        ids = {n: {} for n in cls.INTERNADAS}
+        # bucle caliente: todo en variables locales
+        m_add = macs.append
+        v_add, p_add, t_add = cols["vlans"].append, cols["puertos"].append, cols["tipos"].append
+        v_ids, p_ids, t_ids = ids["vlans"], ids["puertos"], ids["tipos"]
+        for vlan, mac, tipo, puerto in filas:
+            m = mac_a_int(mac)
+            if m is None:
+                continue
+            m_add(m)
+            v_add(v_ids.setdefault(vlan, len(v_ids)))
+            p_add(p_ids.setdefault(puerto, len(p_ids)))
+            t_add(t_ids.setdefault(tipo, len(t_ids)))
+        return cls(macs, cols, ids)
+
+    @classmethod
+    def desde_texto(cls, texto):
+        """Salida cruda de 'show mac address-table' (IOS / NX-OS): VLAN, MAC, tipo, puerto(s)."""
+        def filas():
+            for vlan, mac, campo, ultimo in _FILA_MAC_RE.findall(texto or ""):
+                # con un solo campo tras la MAC, ese campo es el puerto
+                yield (vlan, mac, campo, ultimo) if ultimo else (vlan, mac, "", campo)
+        return cls.desde_filas(filas())
+
+    @classmethod
+    def desde_textfsm(cls, filas):
+        """Filas de ntc-templates (cisco_ios_show_mac_address_table)."""
+        def normalizadas():
+            for r in filas:
+                puerto = r.get("destination_port", "")
+                if isinstance(puerto, list):   # algunas versiones devuelven lista; nos quedamos con el primero
+                    puerto = puerto[0] if puerto else ""
+                vlan = r.get("vlan_id", r.get("vlan", ""))   # ntc-templates actuales: vlan_id
+                yield str(vlan), r.get("destination_address", ""), r.get("type", ""), puerto
+        return cls.desde_filas(normalizadas())
+
+    def fila(self, i):
+        return {"vlan": self._valor("vlans", i), "port": self._valor("puertos", i), "type": self._valor("tipos", i)}
+
+    def buscar(self, mac):
+        """Entradas de `mac` (cualquier formato) como [{"vlan", "port", "type"}]."""
+        m = mac_a_int(mac)
+        return [] if m is None else [self.fila(i) for i in self._rango(m)]
+
+    def filtrar(self, vlan=None, puerto=None):
+        """Entradas en esa VLAN y/o puerto, con la MAC: [{"mac", "vlan", "port", "type"}]."""
+        conjuntos = [self._filas_con(c, v) for c, v in (("vlans", vlan), ("puertos", puerto)) if v is not None]
+        if not conjuntos:
+            filas = range(len(self))
+        elif len(conjuntos) == 1:
+            filas = conjuntos[0]
+        else:
+            otro = set(conjuntos[1])
+            filas = [i for i in conjuntos[0] if i in otro]
+        return [dict(self.fila(i), mac=int_a_mac(self.macs[i])) for i in filas]
+
+    def contar_por_puerto(self):
+        """{puerto: nº de MACs} (p.ej. para distinguir un puerto de acceso de un uplink)."""
+        cuenta = [0] * len(self._valores["puertos"])
+        for p in self.puertos:
+            cuenta[p] += 1
+        return {self._valores["puertos"][i]: n for i, n in enumerate(cuenta) if n}
+
+
+class TablaArp(_Columnas):
+    CLAVE = "ips"
+    INTERNADAS = ("interfaces",)
+
+    def __init__(self, claves, columnas, internadas, macs):
+        orden = sorted(range(len(claves)), key=claves.__getitem__)
+        self.macs = array("Q", map(macs.__getitem__, orden))
+        super().__init__(claves, columnas, internadas)
+        self._por_mac = None
+
+    @classmethod
+    def desde_texto(cls, texto):
+        """Salida cruda de 'show ip arp': IP, MAC e interfaz (última columna) por fila."""
+        ips, macs, ifaces, ids = array("I"), array("Q"), array("I"), {}
+        for antes, mac, despues in _FILA_ARP_RE.findall(texto or ""):
+            mi = _IP_RE.search(antes)
+            if not mi:
+                continue
+            ips.append(ip_a_int(mi.group(0)))
+            macs.append(mac_a_int(mac))
+            resto = despues.split()
+            ifaces.append(ids.setdefault(resto[-1] if resto else "", len(ids)))
+        return cls(ips, {"interfaces": ifaces}, {"interfaces": ids}, macs)
+
+    def nbytes(self):
+        return super().nbytes() + self.macs.itemsize * len(self.macs)
+
+    def mac_de(self, ip):
+        """MAC (xxxx.xxxx.xxxx) de `ip`, o None."""
+        r = self._rango(ip_a_int(ip))
+        return int_a_mac(self.macs[r[0]]) if r else None
+
+    def ips_de(self, mac):
+        """IPs que resuelven a `mac` (índice por MAC construido la primera vez)."""
+        m = mac_a_int(mac)
+        if m is None:
+            return []
+        if self._por_mac is None:
+            orden = sorted(range(len(self.macs)), key=self.macs.__getitem__)
+            self._por_mac = (array("Q", map(self.macs.__getitem__, orden)), array("I", orden))
+        macs, orden = self._por_mac
+        i = bisect_left(macs, m)
+        res = []
+        while i < len(macs) and macs[i] == m:
+            res.append(int_a_ip(self.ips[orden[i]]))
+            i += 1
+        return res
+
+    def filtrar(self, interfaz):
+        return [{"ip": int_a_ip(self.ips[i]), "mac": int_a_mac(self.macs[i]), "interface": interfaz}
+                for i in self._filas_con("interfaces", interfaz)]
@@ -1,12 +1,22 @@
 # find_ip_on_switches.py
 # Requisitos: netmiko, textfsm, tabulate, ntc-templates (NET_TEXTFSM apuntando al dir 'templates')
+# netmiko y tabulate se importan al usarlos (primera conexión / primera tabla impresa).
+
+from __future__ import annotations
 
 import re
+import atexit
 import ipaddress
-from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from metricas import Metricas, logger_consola
+from tabla_compacta import TablaMac
 
-from netmiko import ConnectHandler
-from tabulate import tabulate
+if TYPE_CHECKING:
+    from netmiko import ConnectHandler
 
 # =============== AJUSTA ESTO A TU LAB ==================
 USERNAME = "cisco"
@@ -24,10 +34,34 @@ VLAN_INTEREST = "1"      # por simplicidad
 PING_COUNT = 2
 PING_TIMEOUT_MS = 500
 
+# Modo traza: desde el CORE se sigue el puerto de salida de la MAC por LLDP,
+# switch por switch, hasta llegar a un puerto que no es uplink.
+TRACE_MODE = True
+TOPOLOGY_REFRESH_S = 300   # cada cuánto se refresca en segundo plano el grafo LLDP
+MAX_HOPS = 16
+
+# Instrumentación: un span por conexión, comando y parseo (ver metricas.py).
+# LOG_LEVEL=INFO muestra el avance switch por switch, DEBUG además los spans,
+# WARNING solo los avisos; con METRICS_PREFIX se exportan al salir a
+# <prefijo>.jsonl y <prefijo>.prom (Prometheus).
+LOG_LEVEL = logging.INFO
+METRICS_PREFIX = None
+
 # =======================================================
 
+log = logger_consola("uni2", LOG_LEVEL)
+METRICS = Metricas(log)
+
+def export_metrics(prefix: str) -> None:
+    METRICS.exportar_jsonl(prefix + ".jsonl")
+    METRICS.exportar_prometheus(prefix + ".prom", prefijo="uni2")
+
 def connect(device: Dict) -> ConnectHandler:
-    return ConnectHandler(**device)
+    from netmiko import ConnectHandler
+    # "name" es nuestro, no un parámetro de netmiko
+    with METRICS.span("conexion", device["name"]):
+        conn = ConnectHandler(**{k: v for k, v in device.items() if k != "name"})
+    return METRICS.sesion(conn, device["name"])
 
 def normalize_mac(mac: str) -> str:
     mac = mac.strip().lower()
@@ -54,14 +88,16 @@ def get_mac_from_ip(core_conn: ConnectHandler, ip: str) -> Optional[str]:
         out = core_conn.send_command(f"show arp {ip}", use_textfsm=True)
 
     if isinstance(out, list) and len(out) > 0:
-        # ntc-templates keys usuales: 'address','protocol','age','mac','interface'
+        # ntc-templates actuales: 'ip_address','mac_address',...; versiones viejas: 'address','mac'
         entry = out[0]
-        mac = entry.get("mac") or entry.get("hardware_addr")
-        return normalize_mac(mac) if mac else None
+        mac = entry.get("mac_address") or entry.get("mac") or entry.get("hardware_addr")
+        if mac:
+            return normalize_mac(mac)
 
     # Fallback regex (si no hay templates)
     raw = core_conn.send_command(f"show ip arp {ip}")
-    m = re.search(r"([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}|[0-9a-fA-F]{2}([:\-.]?)){5}[0-9a-fA-F]{2}", raw)
+    with METRICS.span("parseo", getattr(core_conn, "equipo", None), "arp-regex"):
+        m = re.search(r"([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}|[0-9a-fA-F]{2}([:\-.]?)){5}[0-9a-fA-F]{2}", raw)
     return normalize_mac(m.group(0)) if m else None
 
 def get_lldp_uplinks(conn: ConnectHandler) -> set:
@@ -79,38 +115,31 @@ def get_lldp_uplinks(conn: ConnectHandler) -> set:
         pass
     return uplinks
 
-def find_mac_on_switch(conn: ConnectHandler, mac: str) -> List[Dict]:
-    """Busca la MAC en show mac address-table; regresa lista de coincidencias."""
-    results = []
+def get_mac_table(conn: ConnectHandler, command: str = "show mac address-table") -> TablaMac:
+    """Descarga la tabla MAC y la compacta (TablaMac)."""
+    name = getattr(conn, "equipo", None)
+    table = None
     try:
         # 'cisco_ios_show_mac_address_table' template regresa campos comunes:
-        # destination_address, destination_port, type, vlan
-        table = conn.send_command("show mac address-table", use_textfsm=True)
-        if isinstance(table, list):
-            for row in table:
-                if normalize_mac(row.get("destination_address","")) == mac:
-                    results.append({
-                        "vlan": str(row.get("vlan", "")),
-                        "port": row.get("destination_port", ""),
-                        "type": row.get("type", "")
-                    })
-            return results
+        # destination_address, destination_port, type, vlan_id (vlan en versiones viejas)
+        table = conn.send_command(command, use_textfsm=True)
     except Exception:
         pass
+    with METRICS.span("parseo", name, "mac-table") as sp:
+        if isinstance(table, list):
+            compact = TablaMac.desde_textfsm(table)
+        else:
+            # Fallback: sin template netmiko devuelve el texto crudo
+            raw = table if isinstance(table, str) else conn.send_command(command)
+            compact = TablaMac.desde_texto(raw)
+        sp["filas"] = len(compact)
+    return compact
 
-    # Fallback: filtrar manual
-    raw = conn.send_command("show mac address-table")
-    for line in raw.splitlines():
-        if mac in line.lower():
-            # Ejemplo de línea: " 1    dddd.dddd.dddd   DYNAMIC Gi1/0/15"
-            parts = line.split()
-            # heurística
-            vlan = parts[0] if parts else ""
-            typ  = parts[-2] if len(parts) >= 2 else ""
-            port = parts[-1] if parts else ""
-            results.append({"vlan": vlan, "port": port, "type": typ})
-    return results
+def find_mac_on_switch(conn: ConnectHandler, mac: str, command: str = "show mac address-table") -> List[Dict]:
+    """Busca la MAC en show mac address-table; regresa lista de coincidencias."""
+    return get_mac_table(conn, command).buscar(mac)
 
+@METRICS.en_etapa("resolve")
 def resolve_location(ip: str) -> Optional[Dict]:
     """Devuelve dict con switch, puerto, vlan, mac, ip; o None si no se encontró."""
     core_dev, core_conn = get_core_conn()
@@ -120,16 +149,21 @@ def resolve_location(ip: str) -> Optional[Dict]:
         # 2) sacar MAC desde ARP del CORE
         mac = get_mac_from_ip(core_conn, ip)
         if not mac:
+            log.info(f"  ... {CORE_NAME} no tiene ARP para {ip}.")
             return None
+        log.info(f"  💡 {ip} -> MAC {mac} (ARP de {CORE_NAME})")
 
         # 3) buscar MAC en todos los switches
         best_match = None
         for dev in DEVICES:
             conn = None
             try:
+                log.info(f"  ↪ Buscando MAC {mac} en [{dev['name']}]...")
                 conn = connect(dev)
                 lldp_uplinks = get_lldp_uplinks(conn)  # puertos que "parecen" troncales
                 matches = find_mac_on_switch(conn, mac)
+                if not matches:
+                    log.info(f"     ... sin registros en [{dev['name']}].")
                 # prioriza:
                 #  - VLAN 1 (si coincide)
                 #  - PUERTO que NO esté en uplinks LLDP (probable puerto de usuario)
@@ -153,6 +187,8 @@ def resolve_location(ip: str) -> Optional[Dict]:
                         "vlan": cand.get("vlan",""),
                         "type": cand.get("type","")
                     }
+                    log.info(f"     [{dev['name']}] {best_match['port']} VLAN {best_match['vlan']}"
+                             f" {best_match['type']}{' (uplink LLDP)' if best_match['port'] in lldp_uplinks else ''}")
                     # Si ya encontramos un puerto que no es uplink y es VLAN 1 dinámico, paramos.
                     if (best_match["vlan"] == VLAN_INTEREST
                         and best_match["port"] not in lldp_uplinks
@@ -166,9 +202,199 @@ def resolve_location(ip: str) -> Optional[Dict]:
     finally:
         core_conn.disconnect()
 
+# ================== MODO TRAZA (LLDP hop-by-hop) ==================
+INTF_PREFIXES = (
+    ("tengigabitethernet", "te"), ("twentyfivegige", "twe"), ("fortygigabitethernet", "fo"),
+    ("hundredgige", "hu"), ("gigabitethernet", "gi"), ("fastethernet", "fa"),
+    ("port-channel", "po"), ("ethernet", "eth"),
+)
+
+def normalize_intf(name: str) -> str:
+    """'GigabitEthernet1/0/24', 'Gi1/0/24' y 'gi1/0/24' -> 'gi1/0/24'."""
+    n = (name or "").strip().lower().replace(" ", "")
+    for long, short in INTF_PREFIXES:
+        if n.startswith(long):
+            return short + n[len(long):]
+    m = re.match(r"^([a-z-]+)(.*)$", n)
+    if m:
+        for long, short in INTF_PREFIXES:
+            if long.startswith(m.group(1)):
+                return short + m.group(2)
+    return n
+
+def _device_for_neighbor(nbr: Dict) -> Optional[Dict]:
+    """Empareja un vecino LLDP con un equipo de DEVICES (por nombre o IP de gestión)."""
+    name = (nbr.get("neighbor_name") or nbr.get("neighbor") or nbr.get("system_name") or "").strip()
+    name = name.split(".")[0].lower()
+    mgmt = nbr.get("mgmt_address") or nbr.get("management_ip") or nbr.get("management_address") or ""
+    if isinstance(mgmt, list):
+        mgmt = mgmt[0] if mgmt else ""
+    for dev in DEVICES:
+        if name and dev["name"].lower() == name:
+            return dev
+        if mgmt and dev["host"] == mgmt:
+            return dev
+    return None
+
+def parse_etherchannel_summary(text: str) -> Dict[str, List[str]]:
+    """'show etherchannel summary' -> {'po1': ['gi1/0/1', 'gi1/0/2'], ...} (nombres normalizados)."""
+    groups: Dict[str, List[str]] = {}
+    current = None
+    for line in (text or "").splitlines():
+        m = re.match(r"^\s*\d+\s+(Po\d+)\(\w*\)\s+\S+(.*)$", line)
+        if m:
+            current, rest = normalize_intf(m.group(1)), m.group(2)
+            groups[current] = []
+        elif current and line[:1].isspace() and line.strip():
+            rest = line   # los miembros siguen en la línea de abajo
+        else:
+            current = None
+            continue
+        groups[current] += [normalize_intf(p) for p in re.findall(r"([A-Za-z]+\d[\d/.]*)\(\w+\)", rest)]
+    return groups
+
+def get_port_channels(conn: ConnectHandler) -> Dict[str, List[str]]:
+    try:
+        return parse_etherchannel_summary(conn.send_command("show etherchannel summary"))
+    except Exception:
+        return {}
+
+class TopologyCache:
+    """
+    Grafo LLDP en caché: {equipo: {interfaz_local: equipo_vecino}}. Solo guarda
+    vecinos que son switches de DEVICES (teléfonos, APs, etc. no cuentan como
+    uplink). LLDP se ve en los puertos físicos; un Port-channel cuenta como
+    enlace al vecino de sus miembros si todos dan al mismo. Un hilo en segundo plano lo refresca cada `refresh_s`; si falta un
+    equipo se consulta en el momento.
+    """
+    def __init__(self, refresh_s: float = TOPOLOGY_REFRESH_S):
+        self.refresh_s = refresh_s
+        self._graph: Dict[str, Tuple[float, Dict[str, Dict]]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def refresh_device(self, dev: Dict, conn: Optional[ConnectHandler] = None) -> Dict[str, Dict]:
+        own = conn is None
+        if own:
+            conn = connect(dev)
+        try:
+            links = {}
+            out = conn.send_command("show lldp neighbors detail", use_textfsm=True)
+            if isinstance(out, list):
+                for n in out:
+                    local_intf = n.get("local_interface") or n.get("local_intf")
+                    peer = _device_for_neighbor(n)
+                    if local_intf and peer and peer["name"] != dev["name"]:
+                        links[normalize_intf(local_intf)] = peer
+            if links:
+                for po, members in get_port_channels(conn).items():
+                    peers = {links[m]["name"]: links[m] for m in members if m in links}
+                    if len(peers) == 1:
+                        links[po] = next(iter(peers.values()))
+        finally:
+            if own:
+                conn.disconnect()
+        with self._lock:
+            self._graph[dev["name"]] = (time.time(), links)
+        return links
+
+    def neighbors(self, dev: Dict, conn: Optional[ConnectHandler] = None) -> Dict[str, Dict]:
+        with self._lock:
+            entry = self._graph.get(dev["name"])
+        if entry and time.time() - entry[0] <= 2 * self.refresh_s:
+            return entry[1]
+        return self.refresh_device(dev, conn)
+
+    def refresh_all(self) -> None:
+        for dev in DEVICES:
+            try:
+                self.refresh_device(dev)
+            except Exception:
+                pass
+
+    def start(self) -> None:
+        """Arranca el refresco periódico en segundo plano (idempotente y seguro entre hilos)."""
+        def loop():
+            while True:
+                with METRICS.etapa("topologia"):
+                    self.refresh_all()
+                time.sleep(self.refresh_s)
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=loop, name="lldp-topology", daemon=True)
+            self._thread.start()
+
+TOPOLOGY = TopologyCache()
+
+@METRICS.en_etapa("trace")
+def trace_location(ip: str) -> Optional[Dict]:
+    """
+    Igual que resolve_location, pero en vez de preguntar a todos los switches
+    sigue la MAC desde el CORE: en cada salto pregunta solo por esa MAC y, si
+    el puerto de salida tiene un vecino LLDP que es switch, salta a él. El
+    coste crece con la profundidad del árbol, no con el tamaño de la red.
+    """
+    dev, conn = get_core_conn()
+    try:
+        ping_from_core(conn, ip)
+        mac = get_mac_from_ip(conn, ip)
+        if not mac:
+            log.info(f"  ... {CORE_NAME} no tiene ARP para {ip}.")
+            return None
+        log.info(f"  💡 {ip} -> MAC {mac} (ARP de {CORE_NAME})")
+
+        visited = set()
+        for _ in range(MAX_HOPS):
+            if dev["name"] in visited:
+                return None   # bucle en el grafo: mejor que decida resolve_location
+            visited.add(dev["name"])
+            if conn is None:
+                conn = connect(dev)
+            matches = find_mac_on_switch(conn, mac, command=f"show mac address-table address {mac}")
+            ranked = sorted(
+                matches,
+                key=lambda r: (
+                    0 if str(r.get("vlan", "")) == VLAN_INTEREST else 1,
+                    0 if str(r.get("type", "")).upper() == "DYNAMIC" else 1
+                )
+            )
+            if not ranked:
+                log.info(f"     ... [{dev['name']}] no tiene la MAC; la traza se corta.")
+                return None
+            cand = ranked[0]
+            port = cand.get("port", "")
+            if isinstance(port, list):   # algunas versiones de ntc-templates devuelven lista
+                port = port[0] if port else ""
+            nxt = TOPOLOGY.neighbors(dev, conn).get(normalize_intf(port))
+            if nxt is None and normalize_intf(port).startswith("po"):
+                log.info(f"     ... [{dev['name']}] {port} es un agregado sin vecino conocido; la traza se corta.")
+                return None   # agregado sin vecino conocido: no es el puerto del host
+            if nxt is None:
+                log.info(f"  📌 [{dev['name']}] {port} (sin vecino LLDP: puerto del host)")
+                return {
+                    "switch": dev["name"],
+                    "ip": ip,
+                    "mac": mac,
+                    "port": port,
+                    "vlan": cand.get("vlan", ""),
+                    "type": cand.get("type", "")
+                }
+            log.info(f"  ↪ [{dev['name']}] {port} -> [{nxt['name']}]")
+            conn.disconnect()
+            dev, conn = nxt, None
+        return None
+    finally:
+        if conn:
+            conn.disconnect()
+
 def main():
     print("=== Localizador de IP -> (Switch, Puerto, MAC) con Netmiko+TextFSM ===")
     print("Escribe 'salir' para terminar.\n")
+    if TRACE_MODE:
+        TOPOLOGY.start()
+    if METRICS_PREFIX:
+        atexit.register(export_metrics, METRICS_PREFIX)
 
     while True:
         ip = input("CONSOLA: { ¿Qué IP quieres encontrar? } ").strip()
@@ -184,7 +410,14 @@ def main():
             print("[!] IP no válida, intenta de nuevo.\n")
             continue
 
-        info = resolve_location(ip)
+        info = None
+        if TRACE_MODE:
+            try:
+                info = trace_location(ip)
+            except Exception as e:
+                log.warning(f"[!] La traza LLDP falló ({e}); consulto todos los switches.")
+        if not info:
+            info = resolve_location(ip)
         if not info:
             print(f"[x] No encontré información para {ip}. Puede que no tenga ARP/MAC aún.")
             print("    Tip: asegúrate que la laptop esté conectada y que haya tráfico (o prueba de nuevo).\n")
@@ -198,6 +431,7 @@ def main():
             ["VLAN", info["vlan"]],
             ["Tipo (MAC table)", info["type"]],
         ]
+        from tabulate import tabulate
         print("\n" + tabulate(table, headers=["Campo", "Valor"], tablefmt="fancy_grid") + "\n")
 
 if __name__ == "__main__":